@@ -3,44 +3,90 @@ CCD 2.0 - Main Backend Application
 Coffee Shop Management System
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
+import importlib
 import os
+import threading
 from datetime import datetime
 
-# Import route modules
-from routes.orders import orders_bp
-from routes.users import users_bp
-from routes.menu import menu_bp
-from routes.cafes import cafes_bp
-from routes.loyalty import loyalty_bp
-from routes.events import events_bp
-from routes.promotions import promotions_bp
-from routes.tracking import tracking_bp
-from routes.sustainability import sustainability_bp
+from .services.startup_profile import phase
+
+# Route modules are imported on demand (first request or warmup), not at import time:
+# (module under backend.routes, blueprint attribute, URL prefix)
+BLUEPRINTS = (
+    ('orders', 'orders_bp', '/api/orders'),
+    ('users', 'users_bp', '/api/users'),
+    ('menu', 'menu_bp', '/api/menu'),
+    ('cafes', 'cafes_bp', '/api/cafes'),
+    ('loyalty', 'loyalty_bp', '/api/loyalty'),
+    ('events', 'events_bp', '/api/events'),
+    ('promotions', 'promotions_bp', '/api/promotions'),
+    ('tracking', 'tracking_bp', '/api/tracking'),
+    ('sustainability', 'sustainability_bp', '/api/sustainability'),
+)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
 
 # Configuration
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database", "ccd.db")}'
+DATABASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database")
+os.makedirs(DATABASE_DIR, exist_ok=True)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('CCD_DATABASE_URL', f'sqlite:///{os.path.join(DATABASE_DIR, "ccd.db")}')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 'production' enables WAL, mmap, busy_timeout and a sized connection pool
+app.config['DATABASE_PROFILE'] = os.environ.get('CCD_DB_PROFILE', 'default')
 
 # Initialize database
-from models.coffee import db, init_db
-db.init_app(app)
+from .models.coffee import db, init_db
+from .services.sqlite_profile import configure_database
+configure_database(app, db)
+
+# Request/SQL metrics for /api/metrics; CCD_METRICS=0 turns the hooks off
+from .services import metrics
+metrics_registry = metrics.init_app(app, db) if os.environ.get('CCD_METRICS', '1') != '0' else None
 
 # Register blueprints
-app.register_blueprint(orders_bp, url_prefix='/api/orders')
-app.register_blueprint(users_bp, url_prefix='/api/users')
-app.register_blueprint(menu_bp, url_prefix='/api/menu')
-app.register_blueprint(cafes_bp, url_prefix='/api/cafes')
-app.register_blueprint(loyalty_bp, url_prefix='/api/loyalty')
-app.register_blueprint(events_bp, url_prefix='/api/events')
-app.register_blueprint(promotions_bp, url_prefix='/api/promotions')
-app.register_blueprint(tracking_bp, url_prefix='/api/tracking')
-app.register_blueprint(sustainability_bp, url_prefix='/api/sustainability')
+_blueprints_loaded = False
+_blueprints_lock = threading.Lock()
+
+def load_blueprints():
+    """Import the route modules and register their blueprints (idempotent)"""
+    global _blueprints_loaded
+    if _blueprints_loaded:
+        return
+    with _blueprints_lock:
+        if _blueprints_loaded:
+            return
+        for module_name, attribute, prefix in BLUEPRINTS:
+            with phase(f'routes.{module_name}'):
+                module = importlib.import_module(f'.routes.{module_name}', __package__)
+                app.register_blueprint(getattr(module, attribute), url_prefix=prefix)
+        _blueprints_loaded = True
+
+def _load_blueprints_on_first_request(wsgi_app):
+    # Flask refuses new routes once it has handled a request, so every
+    # blueprint is loaded before the first one reaches it
+    def middleware(environ, start_response):
+        load_blueprints()
+        return wsgi_app(environ, start_response)
+    return middleware
+
+app.wsgi_app = _load_blueprints_on_first_request(app.wsgi_app)
+
+def warm_caches():
+    """Load the routes and in-process indexes up front instead of on each worker's first request"""
+    load_blueprints()
+    from .routes.cafes import warm_cafe_index
+    from .routes.loyalty import warm_leaderboards
+    from .routes.promotions import warm_promotions
+    with phase('warm leaderboards'):
+        warm_leaderboards()
+    with phase('warm promotions'):
+        warm_promotions()
+    with phase('warm cafe index'):
+        warm_cafe_index()
 
 @app.route('/')
 def home():
@@ -63,30 +109,12 @@ def health_check():
         }
     })
 
-if __name__ == '__main__':
-    # Initialize database with sample data
-    with app.app_context():
-        init_db(app)
-    
-    print("🚀 CCD 2.0 API Server Starting...")
-    print("📊 Enhanced Features Available:")
-    print("   ✅ Real-time Order Tracking")
-    print("   ✅ Loyalty & Rewards System")
-    print("   ✅ Café Location Management")
-    print("   ✅ Events & Community Features")
-    print("   ✅ Sustainability Tracking")
-    print("   ✅ Promotions & Marketing")
-    print("   ✅ Stock Management")
-    print("   ✅ Personalization Features")
-    print("\n🌐 API Endpoints:")
-    print("   📍 http://localhost:5000/api/orders")
-    print("   📍 http://localhost:5000/api/users")
-    print("   📍 http://localhost:5000/api/menu")
-    print("   📍 http://localhost:5000/api/cafes")
-    print("   📍 http://localhost:5000/api/loyalty")
-    print("   📍 http://localhost:5000/api/events")
-    print("   📍 http://localhost:5000/api/promotions")
-    print("   📍 http://localhost:5000/api/tracking")
-    print("   📍 http://localhost:5000/api/sustainability")
-    
-    app.run(debug=True, host='0.0.0.0', port=5000)
+@app.route('/api/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint (this process's counters)"""
+    if metrics_registry is None:
+        return jsonify({
+            'success': False,
+            'error': 'Metrics are disabled (CCD_METRICS=0)'
+        }), 404
+    return Response(metrics_registry.render(), content_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,83 @@
+"""
+Event Booking Concurrency Benchmark
+Fires thousands of parallel bookings at a 50-seat event and checks that
+it is never overbooked
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_event_booking
+"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from ..models.coffee import db, Cafe, Event, EventBooking
+from ..routes.events import events_bp
+
+THREADS = 50
+BOOKINGS_PER_THREAD = 40
+CAPACITY = 50
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        app.register_blueprint(events_bp, url_prefix='/api/events')
+
+        with app.app_context():
+            db.create_all()
+            cafe = Cafe(name='CCD Downtown', address='123 Main Street', city='Mumbai', state='Maharashtra', pincode='400001')
+            db.session.add(cafe)
+            db.session.flush()
+            event = Event(
+                cafe_id=cafe.id, title='Brewflix Movie Night', event_type='brewflix',
+                start_time=datetime.now() + timedelta(days=1),
+                end_time=datetime.now() + timedelta(days=1, hours=3),
+                max_capacity=CAPACITY, price=150.0
+            )
+            db.session.add(event)
+            db.session.commit()
+            event_id = event.id
+
+        outcomes = {}
+        lock = threading.Lock()
+
+        def worker(n):
+            client = app.test_client()
+            for i in range(BOOKINGS_PER_THREAD):
+                response = client.post(f'/api/events/{event_id}/book', json={'user_id': f'user-{n}-{i}', 'tickets': 1})
+                with lock:
+                    outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        with app.app_context():
+            booked = db.session.get(Event, event_id).current_bookings
+            tickets = db.session.query(db.func.sum(EventBooking.tickets)).filter_by(event_id=event_id).scalar() or 0
+
+        attempts = THREADS * BOOKINGS_PER_THREAD
+        print(f'attempts:          {attempts}')
+        print(f'throughput:        {attempts / elapsed:.0f} bookings/sec')
+        print(f'outcomes:          {dict(sorted(outcomes.items()))}')
+        print(f'current_bookings:  {booked} / {CAPACITY}')
+        print(f'booking rows:      {tickets} tickets')
+        assert booked <= CAPACITY, 'event overbooked'
+        assert booked == tickets, 'booking rows do not match capacity counter'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Green Points Benchmark
+Profile read latency as a user's order history grows (previous join-and-count
+vs the balance row), award cost, and the bulk recompute; also checks that
+incremental awards and a recompute agree
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_green_points
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from ..models.coffee import db, Coffee, GreenPointsAccount, Order, OrderItem, User
+from ..routes.sustainability import sustainability_bp
+from ..routes.tracking import tracking_bp
+from ..services.green_points import recompute
+
+HISTORY_SIZES = (10, 1000, 10000, 100000)
+READS = 500
+AWARDS = 500
+
+
+def create_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(sustainability_bp, url_prefix='/api/sustainability')
+    app.register_blueprint(tracking_bp, url_prefix='/api/tracking')
+    return app
+
+
+def seed():
+    db.create_all()
+    db.session.execute(db.insert(Coffee), [
+        {'id': 'organic', 'name': 'Organic', 'price': 4.0, 'category': 'coffee', 'organic': True},
+        {'id': 'regular', 'name': 'Regular', 'price': 4.0, 'category': 'coffee', 'organic': False},
+    ])
+    db.session.execute(db.insert(User), [
+        {'id': f'u{size}', 'username': f'u{size}', 'email': f'u{size}@example.com', 'full_name': 'User'}
+        for size in HISTORY_SIZES
+    ])
+    start = datetime(2024, 1, 1)
+    for size in HISTORY_SIZES:
+        orders = [{'id': f'u{size}-{n}', 'customer_id': f'u{size}', 'total': 4.0,
+                   'status': 'completed' if n % 5 else 'cancelled', 'created_at': start + timedelta(minutes=n)}
+                  for n in range(size)]
+        items = [{'id': f'{order["id"]}-i', 'order_id': order['id'], 'coffee_id': 'organic' if n % 2 else 'regular',
+                  'quantity': 1, 'price': 4.0} for n, order in enumerate(orders)]
+        db.session.execute(db.insert(Order), orders)
+        db.session.execute(db.insert(OrderItem), items)
+    db.session.commit()
+
+
+def old_count(user_id):
+    """What get_user_green_points ran before: join-and-count over the user's orders"""
+    return db.session.query(Order).filter_by(customer_id=user_id).join(
+        OrderItem, OrderItem.order_id == Order.id).join(Coffee, Coffee.id == OrderItem.coffee_id).filter(
+        Coffee.organic == True).count()
+
+
+def timed(fn, runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(os.path.join(tmp, 'bench.db'))
+        client = app.test_client()
+        with app.app_context():
+            seed()
+            start = time.perf_counter()
+            added, accounts = recompute(db.session)
+            total = sum(HISTORY_SIZES)
+            print(f'recompute: {added:,} ledger rows, {accounts} balances from {total:,} orders '
+                  f'in {(time.perf_counter() - start) * 1000:.0f} ms')
+
+            print(f'{"orders":>8}  {"join-and-count":>15}  {"GET (balance row)":>18}')
+            for size in HISTORY_SIZES:
+                before = timed(lambda: old_count(f'u{size}'), 20)
+                after = timed(lambda: client.get(f'/api/sustainability/green-points/u{size}'), READS)
+                print(f'{size:>8,}  {before:>12.3f} ms  {after:>15.3f} ms')
+
+        earn = timed(lambda: client.post('/api/sustainability/green-points/u10/earn', json={'action': 'own_cup'}), AWARDS)
+        print(f'earn: {earn:.2f} ms per award (ledger insert + balance upsert + commit)')
+
+        with app.app_context():
+            pending = [order.id for order in Order.query.filter_by(customer_id='u1000', status='cancelled').limit(50)]
+        for order_id in pending:
+            client.post(f'/api/tracking/orders/{order_id}/update', json={'status': 'completed'})
+
+        with app.app_context():
+            incremental = {row.user_id: (row.points, row.eco_friendly_orders) for row in GreenPointsAccount.query}
+            added, _ = recompute(db.session)
+            rebuilt = {row.user_id: (row.points, row.eco_friendly_orders) for row in GreenPointsAccount.query}
+            assert added == 0 and incremental == rebuilt, (added, incremental, rebuilt)
+            print(f'incremental balances match a recompute: {rebuilt}')
+
+
+if __name__ == '__main__':
+    main()
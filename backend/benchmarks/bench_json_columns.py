@@ -0,0 +1,108 @@
+"""
+JSON Column Benchmark
+Menu and user serialization with the JSON fields re-parsed on every access
+(before) versus parsed once per loaded instance (after)
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_json_columns
+"""
+
+import json
+import random
+import time
+
+from flask import Flask
+
+from ..models.coffee import db, Coffee, User
+
+COFFEES = 2_000
+USERS = 20_000
+PASSES = 5
+TAGS = ['vegan', 'vegetarian', 'sugar-free', 'dairy-free', 'gluten-free', 'organic', 'keto']
+ALLERGENS = ['dairy', 'gluten', 'eggs', 'nuts', 'soy']
+INGREDIENTS = ['coffee beans', 'water', 'milk', 'oat milk', 'foam', 'sugar', 'cocoa', 'cream', 'vanilla']
+
+
+def coffee_dict_reparsed(coffee):
+    """Coffee.to_dict as consumers had to write it when the fields were raw text"""
+    data = coffee.to_dict()
+    for field in ('dietary_tags', 'allergens', 'ingredients', 'customization_options'):
+        raw = getattr(coffee, f'_{field}')
+        data[field] = json.loads(raw) if raw else None
+    return data
+
+
+def user_dict_reparsed(user):
+    data = user.to_dict()
+    for field in ('dietary_preferences', 'favorite_items', 'preferred_cafes'):
+        raw = getattr(user, f'_{field}')
+        data[field] = json.loads(raw) if raw else None
+    return data
+
+
+def seed():
+    random.seed(12)
+    db.session.execute(db.insert(Coffee), [
+        {
+            'id': f'c{i}', 'name': f'Coffee {i}', 'price': 100.0, 'category': 'coffee',
+            '_dietary_tags': json.dumps(random.sample(TAGS, 3)),
+            '_allergens': json.dumps(random.sample(ALLERGENS, 2)),
+            '_ingredients': json.dumps(random.sample(INGREDIENTS, 5)),
+            '_customization_options': json.dumps({
+                'size': ['small', 'regular', 'large'], 'milk': ['dairy', 'oat', 'almond'], 'shots': [1, 2, 3]
+            })
+        }
+        for i in range(COFFEES)
+    ])
+    db.session.execute(db.insert(User), [
+        {
+            'id': f'u{i}', 'username': f'user{i}', 'email': f'user{i}@example.com', 'full_name': f'User {i}',
+            '_dietary_preferences': json.dumps(random.sample(TAGS, 2)),
+            '_favorite_items': json.dumps([f'c{random.randrange(COFFEES)}' for _ in range(5)]),
+            '_preferred_cafes': json.dumps([f'k{random.randrange(500)}' for _ in range(2)])
+        }
+        for i in range(USERS)
+    ])
+    db.session.commit()
+
+
+def measure(label, items, serialize):
+    first = time.perf_counter()
+    for item in items:
+        serialize(item)
+    first = time.perf_counter() - first
+
+    repeat = time.perf_counter()
+    for _ in range(PASSES):
+        for item in items:
+            serialize(item)
+    repeat = (time.perf_counter() - repeat) / PASSES
+
+    print(f'{label:<18} first pass {len(items) / first:>10,.0f}/s   '
+          f'repeat passes {len(items) / repeat:>10,.0f}/s')
+
+
+def main():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        seed()
+
+        # Separate instances per variant so the "after" cache starts cold
+        for label, model, serialize in (
+            ('menu   before', Coffee, coffee_dict_reparsed),
+            ('menu   after', Coffee, Coffee.to_dict),
+            ('users  before', User, user_dict_reparsed),
+            ('users  after', User, User.to_dict),
+        ):
+            db.session.expunge_all()
+            items = model.query.all()
+            measure(label, items, serialize)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Kitchen Display Benchmark
+A café rush at 40 orders per minute on top of a backlog of open orders: each
+tablet cycle reads the display queue and advances every stage with one batch
+transition, next to the same cycle done one order per request; reports
+latency, statements per call and how many rush-minutes a second of server
+time covers
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_kitchen_display [--backlog 200] [--cycles 60]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import event
+
+from ..models.coffee import db, Cafe, Coffee, User
+from ..routes.orders import orders_bp
+from ..routes.tracking import tracking_bp
+
+ORDERS_PER_MINUTE = 40
+BATCH = 10  # orders per tablet cycle: 15 seconds of the rush
+STAGES = (('confirmed', 'preparing'), ('preparing', 'ready'), ('ready', 'completed'))
+COFFEES = 8
+
+
+def create_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(orders_bp, url_prefix='/api/orders')
+    app.register_blueprint(tracking_bp, url_prefix='/api/tracking')
+    return app
+
+
+def seed():
+    db.create_all()
+    cafe = Cafe(name='CCD Rush', address='1 Main St', city='Bengaluru', state='KA', pincode='560001',
+                latitude=12.97, longitude=77.59)
+    db.session.add(cafe)
+    db.session.add(User(id='u1', username='u1', email='u1@example.com', full_name='User'))
+    db.session.execute(db.insert(Coffee), [
+        {'id': f'c{n}', 'name': f'Coffee {n}', 'price': 4.0, 'category': 'coffee', 'stock_quantity': 10 ** 7,
+         'preparation_time': 2 + n % 4, 'organic': n % 2 == 0}
+        for n in range(COFFEES)
+    ])
+    db.session.commit()
+    return cafe.id
+
+
+class Statements:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def place(client, cafe_id, n):
+    response = client.post('/api/orders/', json={
+        'customer_id': 'u1', 'cafe_id': cafe_id, 'order_type': ('dine_in', 'takeaway', 'delivery')[n % 3],
+        'items': [{'coffee_id': f'c{n % COFFEES}', 'quantity': 1}, {'coffee_id': f'c{(n + 3) % COFFEES}', 'quantity': 1}],
+    })
+    return response.get_json()['data']['id']
+
+
+def oldest(queue, status, count):
+    return [ticket['order_id'] for ticket in queue if ticket['status'] == status][:count]
+
+
+def batched_cycle(client, cafe_id, placed, timings):
+    """Confirm the new orders, then move the first BATCH of each stage along, one request per stage"""
+    def call(name, method, path, **kwargs):
+        start = time.perf_counter()
+        response = method(path, **kwargs)
+        timings.setdefault(name, []).append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+
+    call('batch confirm', client.post, f'/api/tracking/kitchen/{cafe_id}/transitions',
+         json={'order_ids': placed, 'status': 'confirmed', 'from_status': 'pending'})
+    queue = call('GET queue', client.get, f'/api/tracking/kitchen/{cafe_id}/queue')['data']
+    for current, following in STAGES:
+        order_ids = oldest(queue, current, BATCH)
+        if order_ids:
+            call(f'batch {following}', client.post, f'/api/tracking/kitchen/{cafe_id}/transitions',
+                 json={'order_ids': order_ids, 'status': following, 'from_status': current})
+    return len(queue)
+
+
+def single_cycle(client, cafe_id, placed, timings):
+    """The same cycle with one POST /orders/<id>/update per order"""
+    start = time.perf_counter()
+    for order_id in placed:
+        client.post(f'/api/tracking/orders/{order_id}/update', json={'status': 'confirmed'})
+    queue = client.get(f'/api/tracking/kitchen/{cafe_id}/queue').get_json()['data']
+    for current, following in STAGES:
+        for order_id in oldest(queue, current, BATCH):
+            response = client.post(f'/api/tracking/orders/{order_id}/update', json={'status': following})
+            assert response.status_code == 200, response.get_json()
+    timings.append(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backlog', type=int, default=200, help='open orders already on the display')
+    parser.add_argument('--cycles', type=int, default=60, help='tablet cycles of BATCH new orders each')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            cafe_id = seed()
+        client = app.test_client()
+
+        backlog = [place(client, cafe_id, n) for n in range(args.backlog)]
+        for start in range(0, len(backlog), 100):
+            client.post(f'/api/tracking/kitchen/{cafe_id}/transitions',
+                        json={'order_ids': backlog[start:start + 100], 'status': 'confirmed'})
+
+        with app.app_context():
+            statements = Statements()
+            event.listen(db.engine, 'before_cursor_execute', statements)
+        counts = {}
+
+        def counted(name, method, path, **kwargs):
+            before = statements.count
+            response = method(path, **kwargs)
+            counts[name] = statements.count - before
+            return response
+
+        n = args.backlog
+        placed = [place(client, cafe_id, n + i) for i in range(BATCH)]
+        n += BATCH
+        counted('batch confirm', client.post, f'/api/tracking/kitchen/{cafe_id}/transitions',
+                json={'order_ids': placed, 'status': 'confirmed'})
+        queue = counted('GET queue', client.get, f'/api/tracking/kitchen/{cafe_id}/queue').get_json()['data']
+        counted('batch ready', client.post, f'/api/tracking/kitchen/{cafe_id}/transitions',
+                json={'order_ids': oldest(queue, 'confirmed', BATCH), 'status': 'ready'})
+        queue = client.get(f'/api/tracking/kitchen/{cafe_id}/queue').get_json()['data']
+        counted('batch completed', client.post, f'/api/tracking/kitchen/{cafe_id}/transitions',
+                json={'order_ids': oldest(queue, 'ready', BATCH), 'status': 'completed'})
+        counted('single update', client.post, f'/api/tracking/orders/{oldest(queue, "confirmed", 1)[0]}/update',
+                json={'status': 'preparing'})
+
+        timings, sizes = {}, []
+        begin = time.perf_counter()
+        for _ in range(args.cycles):
+            placed = [place(client, cafe_id, n + i) for i in range(BATCH)]
+            n += BATCH
+            cycle = time.perf_counter()
+            sizes.append(batched_cycle(client, cafe_id, placed, timings))
+            timings.setdefault('cycle', []).append(time.perf_counter() - cycle)
+        total = time.perf_counter() - begin
+
+        single = []
+        for _ in range(max(args.cycles // 4, 1)):
+            placed = [place(client, cafe_id, n + i) for i in range(BATCH)]
+            n += BATCH
+            single_cycle(client, cafe_id, placed, single)
+
+    rush_minutes = args.cycles * BATCH / ORDERS_PER_MINUTE
+    print(f'{args.backlog} orders of backlog, {args.cycles} cycles of {BATCH} orders '
+          f'({rush_minutes:.0f} rush minutes at {ORDERS_PER_MINUTE}/min), '
+          f'display held {min(sizes)}-{max(sizes)} tickets')
+    for name, values in timings.items():
+        if name == 'cycle':
+            continue
+        print(f'{name:<16} {statistics.median(values) * 1000:>7.2f} ms median  '
+              f'{sorted(values)[int(len(values) * 0.95)] * 1000:>7.2f} ms p95'
+              + (f'   {counts[name]} statements' if name in counts else ''))
+    print(f'single update    {counts["single update"]:>17} statements per order')
+    batched = statistics.median(timings['cycle'])
+    one_by_one = statistics.median(single)
+    print(f'tablet cycle     {batched * 1000:>7.2f} ms batched   {one_by_one * 1000:>7.2f} ms one order per request '
+          f'({one_by_one / batched:.1f}x)')
+    print(f'rush capacity    {rush_minutes * 60 / total:>7.0f} rush-seconds per second of server time '
+          f'(incl. placing the orders)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Kitchen ETA Benchmark
+Discrete-event simulation of one café holding a steady number of open orders:
+baristas take orders first come first served and take a noisy version of each
+order's planned time; the scheduler's ETAs are scored against when orders were
+really ready, next to the previous "preparation start + 10 minutes" estimate
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_kitchen_eta [--orders 500] [--baristas 2 4 8]
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import time
+
+from ..services.kitchen_scheduler import KitchenQueue
+
+PREPARATION_MINUTES = (2, 3, 4, 5, 6)  # per item, as in Coffee.preparation_time
+MAX_ITEMS = 3
+NOISE = 0.3  # sigma of the lognormal factor between planned and real preparation time
+OLD_ESTIMATE_SECONDS = 600
+ETA_READS = 200_000
+
+
+def order_seconds(rng):
+    return 60.0 * sum(rng.choice(PREPARATION_MINUTES) for _ in range(rng.randint(1, MAX_ITEMS)))
+
+
+def simulate(open_orders, baristas, completions, seed=5):
+    """Keep `open_orders` in the kitchen (a new order arrives as each one is ready) and score every ETA"""
+    rng = random.Random(seed)
+    queue = KitchenQueue(baristas)
+    planned, actual, arrived, started = {}, {}, {}, {}
+    at_confirmation, at_start = {}, {}
+    costs = {'add': [], 'start': [], 'remove': []}
+    waiting = []  # (key, order id), first come first served
+    events = []  # (ready time, order id, order id)
+    next_id = 0
+
+    def confirm(now):
+        nonlocal next_id
+        order_id = next_id
+        next_id += 1
+        seconds = order_seconds(rng)
+        planned[order_id] = seconds
+        actual[order_id] = seconds * rng.lognormvariate(-NOISE ** 2 / 2, NOISE)
+        arrived[order_id] = now
+        key = (now, order_id)
+        heapq.heappush(waiting, (key, order_id))
+        begin = time.perf_counter()
+        queue.add(order_id, key, seconds, now=now)
+        costs['add'].append(time.perf_counter() - begin)
+        at_confirmation[order_id] = queue.eta(order_id, now=now)
+
+    def start_next(now):
+        _, order_id = heapq.heappop(waiting)
+        begin = time.perf_counter()
+        started[order_id] = now
+        queue.start(order_id, now, now=now)
+        costs['start'].append(time.perf_counter() - begin)
+        at_start[order_id] = queue.eta(order_id, now=now)
+        heapq.heappush(events, (now + actual[order_id], order_id, order_id))
+
+    for _ in range(open_orders):
+        confirm(0.0)
+    for _ in range(baristas):
+        start_next(0.0)
+
+    errors = {'confirmation': [], 'start': [], 'old': [], 'lead': []}
+    done = 0
+    while done < completions:
+        now, _, order_id = heapq.heappop(events)
+        begin = time.perf_counter()
+        queue.remove(order_id, now=now)
+        costs['remove'].append(time.perf_counter() - begin)
+        done += 1
+        # Orders confirmed once the kitchen was already running, so their plan saw a real queue
+        if arrived[order_id] > 0:
+            errors['confirmation'].append(abs(at_confirmation[order_id] - now))
+            errors['start'].append(abs(at_start[order_id] - now))
+            errors['old'].append(abs(started[order_id] + OLD_ESTIMATE_SECONDS - now))
+            errors['lead'].append(now - arrived[order_id])
+        confirm(now)
+        start_next(now)
+
+    waits = [started[order_id] - arrived[order_id] for order_id in started if arrived[order_id] > 0]
+    return queue, errors, costs, statistics.mean(waits) if waits else 0.0
+
+
+def micro(values):
+    return f'{statistics.mean(values) * 1e6:>7.1f} µs mean  {sorted(values)[int(len(values) * 0.99)] * 1e6:>7.1f} µs p99'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=500, help='open orders held per café')
+    parser.add_argument('--baristas', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--completions', type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f'{args.orders} open orders per café, {args.completions:,} orders served, '
+          f'real time = planned x lognormal(sigma {NOISE})')
+    for baristas in args.baristas:
+        queue, errors, costs, wait = simulate(args.orders, baristas, args.completions)
+        print(f'\n{baristas} baristas (mean wait {wait / 60:.0f} min)')
+        error = statistics.mean(errors['confirmation'])
+        print(f'  ETA error at confirmation   {error / 60:>7.1f} min mean abs '
+              f'({error / statistics.mean(errors["lead"]):.1%} of the time to ready; before: no estimate)')
+        print(f'  ETA error at start          {statistics.mean(errors["start"]) / 60:>7.1f} min mean abs')
+        print(f'  start + 10 min (before)     {statistics.mean(errors["old"]) / 60:>7.1f} min mean abs')
+        for name in ('add', 'start', 'remove'):
+            print(f'  {name:<8} {micro(costs[name])}')
+
+        order_ids = list(queue._by_order)
+        rng = random.Random(1)
+        reads = [rng.choice(order_ids) for _ in range(ETA_READS)]
+        begin = time.perf_counter()
+        for order_id in reads:
+            queue.eta(order_id, now=0.0)
+        print(f'  eta      {(time.perf_counter() - begin) / ETA_READS * 1e6:>7.2f} µs per read')
+
+        rows = [(ticket.order_id, ticket.key, ticket.seconds, ticket.started_at) for ticket in queue._tickets]
+        begin = time.perf_counter()
+        KitchenQueue(baristas).load(rows, now=0.0)
+        print(f'  full re-plan of {len(rows)} orders {(time.perf_counter() - begin) * 1e6:>9.1f} µs (resync)')
+
+
+if __name__ == '__main__':
+    main()
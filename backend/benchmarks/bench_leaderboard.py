@@ -0,0 +1,54 @@
+"""
+Leaderboard Benchmark
+Measures build, point-update, rank and top-N latency with millions of members
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_leaderboard
+"""
+
+import random
+import time
+
+from ..services.leaderboard import LeaderboardRegistry
+
+MEMBERS = 1_000_000
+CITIES = ['Mumbai', 'Delhi', 'Bangalore', 'Chennai', 'Kolkata', 'Pune', 'Hyderabad']
+OPS = 20_000
+
+
+def main():
+    random.seed(7)
+    registry = LeaderboardRegistry()
+
+    start = time.perf_counter()
+    for i in range(MEMBERS):
+        city = CITIES[i % len(CITIES)]
+        registry.update(str(i), random.randrange(10_000), username=f'user{i}', city=city, cafe_id=f'{city}-{i % 200}')
+    registry.loaded = True
+    print(f'build:   {time.perf_counter() - start:.1f} s for {MEMBERS:,} members')
+
+    ids = [str(random.randrange(MEMBERS)) for _ in range(OPS)]
+
+    start = time.perf_counter()
+    for user_id in ids:
+        registry.update(user_id, random.randrange(10_000))
+    print(f'update:  {(time.perf_counter() - start) / OPS * 1e6:.1f} us/op')
+
+    start = time.perf_counter()
+    for user_id in ids:
+        registry.rank(user_id)
+    print(f'rank:    {(time.perf_counter() - start) / OPS * 1e6:.1f} us/op (global)')
+
+    start = time.perf_counter()
+    for user_id in ids:
+        registry.rank(user_id, city='Mumbai')
+    print(f'rank:    {(time.perf_counter() - start) / OPS * 1e6:.1f} us/op (city)')
+
+    start = time.perf_counter()
+    for i in range(OPS):
+        registry.top(10, offset=i % 1000)
+    print(f'top-10:  {(time.perf_counter() - start) / OPS * 1e6:.1f} us/op')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Bulk Loyalty Award Benchmark
+Awards points to many users through award_points_bulk and reports records/sec
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_loyalty_bulk [awards]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+from ..models.coffee import db, User
+from ..services.loyalty_ledger import award_points_bulk
+
+USERS = 100_000
+
+
+def main():
+    awards = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(User), [
+                {'id': f'u{i}', 'username': f'user{i}', 'email': f'user{i}@example.com',
+                 'full_name': f'User {i}', 'loyalty_points': 0}
+                for i in range(USERS)
+            ])
+            db.session.commit()
+
+            records = (
+                (f'u{random.randrange(USERS)}', random.randint(1, 50), 'Double points day', None)
+                for _ in range(awards)
+            )
+            start = time.perf_counter()
+            applied = sum(1 for outcome in award_points_bulk(records) if outcome['success'])
+            elapsed = time.perf_counter() - start
+
+            total_points = db.session.query(db.func.sum(User.loyalty_points)).scalar()
+            ledger_points = db.session.execute(db.text('SELECT SUM(points) FROM loyalty_transactions')).scalar()
+
+        print(f'awards applied:  {applied:,} in {elapsed:.1f} s ({applied / elapsed:,.0f} records/sec)')
+        print(f'balance check:   users={total_points:,} ledger={ledger_points:,}')
+        assert total_points == ledger_points
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Request Metrics Benchmark
+Per-request overhead of the metrics hooks and SQL listeners (two identical apps,
+one instrumented, timed in alternating rounds) and the cost of a scrape after
+many threads have recorded into their own shards
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_metrics
+"""
+
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from flask import Flask
+
+from ..models.coffee import db, Coffee, Order, OrderItem, OrderTracking, User
+from ..routes.sustainability import sustainability_bp
+from ..routes.tracking import tracking_bp
+from ..services import metrics
+
+ROUNDS = 7
+REQUESTS_PER_ROUND = 600
+SCRAPE_THREADS = 64
+SCRAPE_REQUESTS_PER_THREAD = 200
+
+
+def create_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(sustainability_bp, url_prefix='/api/sustainability')
+    app.register_blueprint(tracking_bp, url_prefix='/api/tracking')
+    return app
+
+
+def seed():
+    db.create_all()
+    db.session.execute(db.insert(User), [{'id': 'u1', 'username': 'u1', 'email': 'u1@example.com',
+                                          'full_name': 'User'}])
+    db.session.execute(db.insert(Coffee), [{'id': 'c1', 'name': 'Coffee', 'price': 4.0, 'category': 'coffee'}])
+    db.session.execute(db.insert(Order), [{'id': 'o1', 'customer_id': 'u1', 'total': 4.0, 'status': 'preparing',
+                                           'created_at': datetime(2024, 1, 1)}])
+    db.session.execute(db.insert(OrderItem), [{'id': 'i1', 'order_id': 'o1', 'coffee_id': 'c1', 'quantity': 1,
+                                               'price': 4.0}])
+    db.session.execute(db.insert(OrderTracking), [
+        {'id': f't{n}', 'order_id': 'o1', 'status': 'preparing', 'message': '-', 'created_at': datetime(2024, 1, 1)}
+        for n in range(5)
+    ])
+    db.session.commit()
+
+
+PATHS = (
+    '/api/sustainability/impact',
+    '/api/sustainability/green-points/u1',
+    '/api/tracking/orders/o1/status',
+)
+
+
+def round_seconds(client):
+    start = time.perf_counter()
+    for n in range(REQUESTS_PER_ROUND):
+        assert client.get(PATHS[n % len(PATHS)]).status_code == 200
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        plain = create_app(db_path)
+        with plain.app_context():
+            seed()
+        instrumented = create_app(db_path)
+        registry = metrics.init_app(instrumented, db)
+
+        clients = {'plain': plain.test_client(), 'metrics': instrumented.test_client()}
+        for client in clients.values():
+            round_seconds(client)  # warm up
+        timings = {name: [] for name in clients}
+        for _ in range(ROUNDS):
+            for name, client in clients.items():
+                timings[name].append(round_seconds(client))
+
+        per_request = {name: statistics.median(values) / REQUESTS_PER_ROUND * 1e6 for name, values in timings.items()}
+        print(f'{len(PATHS)} endpoints (1-2 SQL statements each), median of {ROUNDS} rounds x {REQUESTS_PER_ROUND}')
+        print(f'without metrics   {per_request["plain"]:>8.1f} us per request')
+        print(f'with metrics      {per_request["metrics"]:>8.1f} us per request '
+              f'(+{per_request["metrics"] - per_request["plain"]:.1f} us, '
+              f'{(per_request["metrics"] / per_request["plain"] - 1) * 100:+.1f}%)')
+
+        def worker():
+            client = instrumented.test_client()
+            for n in range(SCRAPE_REQUESTS_PER_THREAD):
+                client.get(PATHS[n % len(PATHS)])
+
+        threads = [threading.Thread(target=worker) for _ in range(SCRAPE_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        start = time.perf_counter()
+        body = registry.render()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f'scrape            {elapsed:>8.2f} ms after {SCRAPE_THREADS} threads '
+              f'({len(body.splitlines())} lines, {len(body):,} bytes)')
+
+        expected = REQUESTS_PER_ROUND * (ROUNDS + 1) + SCRAPE_THREADS * SCRAPE_REQUESTS_PER_THREAD
+        recorded = sum(stats.finished for stats in registry.snapshot().endpoints.values())
+        assert recorded == expected, f'{recorded} requests recorded, expected {expected}'
+        print(f'all {recorded:,} requests accounted for after their threads exited')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Order Creation Concurrency Benchmark
+Many threads race to order the last few units of one item; reports
+throughput and verifies stock never goes negative
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_order_concurrency
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from flask import Flask
+
+from ..models.coffee import db, Coffee
+from ..routes.orders import orders_bp
+
+THREADS = 32
+ORDERS_PER_THREAD = 25
+INITIAL_STOCK = 50
+
+
+def create_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(orders_bp, url_prefix='/api/orders')
+    return app
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            coffee = Coffee(name='Espresso', price=3.50, category='coffee', stock_quantity=INITIAL_STOCK)
+            db.session.add(coffee)
+            db.session.commit()
+            coffee_id = coffee.id
+
+        outcomes = {}
+        lock = threading.Lock()
+
+        def worker(n):
+            client = app.test_client()
+            for i in range(ORDERS_PER_THREAD):
+                response = client.post('/api/orders/', json={
+                    'customer_id': f'user-{n}',
+                    'items': [{'coffee_id': coffee_id, 'quantity': 1, 'price': 0.01}]
+                })
+                with lock:
+                    outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        with app.app_context():
+            final_stock = db.session.get(Coffee, coffee_id).stock_quantity
+
+        attempts = THREADS * ORDERS_PER_THREAD
+        sold = outcomes.get(201, 0)
+        print(f'attempts:        {attempts}')
+        print(f'throughput:      {attempts / elapsed:.0f} requests/sec')
+        print(f'outcomes:        {dict(sorted(outcomes.items()))}')
+        print(f'units sold:      {sold} (initial stock {INITIAL_STOCK})')
+        print(f'final stock:     {final_stock}')
+        assert final_stock >= 0, 'stock went negative'
+        assert sold + final_stock == INITIAL_STOCK, 'sold units do not match stock decrement'
+
+
+if __name__ == '__main__':
+    main()
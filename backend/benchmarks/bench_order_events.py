@@ -0,0 +1,195 @@
+"""
+Order Event Stream Load Test
+Starts the production server with a single worker, holds thousands of idle
+Server-Sent Events connections to /api/tracking/orders/<id>/stream on it and
+reports the worker's memory per subscriber, publish-to-delivery latency of
+status updates and how ordinary requests fare meanwhile
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_order_events [--subscribers 5000] [--threads 4]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import selectors
+import socket
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from ..services.prefork import rss_kib
+from . import loadtest
+
+SUBSCRIBERS_PER_ORDER = 2
+NEXT_STATUS = {'pending': 'confirmed', 'preparing': 'ready'}  # neither ends the stream
+HEALTH_REQUESTS = 200
+CONNECT_TIMEOUT = 120
+
+
+class Stream:
+    """One raw-socket SSE connection and the tracking events it has received"""
+
+    def __init__(self, port, order_id):
+        self.order_id = order_id
+        self.socket = socket.create_connection(('127.0.0.1', port))
+        self.socket.sendall(f'GET /api/tracking/orders/{order_id}/stream HTTP/1.1\r\n'
+                            f'Host: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n'.encode())
+        self.socket.setblocking(False)
+        self.data = b''
+        self.ready = False
+        self.events = 0
+        self.received_at = None
+
+    def read(self):
+        chunk = self.socket.recv(65536)
+        if not chunk:
+            raise ConnectionError(f'stream for {self.order_id} closed: {self.data[:200]!r}')
+        self.data += chunk
+        if not self.ready:
+            if not self.data.startswith(b'HTTP/1.1 200'):
+                raise ConnectionError(f'stream for {self.order_id} refused: {self.data[:200]!r}')
+            self.ready = b'retry:' in self.data
+        events = self.data.count(b'event: tracking')
+        if events > self.events:
+            self.events = events
+            self.received_at = time.perf_counter()
+
+
+def request(port, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                       headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.status
+
+
+def worker_pid(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as handle:
+        return int(handle.read().split()[0])
+
+
+def thread_count(pid):
+    with open(f'/proc/{pid}/status') as handle:
+        for line in handle:
+            if line.startswith('Threads:'):
+                return int(line.split()[1])
+    return 0
+
+
+def health_latencies(port):
+    latencies = []
+    for _ in range(HEALTH_REQUESTS):
+        start = time.perf_counter()
+        assert request(port, 'GET', '/api/health') == 200
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+
+def milliseconds(latencies):
+    return (f'{statistics.median(latencies) * 1e3:>7.2f} ms p50  '
+            f'{latencies[int(len(latencies) * 0.99)] * 1e3:>7.2f} ms p99')
+
+
+def pump(selector, until, timeout):
+    """Read whatever the streams send until `until()` holds; False on timeout"""
+    deadline = time.monotonic() + timeout
+    while not until():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        for key, _ in selector.select(min(remaining, 1.0)):
+            key.data.read()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--subscribers', type=int, default=5000, help='SSE connections held on the worker')
+    parser.add_argument('--threads', type=int, default=4, help='request threads of the worker')
+    parser.add_argument('--updates', type=int, default=200, help='orders whose status is advanced while streams are open')
+    parser.add_argument('--port', type=int, default=5790)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'events.db')
+        needed = -(-args.subscribers // SUBSCRIBERS_PER_ORDER)
+        # Half the seeded orders (5000 per scale step) are pending or preparing
+        loadtest.seed(db_path, needed // 2000 + 1)
+        with sqlite3.connect(db_path) as connection:
+            orders = connection.execute(
+                f"SELECT id, status FROM orders WHERE status IN ({', '.join('?' * len(NEXT_STATUS))}) ORDER BY id",
+                tuple(NEXT_STATUS),
+            ).fetchall()
+        if len(orders) < needed:
+            raise SystemExit(f'only {len(orders)} open orders for {needed} streams')
+        orders = orders[:needed]
+
+        server = loadtest.start_server(argparse.Namespace(
+            port=args.port, server='production', threads=args.threads, workers=1), db_path)
+        selector = selectors.DefaultSelector()
+        streams = []
+        try:
+            worker = worker_pid(server.pid)
+            idle = health_latencies(args.port)
+            before, threads_before = rss_kib(worker), thread_count(worker)
+
+            start = time.perf_counter()
+            for n in range(args.subscribers):
+                stream = Stream(args.port, orders[n // SUBSCRIBERS_PER_ORDER][0])
+                selector.register(stream.socket, selectors.EVENT_READ, stream)
+                streams.append(stream)
+            if not pump(selector, lambda: all(stream.ready for stream in streams), CONNECT_TIMEOUT):
+                raise SystemExit(f'{sum(not stream.ready for stream in streams)} streams did not open')
+            opened = time.perf_counter() - start
+            time.sleep(1)
+            after, threads_after = rss_kib(worker), thread_count(worker)
+            busy = health_latencies(args.port)
+
+            by_order = {}
+            for stream in streams:
+                by_order.setdefault(stream.order_id, []).append(stream)
+            delivery, posts = [], []
+            for order_id, status in orders[:args.updates]:
+                subscribers = by_order[order_id]
+                events = [stream.events for stream in subscribers]
+                start = time.perf_counter()
+                assert request(args.port, 'POST', f'/api/tracking/orders/{order_id}/update',
+                               {'status': NEXT_STATUS[status]}) == 200
+                posts.append(time.perf_counter() - start)
+                if not pump(selector, lambda: all(s.events > e for s, e in zip(subscribers, events)), 10):
+                    raise SystemExit(f'update of {order_id} did not reach its subscribers')
+                delivery += [stream.received_at - start for stream in subscribers]
+            delivery.sort()
+            posts.sort()
+        finally:
+            for stream in streams:
+                selector.unregister(stream.socket)
+                stream.socket.close()
+            selector.close()
+            stop = time.perf_counter()
+            loadtest.stop_server(server)
+            stopped = time.perf_counter() - stop
+
+    per_subscriber = [(later - earlier) / args.subscribers for later, earlier in zip(after, before)]
+    print(f'1 worker, {args.threads} request threads, {args.subscribers:,} SSE connections '
+          f'on {len(orders):,} orders, opened in {opened:.1f} s')
+    print(f'worker memory        RSS {before[0] / 1024:.0f} -> {after[0] / 1024:.0f} MiB, '
+          f'PSS {before[1] / 1024:.0f} -> {after[1] / 1024:.0f} MiB')
+    print(f'per subscriber       {per_subscriber[0]:.1f} KiB RSS, {per_subscriber[1]:.1f} KiB PSS '
+          f'(threads {threads_before} -> {threads_after})')
+    print(f'GET /api/health      {milliseconds(idle)}   no streams')
+    print(f'GET /api/health      {milliseconds(busy)}   {args.subscribers:,} streams open')
+    print(f'POST status update   {milliseconds(posts)}')
+    print(f'update -> delivered  {milliseconds(delivery)}   '
+          f'({len(delivery):,} events to {SUBSCRIBERS_PER_ORDER} subscribers each)')
+    print(f'server stopped in    {stopped:.1f} s with streams closed by the clients')
+
+
+if __name__ == '__main__':
+    main()
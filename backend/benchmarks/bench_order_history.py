@@ -0,0 +1,139 @@
+"""
+Order History Benchmark
+Statements and latency to serialize one page of a customer's order history:
+lazy loading (the previous Order.to_dict path), joinedload of the whole graph,
+and the selectinload graph the history endpoint uses, which is also run with
+lazy loads set to raise
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_order_history
+"""
+
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload
+
+from ..models.coffee import db, Coffee, Order, OrderItem, User
+from ..routes.orders import orders_bp, ORDER_HISTORY_KEYSET
+from ..services import eager_loading
+from ..services.pagination import paginate
+
+CUSTOMERS = 200
+ORDERS_PER_CUSTOMER = 250
+LINES_PER_ORDER = 3
+COFFEES = 60
+PAGE = 50
+REPEATS = 100
+
+
+def create_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(orders_bp, url_prefix='/api/orders')
+    return app
+
+
+def seed():
+    rng = random.Random(11)
+    db.create_all()
+    db.session.execute(db.insert(User), [
+        {'id': f'u{n}', 'username': f'u{n}', 'email': f'u{n}@example.com', 'full_name': 'User'}
+        for n in range(CUSTOMERS)
+    ])
+    db.session.execute(db.insert(Coffee), [
+        {'id': f'c{n}', 'name': f'Coffee {n}', 'price': 4.0, 'category': 'coffee'} for n in range(COFFEES)
+    ])
+    start = datetime(2024, 1, 1)
+    for customer in range(CUSTOMERS):
+        orders, items = [], []
+        for n in range(ORDERS_PER_CUSTOMER):
+            order_id = f'u{customer}-o{n}'
+            orders.append({'id': order_id, 'customer_id': f'u{customer}', 'total': 12.0, 'status': 'completed',
+                           'created_at': start + timedelta(hours=n, minutes=customer)})
+            for line in range(LINES_PER_ORDER):
+                items.append({'id': f'{order_id}-{line}', 'order_id': order_id,
+                              'coffee_id': f'c{rng.randrange(COFFEES)}', 'quantity': 1, 'price': 4.0})
+        db.session.execute(db.insert(Order), orders)
+        db.session.execute(db.insert(OrderItem), items)
+    db.session.commit()
+
+
+def newest_first(statement):
+    return statement.where(Order.customer_id == 'u7').order_by(Order.created_at.desc(), Order.id.desc()).limit(PAGE)
+
+
+def lazy_page():
+    orders = db.session.execute(newest_first(db.select(Order))).scalars().all()
+    return [order.to_dict() for order in orders]
+
+
+def joined_page():
+    statement = newest_first(db.select(Order)).options(joinedload(Order.items).joinedload(OrderItem.coffee_item))
+    orders = db.session.execute(statement).unique().scalars().all()
+    return [order.to_dict() for order in orders]
+
+
+def graph_page(strict):
+    orders, _ = paginate(db.session, eager_loading.orders_for_customer('u7', strict=strict), ORDER_HISTORY_KEYSET,
+                         None, PAGE, scalars=True)
+    return [order.to_dict() for order in orders]
+
+
+def measure(page):
+    """(statements per page, median ms per page); every page starts from an empty session"""
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        db.session.remove()
+        result = page()
+        count = len(statements)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    timings = []
+    for _ in range(REPEATS):
+        db.session.remove()
+        start = time.perf_counter()
+        page()
+        timings.append(time.perf_counter() - start)
+    return result, count, statistics.median(timings) * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            seed()
+            print(f'{CUSTOMERS * ORDERS_PER_CUSTOMER:,} orders x {LINES_PER_ORDER} lines; '
+                  f'one page of {PAGE} orders, median of {REPEATS}')
+            baseline = None
+            for name, page in (('lazy (before)', lazy_page),
+                               ('joinedload', joined_page),
+                               ('selectin graph', lambda: graph_page(False)),
+                               ('selectin, strict', lambda: graph_page(True))):
+                result, count, ms = measure(page)
+                baseline = baseline or result
+                assert result == baseline, f'{name} serialized a different page'
+                print(f'{name:<18} {count:>4} statements   {ms:>7.2f} ms per page')
+
+        client = app.test_client()
+        eager_loading.RAISE_ON_LAZY_LOAD = True
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            response = client.get(f'/api/orders/history/u7?limit={PAGE}')
+            assert response.status_code == 200, response.get_json()
+        print(f'GET /history      {(time.perf_counter() - start) / REPEATS * 1000:>18.2f} ms per request '
+              f'(incl. Flask, lazy loads raising)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Pagination Benchmark
+Page latency at page 1 vs page 10,000 for cursor pagination through the
+routes, against the equivalent LIMIT/OFFSET query
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_pagination
+"""
+
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from ..models.coffee import db, Cafe, Event, LoyaltyTransaction, User
+from ..routes.events import events_bp
+from ..routes.loyalty import loyalty_bp
+from ..services.pagination import encode_cursor
+
+PER_PAGE = 50
+PAGES = 10_000
+ROWS = PER_PAGE * PAGES + PER_PAGE
+REPEAT = 20
+
+
+def seed():
+    now = datetime.utcnow()
+    cafe = Cafe(name='CCD Downtown', address='123 Main Street', city='Mumbai', state='Maharashtra', pincode='400001')
+    user = User(username='bench', email='bench@example.com', full_name='Bench User')
+    db.session.add_all([cafe, user])
+    db.session.flush()
+    for start in range(0, ROWS, 50_000):
+        db.session.execute(db.insert(LoyaltyTransaction), [
+            {
+                'id': str(uuid.uuid4()), 'user_id': user.id, 'transaction_type': 'earned', 'points': 10,
+                'description': 'Order reward', 'created_at': now - timedelta(seconds=i)
+            }
+            for i in range(start, min(start + 50_000, ROWS))
+        ])
+        db.session.execute(db.insert(Event), [
+            {
+                'id': str(uuid.uuid4()), 'cafe_id': cafe.id, 'title': f'Open mic {i}', 'event_type': 'open_mic',
+                'start_time': now + timedelta(hours=1, minutes=i), 'end_time': now + timedelta(hours=3, minutes=i),
+                'price': 0.0, 'is_active': True, 'created_at': now
+            }
+            for i in range(start, min(start + 50_000, ROWS))
+        ])
+    db.session.commit()
+    return user.id
+
+
+def timed(fn):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def report(label, client, url, key_query, offset_query):
+    """Page 1 and page 10,000 through the route, plus the same pages via OFFSET"""
+    deep_key = db.session.execute(key_query.offset((PAGES - 1) * PER_PAGE - 1).limit(1)).one()
+    cursor = encode_cursor(tuple(deep_key))
+
+    first = timed(lambda: client.get(url))
+    deep = timed(lambda: client.get(f'{url}&cursor={cursor}'))
+    first_offset = timed(lambda: db.session.execute(offset_query.limit(PER_PAGE)).all())
+    deep_offset = timed(lambda: db.session.execute(offset_query.offset((PAGES - 1) * PER_PAGE).limit(PER_PAGE)).all())
+
+    response = client.get(f'{url}&cursor={cursor}').get_json()
+    assert response['count'] == PER_PAGE, response
+    print(label)
+    print(f'   cursor (route)   page 1 {first:7.2f} ms   page {PAGES:,} {deep:7.2f} ms')
+    print(f'   OFFSET (query)   page 1 {first_offset:7.2f} ms   page {PAGES:,} {deep_offset:7.2f} ms')
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        app.register_blueprint(loyalty_bp, url_prefix='/api/loyalty')
+        app.register_blueprint(events_bp, url_prefix='/api/events')
+
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            user_id = seed()
+            print(f'seeded {ROWS:,} transactions and {ROWS:,} events in {time.perf_counter() - start:.1f} s\n')
+
+            client = app.test_client()
+            report(
+                'loyalty transactions', client, f'/api/loyalty/{user_id}/transactions?limit={PER_PAGE}',
+                db.select(LoyaltyTransaction.created_at, LoyaltyTransaction.id)
+                .where(LoyaltyTransaction.user_id == user_id)
+                .order_by(LoyaltyTransaction.created_at.desc(), LoyaltyTransaction.id.desc()),
+                db.select(LoyaltyTransaction).where(LoyaltyTransaction.user_id == user_id)
+                .order_by(LoyaltyTransaction.created_at.desc(), LoyaltyTransaction.id.desc())
+            )
+            report(
+                'events', client, f'/api/events/?limit={PER_PAGE}',
+                db.select(Event.start_time, Event.id).where(Event.is_active == True)
+                .order_by(Event.start_time, Event.id),
+                db.select(Event).where(Event.is_active == True, Event.start_time > datetime.now())
+                .order_by(Event.start_time, Event.id)
+            )
+
+
+if __name__ == '__main__':
+    main()
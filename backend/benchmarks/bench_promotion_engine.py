@@ -0,0 +1,56 @@
+"""
+Promotion Engine Benchmark
+Validations per second against 100k compiled promotions
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_promotion_engine
+"""
+
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from ..services.promotion_engine import CompiledPromotion, PromotionEngine
+
+PROMOTIONS = 100_000
+VALIDATIONS = 500_000
+CITIES = ['Mumbai', 'Delhi', 'New Delhi', 'Bangalore', 'Chennai', 'Pune', 'Kolkata']
+
+
+def main():
+    random.seed(3)
+    now = datetime.now()
+    engine = PromotionEngine()
+
+    start = time.perf_counter()
+    engine.load(
+        CompiledPromotion(
+            id=str(i), title=f'Promo {i}', code=f'CCD{i:06d}', promo_type='discount',
+            discount_percentage=random.choice([10.0, 20.0, 30.0]), max_discount=50.0,
+            min_order_amount=random.choice([None, 50.0, 100.0]),
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=30),
+            is_active=True, usage_limit=None, usage_count=0,
+            geo_targeted=i % 2 == 0, target_cities=json.dumps(random.sample(CITIES, 3))
+        )
+        for i in range(PROMOTIONS)
+    )
+    print(f'compile: {time.perf_counter() - start:.2f} s for {len(engine):,} promotions')
+
+    requests = [
+        (f'CCD{random.randrange(PROMOTIONS):06d}', random.uniform(20, 500), random.choice(CITIES))
+        for _ in range(VALIDATIONS)
+    ]
+    valid = 0
+    start = time.perf_counter()
+    for code, amount, city in requests:
+        discount, error = engine.get(code).validate(amount, city, now)
+        valid += error is None
+    elapsed = time.perf_counter() - start
+
+    print(f'validate: {VALIDATIONS / elapsed:,.0f} validations/sec ({elapsed / VALIDATIONS * 1e6:.2f} us each)')
+    print(f'accepted: {valid:,} / {VALIDATIONS:,}')
+
+
+if __name__ == '__main__':
+    main()
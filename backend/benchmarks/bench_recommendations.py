@@ -0,0 +1,136 @@
+"""
+Recommendations Benchmark
+Throughput of the nightly co-occurrence job (extrapolated to 50M order lines),
+spot checks of its pair counts against SQL, and latency of the item and user
+recommendation endpoints
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_recommendations [--orders N]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from ..models.coffee import db, Coffee, CoffeeRecommendation, Order, OrderItem, User, UserFavorite
+from ..routes.menu import menu_bp
+from ..services import recommendations
+
+COFFEES = 120
+CLUSTER = 6  # items that tend to be ordered together
+USERS = 5000
+DAYS = 365
+TARGET_LINES = 50_000_000
+READS = 1000
+
+
+def create_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(menu_bp, url_prefix='/api/menu')
+    return app
+
+
+def seed(orders_count):
+    """Orders of 1-5 lines, mostly drawn from one cluster of related items; returns the line count"""
+    rng = random.Random(3)
+    db.create_all()
+    db.session.execute(db.insert(Coffee), [
+        {'id': f'c{n:03d}', 'name': f'Coffee {n}', 'price': 4.0, 'category': 'coffee'} for n in range(COFFEES)
+    ])
+    db.session.execute(db.insert(User), [
+        {'id': f'u{n}', 'username': f'u{n}', 'email': f'u{n}@example.com', 'full_name': 'User'} for n in range(USERS)
+    ])
+    db.session.execute(db.insert(UserFavorite), [
+        {'id': f'f{n}', 'user_id': f'u{n}', 'coffee_id': f'c{n % COFFEES:03d}'} for n in range(0, USERS, 3)
+    ])
+    now = datetime.utcnow()
+    lines = 0
+    orders, items = [], []
+    for n in range(orders_count):
+        order_id = f'o{n:09d}'
+        orders.append({'id': order_id, 'customer_id': f'u{n % USERS}', 'total': 8.0,
+                       'status': 'cancelled' if n % 20 == 0 else 'completed',
+                       'created_at': now - timedelta(days=rng.random() * DAYS)})
+        cluster = rng.randrange(COFFEES // CLUSTER) * CLUSTER
+        for line in range(rng.randint(1, 5)):
+            coffee = cluster + rng.randrange(CLUSTER) if rng.random() < 0.7 else rng.randrange(COFFEES)
+            items.append({'id': f'{order_id}-{line}', 'order_id': order_id, 'coffee_id': f'c{coffee:03d}',
+                          'quantity': 1, 'price': 4.0})
+        if len(orders) == 50000:
+            db.session.execute(db.insert(Order), orders)
+            db.session.execute(db.insert(OrderItem), items)
+            lines += len(items)
+            orders, items = [], []
+    if orders:
+        db.session.execute(db.insert(Order), orders)
+        db.session.execute(db.insert(OrderItem), items)
+        lines += len(items)
+    db.session.commit()
+    return lines
+
+
+def sql_co_orders(a, b, since):
+    """Orders (not cancelled, inside the window) containing both items, counted by a self-join"""
+    return db.session.execute(db.text(
+        'SELECT COUNT(DISTINCT x.order_id) FROM order_items x '
+        'JOIN order_items y ON y.order_id = x.order_id AND y.coffee_id = :b '
+        'JOIN orders o ON o.id = x.order_id '
+        "WHERE x.coffee_id = :a AND o.status != 'cancelled' AND o.created_at >= :since"
+    ), {'a': a, 'b': b, 'since': since}).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            start = time.perf_counter()
+            lines = seed(args.orders)
+            print(f'seeded {args.orders:,} orders / {lines:,} lines in {time.perf_counter() - start:.0f}s')
+            plan = db.session.execute(db.text(
+                f'EXPLAIN QUERY PLAN {recommendations.ORDER_BASKETS.compile(db.engine)}')).all()
+            print('scan plan: ' + ' | '.join(row[-1] for row in plan))
+
+            start = time.perf_counter()
+            orders, pairs, rows = recommendations.rebuild(db.session)
+            elapsed = time.perf_counter() - start
+            print(f'nightly job        {elapsed:>8.1f} s   {lines / elapsed:>10,.0f} lines/s   '
+                  f'{orders:,} orders, {pairs:,} pairs, {rows:,} recommendations')
+            print(f'50M lines          {TARGET_LINES / (lines / elapsed) / 60:>8.1f} min (extrapolated)')
+
+            since = datetime.utcnow() - timedelta(days=recommendations.WINDOW_DAYS)
+            checked = db.session.execute(
+                db.select(CoffeeRecommendation).order_by(db.func.random()).limit(5)).scalars().all()
+            for recommendation in checked:
+                expected = sql_co_orders(recommendation.coffee_id, recommendation.recommended_id, since)
+                assert recommendation.co_orders == expected, (recommendation.to_dict(), expected)
+            same_cluster = db.session.execute(
+                db.select(CoffeeRecommendation).where(CoffeeRecommendation.rank == 1)).scalars().all()
+            clustered = sum(int(r.coffee_id[1:]) // CLUSTER == int(r.recommended_id[1:]) // CLUSTER
+                            for r in same_cluster)
+            print(f'{len(checked)} sampled pair counts match SQL; top pick shares the item\'s cluster '
+                  f'for {clustered}/{len(same_cluster)} items')
+
+        client = app.test_client()
+        for name, path in (('GET item recs', '/api/menu/c007/recommendations'),
+                           ('GET user recs', '/api/menu/recommendations/user/u3')):
+            assert client.get(path).get_json()['count'] == recommendations.DEFAULT_LIMIT
+            start = time.perf_counter()
+            for _ in range(READS):
+                client.get(path)
+            print(f'{name:<18} {(time.perf_counter() - start) / READS * 1000:>8.2f} ms per request (incl. Flask)')
+
+
+if __name__ == '__main__':
+    main()
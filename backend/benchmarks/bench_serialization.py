@@ -0,0 +1,109 @@
+"""
+Serialization Benchmark
+Rows/sec for 10k-row event and loyalty transaction lists: ORM + to_dict +
+jsonify versus the compiled extractors on ORM objects and on Core rows
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_serialization
+"""
+
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import Flask, jsonify
+
+from ..models.coffee import db, Cafe, Event, LoyaltyTransaction, User
+from ..services.serialization import dumps, event_serializer, loyalty_transaction_serializer, orjson
+
+ROWS = 10_000
+ROUNDS = 5
+
+
+def seed():
+    random.seed(13)
+    now = datetime.utcnow()
+    cafe = Cafe(name='CCD Downtown', address='123 Main Street', city='Mumbai', state='Maharashtra', pincode='400001')
+    user = User(username='bench', email='bench@example.com', full_name='Bench User')
+    db.session.add_all([cafe, user])
+    db.session.flush()
+    db.session.execute(db.insert(Event), [
+        {
+            'id': str(uuid.uuid4()), 'cafe_id': cafe.id, 'title': f'Brewflix night {i}',
+            'description': 'Movie night with unlimited filter coffee', 'event_type': 'brewflix',
+            'start_time': now + timedelta(hours=i), 'end_time': now + timedelta(hours=i + 3),
+            'max_capacity': 50, 'current_bookings': random.randrange(50), 'price': 150.0,
+            'image_url': '/static/images/brewflix.jpg', 'is_active': True, 'created_at': now
+        }
+        for i in range(ROWS)
+    ])
+    db.session.execute(db.insert(LoyaltyTransaction), [
+        {
+            'id': str(uuid.uuid4()), 'user_id': user.id, 'transaction_type': 'earned',
+            'points': random.randrange(1, 100), 'description': 'Order reward', 'order_id': None,
+            'created_at': now - timedelta(minutes=i)
+        }
+        for i in range(ROWS)
+    ])
+    db.session.commit()
+    return user.id
+
+
+def rate(build):
+    best = float('inf')
+    for _ in range(ROUNDS):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        body = build()
+        best = min(best, time.perf_counter() - start)
+    return ROWS / best, body
+
+
+def compare(label, query, serializer):
+    def to_dict_jsonify():
+        rows = [item.to_dict() for item in db.session.execute(query).scalars()]
+        return jsonify({'success': True, 'data': rows, 'count': len(rows)}).get_data()
+
+    def compiled_orm():
+        rows = serializer.objects(db.session.execute(query).scalars())
+        return dumps({'success': True, 'data': rows, 'count': len(rows)})
+
+    def compiled_core():
+        core = serializer.select().where(query.whereclause).order_by(*query._order_by_clauses)
+        rows = serializer.rows(db.session.execute(core))
+        return dumps({'success': True, 'data': rows, 'count': len(rows)})
+
+    print(label)
+    baseline = None
+    for name, build in (('to_dict + jsonify', to_dict_jsonify),
+                        ('compiled, ORM objects', compiled_orm),
+                        ('compiled, Core rows', compiled_core)):
+        rows_per_sec, body = rate(build)
+        data = json.loads(body)
+        baseline = baseline or data
+        assert data == baseline, f'{name} output differs from to_dict()'
+        print(f'   {name:<24} {rows_per_sec:>10,.0f} rows/sec')
+
+
+def main():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    print(f"encoder: {'orjson' if orjson else 'stdlib json'}; {ROWS:,} rows per list, best of {ROUNDS}")
+    with app.app_context():
+        db.create_all()
+        user_id = seed()
+        compare('events', db.select(Event).where(Event.is_active == True).order_by(Event.start_time.asc()),
+                event_serializer)
+        compare('loyalty transactions',
+                db.select(LoyaltyTransaction).where(LoyaltyTransaction.user_id == user_id)
+                .order_by(LoyaltyTransaction.created_at.desc()),
+                loyalty_transaction_serializer)
+
+
+if __name__ == '__main__':
+    main()
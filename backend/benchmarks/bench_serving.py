@@ -0,0 +1,109 @@
+"""
+Serving Benchmark
+Read-heavy HTTP load against the development server (`python main.py`) and the
+prefork production server, with per-process RSS/PSS after the run
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_serving
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from ..services.prefork import rss_kib
+
+PORT = 5099
+CLIENTS = 16
+DURATION = 10
+PATHS = ('/api/health', '/api/menu/', '/api/events/', '/api/cafes/', '/api/promotions/')
+
+CONFIGS = (
+    ('development', []),
+    ('prod 1x1', ['--production', '--workers', '1', '--threads', '1']),
+    ('prod 2x4', ['--production', '--workers', '2', '--threads', '4']),
+    ('prod 4x4', ['--production', '--workers', '4', '--threads', '4']),
+)
+
+
+def wait_ready(timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{PORT}/api/health', timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def client(n, stop, counts):
+    ok = errors = 0
+    i = n
+    while not stop.is_set():
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{PORT}{path}', timeout=10) as response:
+                response.read()
+            ok += 1
+        except OSError:
+            errors += 1
+    counts.append((ok, errors))
+
+
+def descendants(pid):
+    children = subprocess.run(['pgrep', '-P', str(pid)], capture_output=True, text=True).stdout.split()
+    result = []
+    for child in map(int, children):
+        result.append(child)
+        result.extend(descendants(child))
+    return result
+
+
+def run(name, args, db_path):
+    env = dict(os.environ, CCD_DATABASE_URL=f'sqlite:///{db_path}', CCD_PORT=str(PORT), CCD_HOST='127.0.0.1')
+    env.pop('CCD_SERVER', None)
+    server = subprocess.Popen([sys.executable, 'main.py', *args], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready()
+        stop = threading.Event()
+        counts = []
+        threads = [threading.Thread(target=client, args=(n, stop, counts)) for n in range(CLIENTS)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(DURATION)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        memory = [rss_kib(pid) for pid in [server.pid, *descendants(server.pid)]]
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    ok = sum(c[0] for c in counts)
+    errors = sum(c[1] for c in counts)
+    rss = sum(m[0] or 0 for m in memory)
+    pss = sum(m[1] or 0 for m in memory)
+    print(f'{name:<12} {ok / elapsed:>7,.0f} req/s   errors {errors:>4}   processes {len(memory)}   '
+          f'RSS {rss / 1024:>6.1f} MiB   PSS {pss / 1024:>6.1f} MiB')
+
+
+def main():
+    print(f'{CLIENTS} clients (new connection per request) for {DURATION}s over {", ".join(PATHS)}')
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        for name, args in CONFIGS:
+            run(name, args, db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Spatial Index Benchmark
+Compares grid-indexed radius and k-nearest café searches with a full scan
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_spatial_index
+"""
+
+import random
+import time
+
+from ..services.spatial_index import GridIndex, haversine_km
+
+SIZES = [10_000, 100_000]
+QUERIES = 1_000
+RADIUS_KM = 5
+K = 10
+
+
+def random_point():
+    # Roughly the bounding box of India
+    return random.uniform(8.0, 35.0), random.uniform(68.0, 97.0)
+
+
+def main():
+    random.seed(42)
+    print(f"{'cafés':>8} {'scan (ms)':>10} {'radius (us)':>12} {'k-nearest (us)':>15}")
+    for size in SIZES:
+        points = [random_point() for _ in range(size)]
+        index = GridIndex()
+        for i, (lat, lng) in enumerate(points):
+            index.insert(i, lat, lng)
+        queries = [random_point() for _ in range(QUERIES)]
+
+        start = time.perf_counter()
+        for lat, lng in queries[:50]:
+            sorted(d for d in (haversine_km(lat, lng, plat, plng) for plat, plng in points) if d <= RADIUS_KM)
+        scan_ms = (time.perf_counter() - start) / 50 * 1e3
+
+        start = time.perf_counter()
+        for lat, lng in queries:
+            index.within(lat, lng, RADIUS_KM)
+        radius_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+        start = time.perf_counter()
+        for lat, lng in queries:
+            index.nearest(lat, lng, K)
+        knn_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+        print(f'{size:>8} {scan_ms:>10.1f} {radius_us:>12.1f} {knn_us:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()
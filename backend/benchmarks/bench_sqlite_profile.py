@@ -0,0 +1,134 @@
+"""
+SQLite Profile Benchmark
+Write-heavy mix (order creation, stock updates, loyalty earns) from several
+worker processes against one database file, default vs production profile
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_sqlite_profile
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+from flask import Flask
+
+from ..models.coffee import db, Coffee, User
+from ..routes.loyalty import loyalty_bp
+from ..routes.orders import orders_bp
+from ..routes.tracking import tracking_bp
+from ..services.sqlite_profile import configure_database
+
+WORKERS = 8
+OPS_PER_WORKER = 300
+COFFEES = 20
+USERS = 200
+RAW_COMMITS = 3000
+
+
+def create_app(db_path, profile):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DATABASE_PROFILE'] = profile
+    configure_database(app, db)
+    app.register_blueprint(orders_bp, url_prefix='/api/orders')
+    app.register_blueprint(tracking_bp, url_prefix='/api/tracking')
+    app.register_blueprint(loyalty_bp, url_prefix='/api/loyalty')
+    return app
+
+
+def seed(app):
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(Coffee), [
+            {'id': f'c{i}', 'name': f'Coffee {i}', 'price': 120.0, 'category': 'coffee', 'stock_quantity': 10 ** 6}
+            for i in range(COFFEES)
+        ])
+        db.session.execute(db.insert(User), [
+            {'id': f'u{i}', 'username': f'user{i}', 'email': f'user{i}@example.com', 'full_name': f'User {i}',
+             'loyalty_points': 0}
+            for i in range(USERS)
+        ])
+        db.session.commit()
+
+
+def worker(db_path, profile, n, start_event, results):
+    app = create_app(db_path, profile)
+    client = app.test_client()
+    codes = {}
+    start_event.wait()
+    for i in range(OPS_PER_WORKER):
+        user_id = f'u{(n * OPS_PER_WORKER + i) % USERS}'
+        coffee_id = f'c{(n + i) % COFFEES}'
+        if i % 3 == 0:
+            response = client.post('/api/orders/', json={
+                'customer_id': user_id, 'items': [{'coffee_id': coffee_id, 'quantity': 1}]
+            })
+        elif i % 3 == 1:
+            response = client.post('/api/tracking/stock/update', json={
+                'coffee_id': coffee_id, 'quantity_change': -1, 'reason': 'sale'
+            })
+        else:
+            response = client.post(f'/api/loyalty/{user_id}/earn', json={'points': 5})
+        codes[response.status_code] = codes.get(response.status_code, 0) + 1
+    results.put(codes)
+
+
+def raw_commits(app):
+    """Single-row UPDATE + COMMIT loop: isolates the journal/fsync cost of a commit"""
+    with app.app_context():
+        start = time.perf_counter()
+        for i in range(RAW_COMMITS):
+            db.session.execute(
+                db.update(Coffee).where(Coffee.id == f'c{i % COFFEES}')
+                .values(stock_quantity=Coffee.stock_quantity - 1)
+            )
+            db.session.commit()
+        rate = RAW_COMMITS / (time.perf_counter() - start)
+        db.engine.dispose()  # workers are forked next; they must not inherit open connections
+        return rate
+
+
+def run(profile):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        app = create_app(db_path, profile)
+        seed(app)
+        commits = raw_commits(app)
+
+        context = multiprocessing.get_context('fork')
+        start_event = context.Event()
+        results = context.Queue()
+        processes = [
+            context.Process(target=worker, args=(db_path, profile, n, start_event, results))
+            for n in range(WORKERS)
+        ]
+        for process in processes:
+            process.start()
+        time.sleep(0.5)  # let every worker import and build its app
+        start = time.perf_counter()
+        start_event.set()
+        codes = {}
+        for _ in processes:
+            for code, count in results.get().items():
+                codes[code] = codes.get(code, 0) + count
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+
+    total = WORKERS * OPS_PER_WORKER
+    ok = sum(count for code, count in codes.items() if code < 300)
+    print(f'{profile:<11} {commits:>8,.0f} commits/sec (1 connection)   {total / elapsed:>6,.0f} requests/sec '
+          f'mixed   ok {ok:,}/{total:,}   status {dict(sorted(codes.items()))}')
+
+
+def main():
+    print(f'{WORKERS} worker processes x {OPS_PER_WORKER} writes (orders, stock, loyalty)')
+    for profile in ('default', 'production'):
+        run(profile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Startup Benchmark
+Fresh-process time to a ready app (import + init_db) on a new database, on a
+restart without a schema stamp (the previous unconditional create_all + seed
+check path) and on a restart with a matching stamp
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_startup
+"""
+
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RUNS = 7
+
+READY = '''
+import time
+start = time.perf_counter()
+from backend.app import app, init_db
+imported = time.perf_counter()
+init_db(app)
+ready = time.perf_counter()
+print(f"{imported - start} {ready - imported}")
+'''
+
+
+def start_once(db_path):
+    env = dict(os.environ, CCD_DATABASE_URL=f'sqlite:///{db_path}')
+    output = subprocess.run([sys.executable, '-c', READY], env=env, capture_output=True, text=True, check=True)
+    imported, init = map(float, output.stdout.split()[-2:])
+    return imported, init
+
+
+def drop_stamp(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.execute('DROP TABLE IF EXISTS schema_version')
+    connection.commit()
+    connection.close()
+
+
+def report(name, samples):
+    imported = statistics.median(sample[0] for sample in samples) * 1000
+    init = statistics.median(sample[1] for sample in samples) * 1000
+    print(f'{name:<26} import {imported:>7.1f} ms   init_db {init:>7.1f} ms   ready {imported + init:>7.1f} ms')
+
+
+def main():
+    print(f'median of {RUNS} fresh processes')
+    with tempfile.TemporaryDirectory() as tmp:
+        samples = []
+        for n in range(RUNS):
+            samples.append(start_once(os.path.join(tmp, f'new{n}.db')))
+        report('new database', samples)
+
+        db_path = os.path.join(tmp, 'existing.db')
+        start_once(db_path)
+        samples = []
+        for _ in range(RUNS):
+            drop_stamp(db_path)
+            samples.append(start_once(db_path))
+        report('restart, no stamp', samples)
+
+        start_once(db_path)
+        report('restart, stamp matches', [start_once(db_path) for _ in range(RUNS)])
+
+
+if __name__ == '__main__':
+    main()
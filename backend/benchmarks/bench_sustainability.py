@@ -0,0 +1,139 @@
+"""
+Sustainability Impact Benchmark
+/impact served from the rollup row vs the previous four aggregate queries,
+the per-completion cost of maintaining the rollups, and backfill throughput;
+also checks that incremental maintenance and the backfill agree
+
+Run from the repository root:
+    python -m backend.benchmarks.bench_sustainability
+"""
+
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from ..models.coffee import db, Cafe, Coffee, Order, OrderItem, SustainabilityAggregate, User
+from ..routes.sustainability import sustainability_bp
+from ..routes.tracking import tracking_bp
+from ..services.sustainability_rollup import COUNTERS, rebuild
+
+ORDERS = 200000
+LINES_PER_ORDER = 3
+CAFES = 20
+COFFEES = 40
+DAYS = 365
+COMPLETIONS = 500
+READS = 2000
+
+
+def create_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(sustainability_bp, url_prefix='/api/sustainability')
+    app.register_blueprint(tracking_bp, url_prefix='/api/tracking')
+    return app
+
+
+def seed():
+    rng = random.Random(7)
+    db.create_all()
+    db.session.execute(db.insert(User), [{'id': 'u1', 'username': 'u1', 'email': 'u1@example.com',
+                                          'full_name': 'User'}])
+    db.session.execute(db.insert(Cafe), [
+        {'id': f'k{i}', 'name': f'Café {i}', 'address': '-', 'city': 'Mumbai', 'state': 'MH', 'pincode': '400001',
+         'latitude': 19.0, 'longitude': 72.8}
+        for i in range(CAFES)
+    ])
+    db.session.execute(db.insert(Coffee), [
+        {'id': f'c{i}', 'name': f'Coffee {i}', 'price': 4.0, 'category': 'coffee', 'organic': i % 3 == 0,
+         'fair_trade': i % 2 == 0, 'carbon_footprint': 0.1 + i / 100,
+         'sustainability_rating': None if i % 10 == 9 else 3 + i % 3}
+        for i in range(COFFEES)
+    ])
+    start = datetime(2024, 1, 1)
+    orders, items = [], []
+    for n in range(ORDERS):
+        order_id = f'o{n:07d}'
+        orders.append({'id': order_id, 'customer_id': 'u1', 'total': 12.0,
+                       'status': 'completed' if n % 4 else 'pending', 'cafe_id': f'k{n % CAFES}',
+                       'created_at': start + timedelta(days=rng.randrange(DAYS), minutes=rng.randrange(1440))})
+        for line in range(LINES_PER_ORDER):
+            items.append({'id': f'{order_id}-{line}', 'order_id': order_id, 'coffee_id': f'c{rng.randrange(COFFEES)}',
+                          'quantity': rng.randint(1, 3), 'price': 4.0})
+        if len(orders) == 20000:
+            db.session.execute(db.insert(Order), orders)
+            db.session.execute(db.insert(OrderItem), items)
+            orders, items = [], []
+    if orders:
+        db.session.execute(db.insert(Order), orders)
+        db.session.execute(db.insert(OrderItem), items)
+    db.session.commit()
+
+
+def old_impact():
+    """The four queries /impact ran before the rollups (joins skipped OrderItem)"""
+    organic = db.session.query(Order).join(Coffee, Coffee.id == OrderItem.coffee_id).join(
+        OrderItem, OrderItem.order_id == Order.id).filter(Coffee.organic == True).count()
+    fair_trade = db.session.query(Order).join(Coffee, Coffee.id == OrderItem.coffee_id).join(
+        OrderItem, OrderItem.order_id == Order.id).filter(Coffee.fair_trade == True).count()
+    co2 = db.session.query(db.func.sum(Coffee.carbon_footprint)).select_from(Order).join(
+        OrderItem, OrderItem.order_id == Order.id).join(Coffee, Coffee.id == OrderItem.coffee_id).scalar()
+    rating = db.session.query(db.func.avg(Coffee.sustainability_rating)).scalar()
+    return organic, fair_trade, co2, rating
+
+
+def snapshot():
+    return {
+        (row.cafe_id, row.period): tuple(round(getattr(row, name), 6) for name in COUNTERS)
+        for row in SustainabilityAggregate.query.all()
+    }
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            seed()
+            print(f'{ORDERS:,} orders x {LINES_PER_ORDER} lines, {CAFES} cafés, {DAYS} days')
+
+            start = time.perf_counter()
+            orders, rows = rebuild(db.session)
+            elapsed = time.perf_counter() - start
+            print(f'backfill           {elapsed:>8.2f} s   {orders / elapsed:>9,.0f} orders/s '
+                  f'({orders * LINES_PER_ORDER / elapsed:,.0f} lines/s)   {rows:,} rollup rows')
+
+            start = time.perf_counter()
+            for _ in range(3):
+                old_impact()
+            print(f'/impact before     {(time.perf_counter() - start) / 3 * 1000:>8.1f} ms per request (4 aggregate queries)')
+
+            pending = [order_id for (order_id,) in
+                       db.session.query(Order.id).filter(Order.status == 'pending').limit(COMPLETIONS)]
+
+        client = app.test_client()
+        start = time.perf_counter()
+        for _ in range(READS):
+            assert client.get('/api/sustainability/impact').status_code == 200
+        print(f'/impact after      {(time.perf_counter() - start) / READS * 1000:>8.3f} ms per request (incl. Flask)')
+
+        start = time.perf_counter()
+        for order_id in pending:
+            assert client.post(f'/api/tracking/orders/{order_id}/update', json={'status': 'completed'}).status_code == 200
+        with_rollup = (time.perf_counter() - start) / len(pending) * 1000
+        print(f'complete order     {with_rollup:>8.2f} ms per status update (includes the rollup upsert)')
+
+        with app.app_context():
+            incremental = snapshot()
+            rebuild(db.session)
+            assert incremental == snapshot(), 'incremental rollups drifted from the backfill'
+            print('incremental rollups match a fresh backfill')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,553 @@
+"""
+HTTP Load Test
+Seeds a synthetic dataset, starts the server locally and drives weighted mixed
+traffic over every blueprint; reports per-endpoint throughput and latency
+percentiles, writes JSON results and compares them with a stored baseline
+
+Run from the repository root:
+    python -m backend.benchmarks.loadtest                          # prod server, 30s, 32 clients
+    python -m backend.benchmarks.loadtest --duration 60 --workers 4 --threads 8
+    python -m backend.benchmarks.loadtest --save-baseline          # record the baseline
+    python -m backend.benchmarks.loadtest --url http://host:5000   # an already running server
+Exits with status 1 when an endpoint regresses beyond the thresholds.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'loadtest_baseline.json')
+
+MENU_IDS = ('1', '2', '3', '4')  # the menu blueprint serves its in-memory catalogue
+CATEGORIES = ('coffee', 'tea', 'pastry', 'cold')
+CITIES = {
+    'Mumbai': (19.076, 72.877), 'New Delhi': (28.614, 77.209), 'Bengaluru': (12.972, 77.595),
+    'Chennai': (13.083, 80.271), 'Kolkata': (22.573, 88.364), 'Pune': (18.520, 73.857),
+}
+
+
+# Dataset ------------------------------------------------------------------
+
+def seed(db_path, scale, seed_value=42):
+    """Write the synthetic dataset straight into a fresh database; returns the row counts the traffic mix draws ids from"""
+    from flask import Flask
+
+    from ..models.coffee import db, Cafe, Coffee, Event, Order, OrderItem, Promotion, User
+    from ..services import kitchen_display, recommendations
+
+    rng = random.Random(seed_value)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    counts = {'coffees': 40, 'cafes': 50 * scale, 'users': 1000 * scale, 'events': 40 * scale,
+              'promotions': 20, 'orders': 5000 * scale}
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(Coffee), [
+            {'id': f'c{n}', 'name': f'Coffee {n}', 'price': round(2.5 + n % 7 * 0.5, 2),
+             'category': CATEGORIES[n % len(CATEGORIES)], 'stock_quantity': 10 ** 9, 'available': True,
+             'organic': n % 3 == 0, 'fair_trade': n % 2 == 0, 'carbon_footprint': 0.1 + n % 5 / 10,
+             'sustainability_rating': 3 + n % 3, 'preparation_time': 3 + n % 6}
+            for n in range(counts['coffees'])
+        ])
+        cafes = []
+        for n in range(counts['cafes']):
+            city, (lat, lng) = list(CITIES.items())[n % len(CITIES)]
+            cafes.append({'id': f'k{n}', 'name': f'CCD {city} {n}', 'address': f'{n} Main Road', 'city': city,
+                          'state': '-', 'pincode': f'{400000 + n}', 'latitude': lat + rng.uniform(-0.2, 0.2),
+                          'longitude': lng + rng.uniform(-0.2, 0.2)})
+        db.session.execute(db.insert(Cafe), cafes)
+        db.session.execute(db.insert(User), [
+            {'id': f'u{n}', 'username': f'user{n}', 'email': f'user{n}@example.com', 'full_name': f'User {n}',
+             'loyalty_points': 10 ** 6, 'preferred_cafes': json.dumps([f'k{n % counts["cafes"]}'])}
+            for n in range(counts['users'])
+        ])
+        db.session.execute(db.insert(Event), [
+            {'id': f'e{n}', 'cafe_id': f'k{n % counts["cafes"]}', 'title': f'Open Mic {n}', 'event_type': 'music',
+             'start_time': now + timedelta(days=1 + n % 30), 'end_time': now + timedelta(days=1 + n % 30, hours=2),
+             'max_capacity': 10 ** 7, 'current_bookings': 0, 'price': 0.0, 'is_active': True}
+            for n in range(counts['events'])
+        ])
+        db.session.execute(db.insert(Promotion), [
+            {'id': f'p{n}', 'title': f'Offer {n}', 'promo_type': 'discount', 'discount_percentage': 10 + n % 3 * 5,
+             'max_discount': 50, 'min_order_amount': 0, 'promo_code': f'LOAD{n}', 'is_active': True,
+             'start_date': now - timedelta(days=1), 'end_date': now + timedelta(days=30),
+             'geo_targeted': n % 4 == 0, 'target_cities': json.dumps(['Mumbai', 'Pune']) if n % 4 == 0 else None}
+            for n in range(counts['promotions'])
+        ])
+        orders, items = [], []
+        for n in range(counts['orders']):
+            orders.append({'id': f'o{n}', 'customer_id': f'u{n % counts["users"]}', 'total': 7.0,
+                           'status': rng.choice(('pending', 'preparing', 'ready', 'completed')),
+                           'cafe_id': f'k{n % counts["cafes"]}', 'created_at': now - timedelta(minutes=n)})
+            items.append({'id': f'o{n}-1', 'order_id': f'o{n}', 'coffee_id': f'c{n % counts["coffees"]}',
+                          'quantity': 2, 'price': 3.5})
+            if n % 2:
+                items.append({'id': f'o{n}-2', 'order_id': f'o{n}', 'coffee_id': f'c{rng.randrange(counts["coffees"])}',
+                              'quantity': 1, 'price': 3.0})
+        db.session.execute(db.insert(Order), orders)
+        db.session.execute(db.insert(OrderItem), items)
+        db.session.commit()
+        recommendations.rebuild(db.session)
+        kitchen_display.rebuild(db.session)
+        db.engine.dispose()
+    return counts
+
+
+# Traffic mix --------------------------------------------------------------
+
+class Dataset:
+    """Ids the scenarios draw from; orders created during the run join the tracking pool"""
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.orders = [f'o{n}' for n in range(counts['orders'])]
+        self.lock = threading.Lock()
+
+    def add_order(self, order_id):
+        with self.lock:
+            self.orders.append(order_id)
+
+    def user(self, rng):
+        return f'u{rng.randrange(self.counts["users"])}'
+
+
+def _json_body(payload):
+    return json.dumps(payload).encode()
+
+
+def browse_menu(rng, data):
+    return 'GET /api/menu/', 'GET', '/api/menu/', None
+
+
+def menu_item(rng, data):
+    return 'GET /api/menu/<id>', 'GET', f'/api/menu/{rng.choice(MENU_IDS)}', None
+
+
+def menu_category(rng, data):
+    return 'GET /api/menu/?category', 'GET', f'/api/menu/?category={rng.choice(CATEGORIES)}', None
+
+
+def create_order(rng, data):
+    lines = [{'coffee_id': f'c{rng.randrange(data.counts["coffees"])}', 'quantity': rng.randint(1, 3)}
+             for _ in range(rng.randint(1, 3))]
+    body = {'customer_id': data.user(rng), 'items': lines, 'cafe_id': f'k{rng.randrange(data.counts["cafes"])}'}
+    return 'POST /api/orders/', 'POST', '/api/orders/', _json_body(body)
+
+
+def item_recommendations(rng, data):
+    return ('GET /api/menu/<id>/recommendations', 'GET',
+            f'/api/menu/c{rng.randrange(data.counts["coffees"])}/recommendations', None)
+
+
+def poll_order(rng, data):
+    return ('GET /api/tracking/orders/<id>/status', 'GET',
+            f'/api/tracking/orders/{rng.choice(data.orders)}/status', None)
+
+
+def order_history(rng, data):
+    return ('GET /api/orders/history/<id>', 'GET',
+            f'/api/orders/history/{data.user(rng)}?limit=20', None)
+
+
+def advance_order(rng, data):
+    status = rng.choice(('preparing', 'ready', 'completed'))
+    return ('POST /api/tracking/orders/<id>/update', 'POST',
+            f'/api/tracking/orders/{rng.choice(data.orders)}/update', _json_body({'status': status}))
+
+
+def kitchen_queue(rng, data):
+    return ('GET /api/tracking/kitchen/<id>/queue', 'GET',
+            f'/api/tracking/kitchen/k{rng.randrange(data.counts["cafes"])}/queue', None)
+
+
+def kitchen_batch(rng, data):
+    cafes = data.counts['cafes']
+    cafe = rng.randrange(cafes)
+    order_ids = [f'o{cafe + cafes * rng.randrange(data.counts["orders"] // cafes)}' for _ in range(rng.randint(2, 10))]
+    body = {'order_ids': order_ids, 'status': rng.choice(('preparing', 'ready', 'completed'))}
+    return ('POST /api/tracking/kitchen/<id>/transitions', 'POST',
+            f'/api/tracking/kitchen/k{cafe}/transitions', _json_body(body))
+
+
+def validate_promo(rng, data):
+    city = rng.choice(list(CITIES))
+    body = {'promo_code': f'LOAD{rng.randrange(data.counts["promotions"])}', 'order_amount': rng.randint(5, 60),
+            'user_location': city}
+    return 'POST /api/promotions/validate', 'POST', '/api/promotions/validate', _json_body(body)
+
+
+def list_promotions(rng, data):
+    return 'GET /api/promotions/', 'GET', '/api/promotions/', None
+
+
+def loyalty_points(rng, data):
+    return 'GET /api/loyalty/<id>/points', 'GET', f'/api/loyalty/{data.user(rng)}/points', None
+
+
+def loyalty_earn(rng, data):
+    body = {'points': rng.randint(5, 50), 'description': 'load test'}
+    return 'POST /api/loyalty/<id>/earn', 'POST', f'/api/loyalty/{data.user(rng)}/earn', _json_body(body)
+
+
+def loyalty_redeem(rng, data):
+    body = {'points': rng.randint(5, 50), 'description': 'load test'}
+    return 'POST /api/loyalty/<id>/redeem', 'POST', f'/api/loyalty/{data.user(rng)}/redeem', _json_body(body)
+
+
+def leaderboard(rng, data):
+    return 'GET /api/loyalty/leaderboard', 'GET', '/api/loyalty/leaderboard', None
+
+
+def nearby_cafes(rng, data):
+    lat, lng = rng.choice(list(CITIES.values()))
+    query = urllib.parse.urlencode({'lat': lat + rng.uniform(-0.1, 0.1), 'lng': lng + rng.uniform(-0.1, 0.1), 'k': 5})
+    return 'GET /api/cafes/nearby', 'GET', f'/api/cafes/nearby?{query}', None
+
+
+def list_events(rng, data):
+    return 'GET /api/events/', 'GET', '/api/events/', None
+
+
+def book_event(rng, data):
+    body = {'user_id': data.user(rng), 'tickets': 1}
+    return ('POST /api/events/<id>/book', 'POST', f'/api/events/e{rng.randrange(data.counts["events"])}/book',
+            _json_body(body))
+
+
+def green_points(rng, data):
+    return 'GET /api/sustainability/green-points/<id>', 'GET', f'/api/sustainability/green-points/{data.user(rng)}', None
+
+
+def impact(rng, data):
+    return 'GET /api/sustainability/impact', 'GET', '/api/sustainability/impact', None
+
+
+def stock_updates(rng, data):
+    return ('GET /api/tracking/stock/updates', 'GET',
+            f'/api/tracking/stock/updates?coffee_id=c{rng.randrange(data.counts["coffees"])}', None)
+
+
+def list_users(rng, data):
+    return 'GET /api/users/', 'GET', '/api/users/', None
+
+
+# (scenario, weight): roughly a storefront's read-heavy mix with steady ordering
+MIX = (
+    (browse_menu, 14), (menu_item, 8), (menu_category, 4), (item_recommendations, 2),
+    (create_order, 8), (poll_order, 14), (order_history, 3), (advance_order, 3),
+    (kitchen_queue, 2), (kitchen_batch, 1),
+    (validate_promo, 6), (list_promotions, 3),
+    (loyalty_points, 5), (loyalty_earn, 4), (loyalty_redeem, 2), (leaderboard, 2),
+    (nearby_cafes, 8), (list_events, 4), (book_event, 3),
+    (green_points, 3), (impact, 2), (stock_updates, 2), (list_users, 1),
+)
+
+
+# Client -------------------------------------------------------------------
+
+class Recorder:
+    """Per-thread samples, merged once at the end so the hot path takes no lock"""
+
+    def __init__(self):
+        self.latencies = {}  # endpoint -> [seconds]
+        self.statuses = {}   # endpoint -> {status: count}
+        self.bytes = 0
+
+    def add(self, endpoint, status, seconds, size):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        counts = self.statuses.setdefault(endpoint, {})
+        counts[status] = counts.get(status, 0) + 1
+        self.bytes += size
+
+
+def client(host, port, data, seed_value, stop, record, recorder):
+    rng = random.Random(seed_value)
+    scenarios = [scenario for scenario, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    while not stop.is_set():
+        endpoint, method, path, body = rng.choices(scenarios, weights)[0](rng, data)
+        start = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            payload, status = b'', 'error'
+        elapsed = time.perf_counter() - start
+        if record.is_set():
+            recorder.add(endpoint, status, elapsed, len(payload))
+        if endpoint == 'POST /api/orders/' and status == 201:
+            data.add_order(json.loads(payload)['data']['id'])
+    connection.close()
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(recorders, duration):
+    latencies, statuses = {}, {}
+    for recorder in recorders:
+        for endpoint, samples in recorder.latencies.items():
+            latencies.setdefault(endpoint, []).extend(samples)
+        for endpoint, counts in recorder.statuses.items():
+            merged = statuses.setdefault(endpoint, {})
+            for status, count in counts.items():
+                merged[str(status)] = merged.get(str(status), 0) + count
+
+    endpoints = {}
+    for endpoint in sorted(latencies):
+        ordered = sorted(latencies[endpoint])
+        counts = statuses[endpoint]
+        errors = sum(count for status, count in counts.items() if status == 'error' or status >= '500')
+        endpoints[endpoint] = {
+            'requests': len(ordered),
+            'rps': round(len(ordered) / duration, 2),
+            'errors': errors,
+            'status': counts,
+            'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+            'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3),
+        }
+    everything = sorted(sample for samples in latencies.values() for sample in samples)
+    total = {
+        'requests': len(everything),
+        'rps': round(len(everything) / duration, 2),
+        'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+        'bytes': sum(recorder.bytes for recorder in recorders),
+        'p50_ms': round((percentile(everything, 0.50) or 0) * 1000, 3),
+        'p95_ms': round((percentile(everything, 0.95) or 0) * 1000, 3),
+        'p99_ms': round((percentile(everything, 0.99) or 0) * 1000, 3),
+    }
+    return total, endpoints
+
+
+def drive(host, port, data, concurrency, warmup, duration, seed_value):
+    stop, record = threading.Event(), threading.Event()
+    recorders = [Recorder() for _ in range(concurrency)]
+    threads = [
+        threading.Thread(target=client, args=(host, port, data, seed_value + n, stop, record, recorders[n]), daemon=True)
+        for n in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup)
+    record.set()
+    start = time.perf_counter()
+    time.sleep(duration)
+    record.clear()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=60)
+    return summarize(recorders, elapsed)
+
+
+# Server -------------------------------------------------------------------
+
+def start_server(args, db_path):
+    env = dict(os.environ, CCD_DATABASE_URL=f'sqlite:///{db_path}', CCD_HOST='127.0.0.1', CCD_PORT=str(args.port))
+    env.pop('CCD_SERVER', None)
+    command = [sys.executable, 'main.py']
+    if args.server == 'production':
+        command += ['--production', '--threads', str(args.threads)]
+        if args.workers:
+            command += ['--workers', str(args.workers)]
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'server exited during startup:\n{server.stderr.read().decode()}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', args.port, timeout=1)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('server did not become ready within 60s')
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+# Baseline -----------------------------------------------------------------
+
+def compare(results, baseline, thresholds, min_requests):
+    """Endpoint regressions vs the baseline as (endpoint, metric, baseline, current) tuples"""
+    regressions = []
+    rows = [('TOTAL', results['total'], baseline.get('total', {}))]
+    rows += [(name, current, baseline.get('endpoints', {}).get(name)) for name, current in results['endpoints'].items()]
+    for name, current, previous in rows:
+        if not previous or current['requests'] < min_requests or previous['requests'] < min_requests:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            limit = thresholds[metric]
+            if limit is not None and current[metric] > previous[metric] * (1 + limit):
+                regressions.append((name, metric, previous[metric], current[metric]))
+        limit = thresholds['rps']
+        if limit is not None and current['rps'] < previous['rps'] * (1 - limit):
+            regressions.append((name, 'rps', previous['rps'], current['rps']))
+        error_rate = current['errors'] / current['requests']
+        previous_rate = previous['errors'] / previous['requests']
+        if error_rate > previous_rate + thresholds['error_rate']:
+            regressions.append((name, 'error_rate', round(previous_rate, 4), round(error_rate, 4)))
+    return regressions
+
+
+def print_report(results, baseline):
+    def delta(name, metric, value):
+        if not baseline:
+            return ''
+        previous = (baseline['total'] if name == 'TOTAL' else baseline.get('endpoints', {}).get(name, {})).get(metric)
+        if not previous:
+            return '        '
+        return f' ({(value - previous) / previous * 100:+5.0f}%)'
+
+    print(f'\n{"endpoint":<46} {"req":>7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>17} {"p99 ms":>17} {"err":>5}')
+    rows = list(results['endpoints'].items()) + [('TOTAL', results['total'])]
+    for name, stats in rows:
+        print(f'{name:<46} {stats["requests"]:>7,} {stats["rps"]:>8,.1f} {stats["p50_ms"]:>8.2f} '
+              f'{stats["p95_ms"]:>8.2f}{delta(name, "p95_ms", stats["p95_ms"]):<9} '
+              f'{stats["p99_ms"]:>8.2f}{delta(name, "p99_ms", stats["p99_ms"]):<9} {stats["errors"]:>5}')
+
+
+# Entry point --------------------------------------------------------------
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Mixed-traffic HTTP load test for the CCD 2.0 API')
+    parser.add_argument('--url', help='target an already running server instead of seeding and starting one')
+    parser.add_argument('--server', choices=('production', 'development'), default='production')
+    parser.add_argument('--workers', type=int, help='production worker processes (default: one per CPU)')
+    parser.add_argument('--threads', type=int, default=4, help='threads per production worker')
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--scale', type=int, default=1, help='dataset size multiplier')
+    parser.add_argument('--concurrency', type=int, default=32, help='client threads (one keep-alive connection each)')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before measuring')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='loadtest-results.json', help='where to write the JSON results')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--max-p50-regression', type=float, default=None, help='allowed p50 increase (fraction)')
+    parser.add_argument('--max-p95-regression', type=float, default=0.25, help='allowed p95 increase (fraction)')
+    parser.add_argument('--max-p99-regression', type=float, default=0.50, help='allowed p99 increase (fraction)')
+    parser.add_argument('--max-rps-regression', type=float, default=0.15, help='allowed throughput drop (fraction)')
+    parser.add_argument('--max-error-rate-increase', type=float, default=0.01)
+    parser.add_argument('--min-requests', type=int, default=100,
+                        help='skip endpoints with fewer samples than this when comparing')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        if args.url:
+            target = urllib.parse.urlsplit(args.url)
+            host, port = target.hostname, target.port or 80
+            counts = {'coffees': 40, 'cafes': 50 * args.scale, 'users': 1000 * args.scale,
+                      'events': 40 * args.scale, 'promotions': 20, 'orders': 5000 * args.scale}
+            print(f'targeting {args.url} (assumes a dataset seeded with --scale {args.scale})')
+        else:
+            db_path = os.path.join(tmp, 'loadtest.db')
+            started = time.perf_counter()
+            counts = seed(db_path, args.scale, args.seed)
+            print(f'seeded {", ".join(f"{count:,} {name}" for name, count in counts.items())} '
+                  f'in {time.perf_counter() - started:.1f}s')
+            server = start_server(args, db_path)
+            host, port = '127.0.0.1', args.port
+            print(f'{args.server} server on :{port}' +
+                  (f' ({args.workers or os.cpu_count()} workers x {args.threads} threads)'
+                   if args.server == 'production' else ''))
+
+        print(f'{args.concurrency} clients, {args.warmup:g}s warmup, {args.duration:g}s measured')
+        try:
+            total, endpoints = drive(host, port, Dataset(counts), args.concurrency, args.warmup, args.duration, args.seed)
+        finally:
+            if server:
+                stop_server(server)
+
+    results = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'target': args.url or args.server,
+            'workers': args.workers or os.cpu_count(),
+            'threads': args.threads,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'scale': args.scale,
+            'seed': args.seed,
+        },
+        'total': total,
+        'endpoints': endpoints,
+    }
+    with open(args.output, 'w') as handle:
+        json.dump(results, handle, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+    print_report(results, baseline)
+    print(f'\nresults written to {args.output}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f'baseline saved to {args.baseline}')
+        return
+    if not baseline:
+        print('no baseline to compare against (record one with --save-baseline)')
+        return
+
+    thresholds = {'p50_ms': args.max_p50_regression, 'p95_ms': args.max_p95_regression,
+                  'p99_ms': args.max_p99_regression, 'rps': args.max_rps_regression,
+                  'error_rate': args.max_error_rate_increase}
+    regressions = compare(results, baseline, thresholds, args.min_requests)
+    if not regressions:
+        print(f'no regressions vs baseline from {baseline["meta"]["timestamp"]}')
+        return
+    print(f'\n{len(regressions)} regressions vs baseline from {baseline["meta"]["timestamp"]}:')
+    for name, metric, previous, current in regressions:
+        print(f'   {name}: {metric} {previous} -> {current}')
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Kitchen Ticket Backfill
+One-shot rebuild of the kitchen display tickets from the orders currently open
+in each café, for databases with open orders from before the display existed
+
+Run from the repository root (defaults to database/ccd.db):
+    python -m backend.migrations.backfill_kitchen_tickets [path/to/ccd.db]
+"""
+
+import argparse
+import os
+import time
+
+from flask import Flask
+
+from ..models.coffee import db
+from ..services.kitchen_display import rebuild
+
+
+def main():
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'database', 'ccd.db')
+    parser = argparse.ArgumentParser(description='Rebuild the kitchen display tickets from open orders')
+    parser.add_argument('path', nargs='?', default=default)
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        print(f'No database at {args.path}; nothing to backfill')
+        return
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.abspath(args.path)}'
+    db.init_app(app)
+
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()  # the ticket table may predate this database
+        tickets = rebuild(db.session)
+    print(f'Wrote {tickets:,} kitchen tickets in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
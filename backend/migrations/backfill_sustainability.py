@@ -0,0 +1,45 @@
+"""
+Sustainability Backfill
+One-shot rebuild of the sustainability rollups from every completed order,
+streamed in batches so memory stays flat on large histories
+
+Run from the repository root (defaults to database/ccd.db):
+    python -m backend.migrations.backfill_sustainability [path/to/ccd.db] [--batch-size N]
+"""
+
+import argparse
+import os
+import time
+
+from flask import Flask
+
+from ..models.coffee import db
+from ..services.sustainability_rollup import rebuild
+
+
+def main():
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'database', 'ccd.db')
+    parser = argparse.ArgumentParser(description='Rebuild the sustainability rollups from order history')
+    parser.add_argument('path', nargs='?', default=default)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        print(f'No database at {args.path}; nothing to backfill')
+        return
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.abspath(args.path)}'
+    db.init_app(app)
+
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()  # the rollup table may predate this database
+        orders, rows = rebuild(
+            db.session, batch_size=args.batch_size,
+            progress=lambda scanned: print(f'\r   {scanned:,} orders scanned', end='', flush=True),
+        )
+    print(f'\nRebuilt {rows:,} rollup rows from {orders:,} completed orders in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Query Plan Check
+Drives the API through the Flask test client on a seeded database, records
+every statement the routes execute and fails if EXPLAIN QUERY PLAN shows any
+of them falling back to a full table scan
+
+Run from the repository root:
+    python -m backend.migrations.check_query_plans [--scale 1]
+(backend/tests/test_query_plans.py runs the same check under pytest)
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+
+from flask import Flask
+from sqlalchemy import event
+
+from ..models.coffee import db
+from ..benchmarks import loadtest
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+# Walking an index in its order is only cheap when every row visited is returned
+INDEX_WALK = re.compile(r'^SCAN (\w+) USING (?:COVERING )?INDEX \w+$')
+FILTERED = re.compile(r'\bWHERE\b', re.IGNORECASE)
+PLANNED = re.compile(r'^\s*(SELECT|WITH|UPDATE|DELETE)\b', re.IGNORECASE)
+MIX_REQUESTS = 3  # requests per load-test scenario, each with its own ids
+
+
+def create_app(db_path):
+    """Every blueprint, as backend.app registers them, on the database at `db_path`"""
+    from ..app import BLUEPRINTS
+    import importlib
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    for module_name, attribute, prefix in BLUEPRINTS:
+        module = importlib.import_module(f'..routes.{module_name}', __package__)
+        app.register_blueprint(getattr(module, attribute), url_prefix=prefix)
+    return app
+
+
+def route_requests(counts):
+    """(name, method, path, JSON body) covering the routes that query the database.
+
+    The load test's traffic mix comes first, then the endpoints it leaves out;
+    list endpoints are followed to their second page by check().
+    """
+    rng = random.Random(7)
+    data = loadtest.Dataset(counts)
+    requests = []
+    for scenario, _ in loadtest.MIX:
+        for _ in range(MIX_REQUESTS):
+            name, method, path, body = scenario(rng, data)
+            requests.append((name, method, path, json.loads(body) if body else None))
+    today = '2024-01-31'
+    requests += [
+        ('GET /api/orders/', 'GET', '/api/orders/?limit=2', None),
+        ('GET /api/orders/?customer_id', 'GET', '/api/orders/?customer_id=u1&limit=2', None),
+        ('GET /api/orders/?status', 'GET', '/api/orders/?status=pending&limit=2', None),
+        ('GET /api/orders/<id>', 'GET', '/api/orders/o1', None),
+        ('PUT /api/orders/<id>/status', 'PUT', '/api/orders/o2/status', {'status': 'completed'}),
+        ('GET /api/tracking/orders/<id>/stream', 'GET', '/api/tracking/orders/o2/stream', None),
+        ('GET /api/tracking/orders/<id>/qr', 'GET', '/api/tracking/orders/o1/qr', None),
+        ('GET /api/tracking/kitchen/<id>', 'GET', '/api/tracking/kitchen/k1', None),
+        ('GET /api/tracking/kitchen/<id>/queue?status', 'GET', '/api/tracking/kitchen/k1/queue?status=preparing', None),
+        ('POST /api/tracking/stock/update', 'POST', '/api/tracking/stock/update',
+         {'coffee_id': 'c1', 'quantity_change': -1, 'cafe_id': 'k1', 'reason': 'sale'}),
+        ('POST /api/tracking/stock/update/batch', 'POST', '/api/tracking/stock/update/batch',
+         {'updates': [{'coffee_id': 'c1', 'quantity_change': -1}, {'coffee_id': 'c2', 'quantity_change': 1}],
+          'cafe_id': 'k1'}),
+        ('GET /api/tracking/stock/updates?cafe_id', 'GET', '/api/tracking/stock/updates?cafe_id=k1&limit=2', None),
+        ('GET /api/tracking/stock/updates', 'GET', '/api/tracking/stock/updates?limit=2', None),
+        ('GET /api/loyalty/<id>/transactions', 'GET', '/api/loyalty/u1/transactions?limit=2', None),
+        ('GET /api/loyalty/<id>/rank', 'GET', '/api/loyalty/u1/rank', None),
+        ('POST /api/loyalty/bulk-earn', 'POST', '/api/loyalty/bulk-earn',
+         {'awards': [{'user_id': 'u1', 'points': 5}, {'user_id': 'u2', 'points': 5}]}),
+        ('GET /api/promotions/<id>', 'GET', '/api/promotions/p1', None),
+        ('POST /api/promotions/<id>/use', 'POST', '/api/promotions/p1/use', None),
+        ('GET /api/events/?cafe_id', 'GET', '/api/events/?cafe_id=k1&limit=2', None),
+        ('GET /api/events/<id>', 'GET', '/api/events/e1', None),
+        ('GET /api/events/<id>/bookings', 'GET', '/api/events/e1/bookings', None),
+        ('GET /api/events/bookings/user/<id>', 'GET', '/api/events/bookings/user/u1', None),
+        ('GET /api/cafes/', 'GET', '/api/cafes/?limit=2', None),
+        ('GET /api/cafes/<id>', 'GET', '/api/cafes/k1', None),
+        ('GET /api/cafes/nearby?radius', 'GET', '/api/cafes/nearby?lat=19.07&lng=72.87&radius=5', None),
+        ('GET /api/menu/recommendations/user/<id>', 'GET', '/api/menu/recommendations/user/u1', None),
+        ('GET /api/sustainability/coffee/<id>/sustainability', 'GET', '/api/sustainability/coffee/c1/sustainability', None),
+        ('GET /api/sustainability/green-points/<id>/history', 'GET', '/api/sustainability/green-points/u1/history?limit=2', None),
+        ('POST /api/sustainability/green-points/<id>/earn', 'POST', '/api/sustainability/green-points/u1/earn',
+         {'action': 'own_cup'}),
+        ('GET /api/sustainability/impact?cafe_id', 'GET', '/api/sustainability/impact?cafe_id=k1', None),
+        ('GET /api/sustainability/impact/daily', 'GET', f'/api/sustainability/impact/daily?end={today}', None),
+    ]
+    return requests
+
+
+class Recorder:
+    """Statements that can scan a table, first parameters kept, by the request that issued them"""
+
+    def __init__(self):
+        self.request = None
+        self.statements = {}  # statement -> (request name, parameters)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.request and statement not in self.statements and PLANNED.match(statement):
+            self.statements[statement] = (self.request, parameters[0] if executemany else parameters)
+
+
+def check(db_path, scale=1):
+    """Seed `db_path` and run route_requests().
+
+    Returns (request name, statement, plan, full scans) per statement, and
+    the (request name, path, status) of requests that failed, whose queries
+    would otherwise go unchecked.
+    """
+    counts = loadtest.seed(db_path, scale)
+    app = create_app(db_path)
+    from ..routes.cafes import warm_cafe_index
+    from ..routes.loyalty import warm_leaderboards
+    from ..routes.promotions import warm_promotions
+
+    recorder = Recorder()
+    failed = []
+    client = app.test_client()
+    with app.app_context():
+        # Startup loads read whole tables on purpose; only the request path is checked
+        warm_leaderboards()
+        warm_promotions()
+        warm_cafe_index()
+        event.listen(db.engine, 'before_cursor_execute', recorder)
+        try:
+            for name, method, path, body in route_requests(counts):
+                recorder.request = name
+                response = client.open(path, method=method, json=body)
+                payload = response.get_json(silent=True) or {}
+                if response.status_code >= 400:
+                    failed.append((name, path, response.status_code))
+                if response.status_code == 200 and payload.get('next_cursor'):
+                    separator = '&' if '?' in path else '?'
+                    client.open(f'{path}{separator}cursor={payload["next_cursor"]}', method=method).close()
+                response.close()
+            recorder.request = None
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', recorder)
+
+        results = []
+        with db.engine.connect() as connection:
+            for statement, (name, parameters) in recorder.statements.items():
+                rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+                plan = [row[-1] for row in rows]
+                scans = [
+                    step for step in plan
+                    if FULL_SCAN.match(step) or (INDEX_WALK.match(step) and FILTERED.search(statement))
+                ]
+                results.append((name, statement, plan, scans))
+        db.engine.dispose()
+    return results, failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=1, help='dataset scale, as in the load test')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results, failed = check(os.path.join(tmp, 'plans.db'), args.scale)
+
+    failures = len(failed)
+    for name, path, status in failed:
+        print(f'FAIL  {name}: {path} returned {status}, its queries were not checked')
+    for name, statement, plan, scans in results:
+        print(f"{'FAIL' if scans else 'ok  '}  {name}: {' | '.join(plan)}")
+        if scans:
+            failures += 1
+            print(f'      {" ".join(statement.split())}')
+    print(f'\n{len(results)} statements from {len({name for name, *_ in results})} endpoints')
+    if failures:
+        print(f'{failures - len(failed)} statements fall back to a full table scan, {len(failed)} requests failed')
+        sys.exit(1)
+    print('All route queries use an index')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Index Migration
+Idempotently brings an existing database up to the indexes declared on the models
+
+Run from the repository root (defaults to database/ccd.db):
+    python -m backend.migrations.indexes [path/to/ccd.db]
+"""
+
+import os
+import sys
+
+from sqlalchemy import create_engine, inspect
+
+
+def ensure_indexes(engine, metadata):
+    """Create any declared index that is missing or stale; returns the names created.
+
+    db.create_all() only builds indexes together with brand-new tables, so
+    databases created before an index was declared never receive it. An
+    existing index whose columns differ from the declaration is rebuilt.
+    """
+    existing_tables = set(inspect(engine).get_table_names())
+    created = []
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {
+                index['name']: index['column_names']
+                for index in inspect(connection).get_indexes(table.name)
+            }
+            for index in table.indexes:
+                columns = [column.name for column in index.columns]
+                if present.get(index.name) == columns:
+                    continue
+                if index.name in present:
+                    index.drop(connection)
+                index.create(connection)
+                created.append(index.name)
+    return created
+
+
+def main():
+    from ..models.coffee import db
+
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'database', 'ccd.db')
+    path = sys.argv[1] if len(sys.argv) > 1 else default
+    if not os.path.exists(path):
+        print(f'No database at {path}; nothing to migrate')
+        return
+
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)  # new tables come with their indexes
+    created = ensure_indexes(engine, db.metadata)
+    if created:
+        print(f'Created {len(created)} indexes:')
+        for name in created:
+            print(f'   {name}')
+    else:
+        print('All indexes already present')
+
+
+if __name__ == '__main__':
+    main()
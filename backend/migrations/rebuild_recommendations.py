@@ -0,0 +1,53 @@
+"""
+Recommendations Rebuild
+Nightly job: recount item co-occurrence over the trailing window, rewrite
+Coffee.popularity_score and replace every precomputed top-k list
+
+Run from the repository root (defaults to database/ccd.db), e.g. from cron:
+    python -m backend.migrations.rebuild_recommendations [path/to/ccd.db] [--days N] [--top-k K]
+"""
+
+import argparse
+import os
+import time
+
+from flask import Flask
+
+from ..models.coffee import db
+from ..services import recommendations
+from .indexes import ensure_indexes
+
+
+def main():
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'database', 'ccd.db')
+    parser = argparse.ArgumentParser(description='Rebuild item recommendations and popularity scores')
+    parser.add_argument('path', nargs='?', default=default)
+    parser.add_argument('--days', type=int, default=recommendations.WINDOW_DAYS,
+                        help='order history to scan (0 = all)')
+    parser.add_argument('--top-k', type=int, default=recommendations.TOP_K)
+    parser.add_argument('--min-co-orders', type=int, default=recommendations.MIN_CO_ORDERS)
+    parser.add_argument('--batch-size', type=int, default=50000)
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        print(f'No database at {args.path}; nothing to rebuild')
+        return
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.abspath(args.path)}'
+    db.init_app(app)
+
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()  # the recommendations table may predate this database
+        ensure_indexes(db.engine, db.metadata)  # the scan relies on ix_order_items_order covering coffee_id
+        orders, pairs, rows = recommendations.rebuild(
+            db.session, k=args.top_k, window_days=args.days, min_co_orders=args.min_co_orders,
+            batch_size=args.batch_size,
+            progress=lambda scanned: print(f'\r   {scanned:,} orders scanned', end='', flush=True),
+        )
+    print(f'\nWrote {rows:,} recommendations from {pairs:,} item pairs in {orders:,} orders '
+          f'in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
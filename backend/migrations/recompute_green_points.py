@@ -0,0 +1,43 @@
+"""
+Green Points Recompute
+Bulk job that backfills organic-order ledger rows for historical orders and
+rebuilds every user's green points balance from the ledger
+
+Run from the repository root (defaults to database/ccd.db):
+    python -m backend.migrations.recompute_green_points [path/to/ccd.db] [--batch-size N]
+"""
+
+import argparse
+import os
+import time
+
+from flask import Flask
+
+from ..models.coffee import db
+from ..services.green_points import recompute
+
+
+def main():
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'database', 'ccd.db')
+    parser = argparse.ArgumentParser(description='Recompute green points balances from order history')
+    parser.add_argument('path', nargs='?', default=default)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        print(f'No database at {args.path}; nothing to recompute')
+        return
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.abspath(args.path)}'
+    db.init_app(app)
+
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()  # the ledger tables may predate this database
+        added, accounts = recompute(db.session, batch_size=args.batch_size)
+    print(f'Added {added:,} ledger corrections and wrote {accounts:,} balances '
+          f'in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Schema Version Stamp
+A fingerprint of the declared models stored in the database, so startup can
+skip create_all, index reconciliation and seeding when nothing has changed
+
+Run from the repository root (defaults to database/ccd.db):
+    python -m backend.migrations.schema_version [path/to/ccd.db]
+"""
+
+import hashlib
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, create_engine, select
+from sqlalchemy.exc import DBAPIError
+
+# Bump to force a full init on every database even though the models are unchanged
+# (e.g. when the sample data seeded by init_db changes)
+SCHEMA_REVISION = 1
+
+_stamp_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _stamp_metadata,
+    Column('id', String(20), primary_key=True),
+    Column('fingerprint', String(64), nullable=False),
+    Column('stamped_at', DateTime, nullable=False),
+)
+
+
+def schema_fingerprint(metadata):
+    """sha256 over every table, column, constraint and index declared in `metadata`"""
+    digest = hashlib.sha256(f'revision {SCHEMA_REVISION}\n'.encode())
+    for table in sorted(metadata.tables.values(), key=lambda table: table.name):
+        digest.update(f'table {table.name}\n'.encode())
+        for column in table.columns:
+            foreign = ','.join(sorted(key.target_fullname for key in column.foreign_keys))
+            digest.update(
+                f'  column {column.name} {column.type!r} nullable={column.nullable} '
+                f'pk={column.primary_key} unique={column.unique} fk={foreign}\n'.encode()
+            )
+        for index in sorted(table.indexes, key=lambda index: index.name or ''):
+            columns = ','.join(column.name for column in index.columns)
+            digest.update(f'  index {index.name} ({columns}) unique={index.unique}\n'.encode())
+    return digest.hexdigest()
+
+
+def read_stamp(connection):
+    """The stored fingerprint, or None when the database has never been stamped"""
+    try:
+        return connection.execute(
+            select(schema_version.c.fingerprint).where(schema_version.c.id == 'models')
+        ).scalar()
+    except DBAPIError:
+        connection.rollback()  # no schema_version table yet
+        return None
+
+
+def write_stamp(connection, fingerprint):
+    _stamp_metadata.create_all(connection)
+    connection.execute(schema_version.delete().where(schema_version.c.id == 'models'))
+    connection.execute(schema_version.insert().values(id='models', fingerprint=fingerprint,
+                                                      stamped_at=datetime.utcnow()))
+
+
+def main():
+    from ..models.coffee import db
+
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'database', 'ccd.db')
+    path = sys.argv[1] if len(sys.argv) > 1 else default
+    if not os.path.exists(path):
+        print(f'No database at {path}')
+        return
+
+    engine = create_engine(f'sqlite:///{path}')
+    expected = schema_fingerprint(db.metadata)
+    with engine.connect() as connection:
+        stored = read_stamp(connection)
+    print(f'models   {expected}')
+    print(f'database {stored or "(not stamped)"}')
+    print('up to date: startup skips create_all and seeding' if stored == expected
+          else 'stale: the next start runs the full init_db')
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,7 @@ SQLAlchemy models for CCD 2.0 - Enhanced with all features
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timedelta
 import uuid
-import json
+from .json_column import JSONColumn
 
 db = SQLAlchemy()
 
@@ -25,8 +25,10 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     # Enhanced personalization fields
-    dietary_preferences = db.Column(db.Text, nullable=True)  # JSON: vegan, gluten-free, etc.
-    favorite_items = db.Column(db.Text, nullable=True)  # JSON: favorite coffee IDs
+    _dietary_preferences = db.Column('dietary_preferences', db.Text, nullable=True)  # JSON: vegan, gluten-free, etc.
+    dietary_preferences = JSONColumn('_dietary_preferences')
+    _favorite_items = db.Column('favorite_items', db.Text, nullable=True)  # JSON: favorite coffee IDs
+    favorite_items = JSONColumn('_favorite_items')
     customizations = db.Column(db.Text, nullable=True)  # JSON: saved customizations
     birthday = db.Column(db.Date, nullable=True)
     student_id = db.Column(db.String(50), nullable=True)
@@ -42,7 +44,8 @@ class User(db.Model):
     last_order_date = db.Column(db.DateTime, nullable=True)
     
     # Preferences
-    preferred_cafes = db.Column(db.Text, nullable=True)  # JSON: preferred café IDs
+    _preferred_cafes = db.Column('preferred_cafes', db.Text, nullable=True)  # JSON: preferred café IDs
+    preferred_cafes = JSONColumn('_preferred_cafes')
     notification_preferences = db.Column(db.Text, nullable=True)  # JSON: notification settings
     
     # Relationships
@@ -61,7 +64,10 @@ class User(db.Model):
             'address': self.address,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'last_login': self.last_login.isoformat() if self.last_login else None,
-            'is_active': self.is_active
+            'is_active': self.is_active,
+            'dietary_preferences': self.dietary_preferences,
+            'favorite_items': self.favorite_items,
+            'preferred_cafes': self.preferred_cafes
         }
 
 class Coffee(db.Model):
@@ -84,10 +90,14 @@ class Coffee(db.Model):
     min_stock_level = db.Column(db.Integer, default=10)
     preparation_time = db.Column(db.Integer, default=5)  # Minutes to prepare
     calories = db.Column(db.Integer, nullable=True)
-    dietary_tags = db.Column(db.Text, nullable=True)  # JSON: vegan, gluten-free, sugar-free, etc.
-    allergens = db.Column(db.Text, nullable=True)  # JSON: allergen information
-    ingredients = db.Column(db.Text, nullable=True)  # JSON: ingredient list
-    customization_options = db.Column(db.Text, nullable=True)  # JSON: available customizations
+    _dietary_tags = db.Column('dietary_tags', db.Text, nullable=True)  # JSON: vegan, gluten-free, sugar-free, etc.
+    dietary_tags = JSONColumn('_dietary_tags')
+    _allergens = db.Column('allergens', db.Text, nullable=True)  # JSON: allergen information
+    allergens = JSONColumn('_allergens')
+    _ingredients = db.Column('ingredients', db.Text, nullable=True)  # JSON: ingredient list
+    ingredients = JSONColumn('_ingredients')
+    _customization_options = db.Column('customization_options', db.Text, nullable=True)  # JSON: available customizations
+    customization_options = JSONColumn('_customization_options')
     popularity_score = db.Column(db.Float, default=0.0)  # For recommendations
     seasonal = db.Column(db.Boolean, default=False)
     seasonal_start = db.Column(db.Date, nullable=True)
@@ -100,6 +110,10 @@ class Coffee(db.Model):
     organic = db.Column(db.Boolean, default=False)
     farm_info = db.Column(db.Text, nullable=True)  # Farm-to-cup story
     
+    __table_args__ = (
+        db.Index('ix_coffees_popularity', 'popularity_score'),
+    )
+    
     # Relationships
     order_items = db.relationship('OrderItem', backref='coffee_item', lazy=True)
     reviews = db.relationship('Review', backref='coffee', lazy=True)
@@ -116,6 +130,11 @@ class Coffee(db.Model):
             'size': self.size,
             'available': self.available,
             'image_url': self.image_url,
+            'dietary_tags': self.dietary_tags,
+            'allergens': self.allergens,
+            'ingredients': self.ingredients,
+            'customization_options': self.customization_options,
+            'popularity_score': self.popularity_score,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -165,6 +184,13 @@ class Order(db.Model):
     special_occasion = db.Column(db.String(50), nullable=True)  # birthday, anniversary, etc.
     customization_notes = db.Column(db.Text, nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_orders_customer_created', 'customer_id', 'created_at', 'id'),
+        db.Index('ix_orders_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_orders_created', 'created_at', 'id'),
+        db.Index('ix_orders_cafe_status', 'cafe_id', 'status'),
+    )
+    
     # Relationships
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     tracking_updates = db.relationship('OrderTracking', backref='order', lazy=True)
@@ -192,6 +218,10 @@ class OrderItem(db.Model):
     price = db.Column(db.Float, nullable=False)  # Price at time of order
     special_instructions = db.Column(db.Text, nullable=True)
     
+    __table_args__ = (
+        db.Index('ix_order_items_order', 'order_id', 'coffee_id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -232,8 +262,14 @@ class Cafe(db.Model):
     closing_time = db.Column(db.Time, nullable=True)
     is_24_hours = db.Column(db.Boolean, default=False)
     
+    __table_args__ = (
+        db.Index('ix_cafes_lat_lng', 'latitude', 'longitude'),
+        db.Index('ix_cafes_name', 'name', 'id'),
+    )
+    
     # Relationships
-    orders = db.relationship('Order', backref='cafe_location', lazy=True)
+    orders = db.relationship('Order', backref='cafe_location', lazy=True,
+                             primaryjoin='Cafe.id == foreign(Order.cafe_id)')
     events = db.relationship('Event', backref='cafe', lazy=True)
     
     def to_dict(self):
@@ -265,6 +301,10 @@ class UserFavorite(db.Model):
     customizations = db.Column(db.Text, nullable=True)  # JSON: saved customizations
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_user_favorites_user', 'user_id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -286,6 +326,10 @@ class LoyaltyTransaction(db.Model):
     order_id = db.Column(db.String(36), db.ForeignKey('orders.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_loyalty_transactions_user_created', 'user_id', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -297,6 +341,53 @@ class LoyaltyTransaction(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class GreenPointsTransaction(db.Model):
+    """Green points ledger: one row per eco-friendly action or order (negative when an order is reverted)"""
+    __tablename__ = 'green_points_transactions'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    action = db.Column(db.String(30), nullable=False)  # own_cup, eco_packaging, organic_order
+    points = db.Column(db.Integer, nullable=False)
+    order_id = db.Column(db.String(36), db.ForeignKey('orders.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_green_points_transactions_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_green_points_transactions_order', 'order_id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'action': self.action,
+            'points': self.points,
+            'order_id': self.order_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class GreenPointsAccount(db.Model):
+    """Per-user green points balance, updated with every ledger row (kept apart from loyalty points)"""
+    __tablename__ = 'green_points_accounts'
+    
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), primary_key=True)
+    points = db.Column(db.Integer, nullable=False, default=0)
+    eco_friendly_orders = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def sustainability_level(self):
+        return 'Bronze' if self.points < 100 else 'Silver' if self.points < 500 else 'Gold'
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'green_points': self.points,
+            'eco_friendly_orders': self.eco_friendly_orders,
+            'sustainability_level': self.sustainability_level
+        }
+
 class Review(db.Model):
     """User reviews for coffee items"""
     __tablename__ = 'reviews'
@@ -335,6 +426,12 @@ class StockUpdate(db.Model):
     updated_by = db.Column(db.String(36), nullable=True)  # staff member ID
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_stock_updates_coffee_created', 'coffee_id', 'created_at', 'id'),
+        db.Index('ix_stock_updates_cafe_created', 'cafe_id', 'created_at', 'id'),
+        db.Index('ix_stock_updates_created', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -358,6 +455,11 @@ class OrderTracking(db.Model):
     estimated_time = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_order_tracking_order_created', 'order_id', 'created_at'),
+        db.Index('ix_order_tracking_created', 'created_at'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -413,6 +515,14 @@ class Event(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_events_active_start', 'is_active', 'start_time', 'id'),
+        db.Index('ix_events_cafe_start', 'cafe_id', 'start_time', 'id'),
+    )
+    
+    # Relationships
+    bookings = db.relationship('EventBooking', backref='event', lazy=True)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -430,6 +540,34 @@ class Event(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class EventBooking(db.Model):
+    """Tickets booked by a user for an event"""
+    __tablename__ = 'event_bookings'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    event_id = db.Column(db.String(36), db.ForeignKey('events.id'), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    tickets = db.Column(db.Integer, nullable=False, default=1)
+    total_cost = db.Column(db.Float, default=0.0)
+    status = db.Column(db.String(20), default='confirmed')  # confirmed, cancelled
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_event_bookings_user_event', 'user_id', 'event_id'),
+        db.Index('ix_event_bookings_event_created', 'event_id', 'created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'event_id': self.event_id,
+            'user_id': self.user_id,
+            'tickets': self.tickets,
+            'total_cost': self.total_cost,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
 class Promotion(db.Model):
     """Marketing promotions and offers"""
     __tablename__ = 'promotions'
@@ -449,9 +587,19 @@ class Promotion(db.Model):
     usage_limit = db.Column(db.Integer, nullable=True)
     usage_count = db.Column(db.Integer, default=0)
     geo_targeted = db.Column(db.Boolean, default=False)
-    target_cities = db.Column(db.Text, nullable=True)  # JSON: target cities
+    _target_cities = db.Column('target_cities', db.Text, nullable=True)  # JSON: target cities
+    target_cities = JSONColumn('_target_cities')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_promotions_active_window', 'is_active', 'end_date', 'start_date'),
+        db.Index('ix_promotions_active_created', 'is_active', 'created_at', 'id'),
+        # Partial: most promotions carry no code, so only coded rows are indexed
+        db.Index('ix_promotions_promo_code', 'promo_code',
+                 sqlite_where=db.text('promo_code IS NOT NULL'),
+                 postgresql_where=db.text('promo_code IS NOT NULL')),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -473,11 +621,120 @@ class Promotion(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class KitchenCapacity(db.Model):
+    """Baristas on the line per café, used to plan its kitchen queue"""
+    __tablename__ = 'kitchen_capacity'
+    
+    cafe_id = db.Column(db.String(36), db.ForeignKey('cafes.id'), primary_key=True)
+    baristas = db.Column(db.Integer, nullable=False, default=2)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'cafe_id': self.cafe_id,
+            'baristas': self.baristas,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class KitchenTicket(db.Model):
+    """An open order on its café's kitchen display, kept in promised-time order"""
+    __tablename__ = 'kitchen_tickets'
+    
+    order_id = db.Column(db.String(36), db.ForeignKey('orders.id'), primary_key=True)
+    cafe_id = db.Column(db.String(36), db.ForeignKey('cafes.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # confirmed, preparing, ready
+    promised_at = db.Column(db.DateTime, nullable=False)  # ready time quoted when the order reached the kitchen
+    priority = db.Column(db.Integer, nullable=False, default=0)  # order type rank, lower first
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_kitchen_tickets_queue', 'cafe_id', 'promised_at', 'priority', 'order_id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'order_id': self.order_id,
+            'cafe_id': self.cafe_id,
+            'status': self.status,
+            'promised_at': self.promised_at.isoformat() if self.promised_at else None,
+            'priority': self.priority
+        }
+
+class CoffeeRecommendation(db.Model):
+    """Precomputed "customers also ordered" list per item, rebuilt by the recommender job"""
+    __tablename__ = 'coffee_recommendations'
+    
+    coffee_id = db.Column(db.String(36), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 1 = strongest
+    recommended_id = db.Column(db.String(36), db.ForeignKey('coffees.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)  # cosine similarity of the two items' order sets
+    co_orders = db.Column(db.Integer, nullable=False)  # orders containing both items
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'coffee_id': self.coffee_id,
+            'rank': self.rank,
+            'recommended_id': self.recommended_id,
+            'score': round(self.score, 4),
+            'co_orders': self.co_orders,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
+
+class SustainabilityAggregate(db.Model):
+    """Running sustainability totals per café and day, maintained as orders complete"""
+    __tablename__ = 'sustainability_aggregates'
+    
+    cafe_id = db.Column(db.String(36), primary_key=True)  # café id, or '*' for all cafés
+    period = db.Column(db.String(10), primary_key=True)  # 'YYYY-MM-DD' order day, or 'all' for lifetime
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    organic_orders = db.Column(db.Integer, nullable=False, default=0)  # orders with at least one organic line
+    fair_trade_orders = db.Column(db.Integer, nullable=False, default=0)
+    items = db.Column(db.Integer, nullable=False, default=0)  # summed line quantities
+    organic_items = db.Column(db.Integer, nullable=False, default=0)
+    fair_trade_items = db.Column(db.Integer, nullable=False, default=0)
+    eco_items = db.Column(db.Integer, nullable=False, default=0)  # organic or fair-trade
+    carbon_footprint = db.Column(db.Float, nullable=False, default=0.0)  # kg CO2, footprint x quantity per line
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0)  # sustainability_rating x quantity per line
+    rated_items = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'cafe_id': self.cafe_id,
+            'period': self.period,
+            'total_orders': self.orders,
+            'total_organic_orders': self.organic_orders,
+            'total_fair_trade_orders': self.fair_trade_orders,
+            'total_items': self.items,
+            'organic_items': self.organic_items,
+            'fair_trade_items': self.fair_trade_items,
+            'total_co2_saved': round(self.carbon_footprint, 2),
+            'average_sustainability_rating': round(self.rating_sum / self.rated_items, 2) if self.rated_items else 0,
+            'eco_friendly_percentage': round(self.eco_items / self.items * 100, 2) if self.items else 0
+        }
+
 # Database initialization function
 def init_db(app):
     """Initialize database with app context and enhanced sample data"""
     with app.app_context():
-        db.create_all()
+        from ..migrations.indexes import ensure_indexes
+        from ..migrations.schema_version import read_stamp, schema_fingerprint, write_stamp
+        from ..services.startup_profile import phase
+        
+        # A database stamped with the current models' fingerprint is already
+        # created, indexed and seeded: skip the reflection and the seed query
+        fingerprint = schema_fingerprint(db.metadata)
+        with phase('schema version check'), db.engine.connect() as connection:
+            if read_stamp(connection) == fingerprint:
+                return
+        
+        with phase('create_all'):
+            db.create_all()
+        
+        # Bring databases created before newer indexes were declared up to date
+        with phase('ensure_indexes'):
+            ensure_indexes(db.engine, db.metadata)
         
         # Create sample data if database is empty
         if Coffee.query.count() == 0:
@@ -611,6 +868,7 @@ def init_db(app):
             
             for cafe in sample_cafes:
                 db.session.add(cafe)
+            db.session.flush()  # assign café IDs before the events reference them
             
             # Create sample events
             sample_events = [
@@ -675,3 +933,6 @@ def init_db(app):
             print(f"Created {len(sample_cafes)} café locations")
             print(f"Created {len(sample_events)} events")
             print(f"Created {len(sample_promotions)} promotions")
+        
+        with db.engine.begin() as connection:
+            write_stamp(connection, fingerprint)
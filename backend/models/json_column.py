@@ -0,0 +1,137 @@
+"""
+JSON Columns
+Text columns exposed as parsed JSON: decoded lazily once per loaded
+instance, cached, and re-encoded on flush only when changed
+"""
+
+import json
+
+from sqlalchemy import event
+from sqlalchemy.orm import Mapper, Session
+from sqlalchemy.orm.attributes import flag_dirty
+
+_CACHE = '_json_cache'
+_DIRTY = '_json_dirty'
+
+
+def decode(raw):
+    """Parse a column's JSON text; rows written as free text (e.g. "Mumbai, Delhi") read back as that text"""
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def _tracked(container_type, mutators):
+    """Build a list/dict subclass that reports top-level mutations to its owner"""
+
+    def wrap(name):
+        method = getattr(container_type, name)
+
+        def mutate(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            self._on_change()
+            return result
+
+        mutate.__name__ = name
+        return mutate
+
+    namespace = {name: wrap(name) for name in mutators}
+    namespace['__slots__'] = ('_on_change',)
+    return type(f'Tracked{container_type.__name__.title()}', (container_type,), namespace)
+
+
+TrackedList = _tracked(list, (
+    'append', 'extend', 'insert', 'pop', 'remove', 'clear', 'sort', 'reverse',
+    '__setitem__', '__delitem__', '__iadd__', '__imul__'
+))
+TrackedDict = _tracked(dict, (
+    'update', 'pop', 'popitem', 'clear', 'setdefault', '__setitem__', '__delitem__', '__ior__'
+))
+
+
+class JSONColumn:
+    """Descriptor pairing a mapped Text column (holding raw JSON) with its parsed value.
+
+    Declare the raw column under a private attribute and the descriptor under
+    the public name:
+
+        _dietary_tags = db.Column('dietary_tags', db.Text, nullable=True)
+        dietary_tags = JSONColumn('_dietary_tags')
+
+    Class-level access returns the raw column so queries keep working.
+    """
+
+    def __init__(self, raw_attr):
+        self.raw_attr = raw_attr
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return getattr(owner, self.raw_attr)
+        cache = instance.__dict__.setdefault(_CACHE, {})
+        if self.name not in cache:
+            raw = getattr(instance, self.raw_attr)
+            cache[self.name] = self._track(instance, decode(raw))
+        return cache[self.name]
+
+    def __set__(self, instance, value):
+        if isinstance(value, (str, bytes)) or value is None:
+            # Already-encoded JSON goes straight to the column and is parsed on demand
+            instance.__dict__.get(_CACHE, {}).pop(self.name, None)
+            instance.__dict__.get(_DIRTY, {}).pop(self.name, None)
+            setattr(instance, self.raw_attr, value)
+            return
+        instance.__dict__.setdefault(_CACHE, {})[self.name] = self._track(instance, value)
+        self._mark_dirty(instance)
+
+    def _track(self, instance, value):
+        if isinstance(value, list):
+            value = TrackedList(value)
+        elif isinstance(value, dict):
+            value = TrackedDict(value)
+        else:
+            return value
+        value._on_change = lambda: self._mark_dirty(instance)
+        return value
+
+    def _mark_dirty(self, instance):
+        instance.__dict__.setdefault(_DIRTY, {})[self.name] = self
+        flag_dirty(instance)
+
+    def flush(self, instance):
+        value = instance.__dict__[_CACHE][self.name]
+        setattr(instance, self.raw_attr, None if value is None else json.dumps(value))
+
+
+@event.listens_for(Session, 'before_flush')
+def _serialize_dirty_json(session, flush_context, instances):
+    """Encode only the JSON values that were assigned or mutated since the last flush"""
+    for instance in list(session.new) + list(session.dirty):
+        dirty = instance.__dict__.get(_DIRTY)
+        if dirty:
+            for column in dirty.values():
+                column.flush(instance)
+            dirty.clear()
+
+
+def _drop_cache(instance):
+    if instance is not None:  # the session may expire states whose object was already collected
+        instance.__dict__.pop(_CACHE, None)
+        instance.__dict__.pop(_DIRTY, None)
+
+
+@event.listens_for(Mapper, 'expire')
+def _drop_expired_json(instance, attrs):
+    """Expired or refreshed rows must be re-parsed from the reloaded column"""
+    _drop_cache(instance)
+
+
+@event.listens_for(Mapper, 'refresh')
+def _drop_refreshed_json(instance, context, attrs):
+    _drop_cache(instance)
@@ -4,15 +4,51 @@ Handles café location management and filtering
 """
 
 from flask import Blueprint, request, jsonify
-from datetime import datetime
-import uuid
-from models.coffee import db, Cafe
+import threading
+from ..models.coffee import db, Cafe
+from ..services.cache_sync import Resync
+from ..services.spatial_index import GridIndex, bounding_box
+from ..services.pagination import InvalidCursor, Keyset, page_limit, paginate
 
 cafes_bp = Blueprint('cafes', __name__)
 
+# In-process spatial index over café coordinates, built lazily from the DB and
+# rebuilt after another worker adds a café, or every RESYNC_SECONDS
+RESYNC_SECONDS = 600
+cafe_index = GridIndex()
+_cafe_index_lock = threading.Lock()
+_cafe_index_loaded = False
+_cafe_index_sync = Resync(max_age=RESYNC_SECONDS)
+
+CAFE_KEYSET = Keyset(Cafe.name, Cafe.id)
+
+def _ensure_cafe_index():
+    """Load every café's coordinates into a fresh spatial index in one pass when missing or stale"""
+    global cafe_index, _cafe_index_loaded
+    if _cafe_index_loaded and not _cafe_index_sync.due():
+        return
+    with _cafe_index_lock:
+        if _cafe_index_loaded and not _cafe_index_sync.due():
+            return
+        generation = _cafe_index_sync.generation
+        index = GridIndex()
+        rows = db.session.query(Cafe.id, Cafe.latitude, Cafe.longitude).filter(
+            Cafe.latitude.isnot(None), Cafe.longitude.isnot(None)
+        ).yield_per(1000)
+        for cafe_id, latitude, longitude in rows:
+            index.insert(cafe_id, latitude, longitude)
+        # Swapped in whole, so concurrent lookups never see a half-built index
+        cafe_index = index
+        _cafe_index_loaded = True
+        _cafe_index_sync.synced(generation)
+
+def warm_cafe_index():
+    """Build the spatial index now (e.g. in a preloading master) rather than on first use"""
+    _ensure_cafe_index()
+
 @cafes_bp.route('/', methods=['GET'])
 def get_cafes():
-    """Get all café locations with filtering"""
+    """Get café locations with filtering, by name and cursor-paginated"""
     try:
         # Filter parameters
         city = request.args.get('city')
@@ -21,26 +57,34 @@ def get_cafes():
         open_mic = request.args.get('open_mic', '').lower()
         coworking = request.args.get('coworking', '').lower()
         
-        query = Cafe.query
+        query = db.select(Cafe)
         
         if city:
-            query = query.filter(Cafe.city.ilike(f'%{city}%'))
+            query = query.where(Cafe.city.ilike(f'%{city}%'))
         if wifi == 'true':
-            query = query.filter(Cafe.wifi_available == True)
+            query = query.where(Cafe.wifi_available == True)
         if parking == 'true':
-            query = query.filter(Cafe.parking_available == True)
+            query = query.where(Cafe.parking_available == True)
         if open_mic == 'true':
-            query = query.filter(Cafe.open_mic_nights == True)
+            query = query.where(Cafe.open_mic_nights == True)
         if coworking == 'true':
-            query = query.filter(Cafe.coworking_friendly == True)
+            query = query.where(Cafe.coworking_friendly == True)
         
-        cafes = query.all()
+        cafes, next_cursor = paginate(
+            db.session, query, CAFE_KEYSET, request.args.get('cursor'), page_limit(request.args), scalars=True
+        )
         
         return jsonify({
             'success': True,
             'data': [cafe.to_dict() for cafe in cafes],
-            'count': len(cafes)
+            'count': len(cafes),
+            'next_cursor': next_cursor
         }), 200
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -51,7 +95,7 @@ def get_cafes():
 def get_cafe(cafe_id):
     """Get specific café by ID"""
     try:
-        cafe = Cafe.query.get(cafe_id)
+        cafe = db.session.get(Cafe, cafe_id)
         if not cafe:
             return jsonify({
                 'success': False,
@@ -70,30 +114,44 @@ def get_cafe(cafe_id):
 
 @cafes_bp.route('/nearby', methods=['GET'])
 def get_nearby_cafes():
-    """Get nearby cafés based on coordinates"""
+    """Get nearby cafés sorted by distance, within a radius and/or the k nearest"""
     try:
         latitude = request.args.get('lat', type=float)
         longitude = request.args.get('lng', type=float)
-        radius = request.args.get('radius', 10, type=float)  # km
+        radius = request.args.get('radius', type=float)  # km
+        k = request.args.get('k', type=int)
         
-        if not latitude or not longitude:
+        if latitude is None or longitude is None:
             return jsonify({
                 'success': False,
                 'error': 'Latitude and longitude are required'
             }), 400
         
-        # Simple distance calculation (for production, use proper geospatial queries)
-        cafes = Cafe.query.all()
-        nearby_cafes = []
+        if k is None and radius is None:
+            radius = 10
         
-        for cafe in cafes:
-            if cafe.latitude and cafe.longitude:
-                # Calculate distance (simplified)
-                lat_diff = abs(cafe.latitude - latitude)
-                lng_diff = abs(cafe.longitude - longitude)
-                distance = (lat_diff + lng_diff) * 111  # Rough km conversion
-                
-                if distance <= radius:
+        _ensure_cafe_index()
+        if k is not None:
+            matches = cafe_index.nearest(latitude, longitude, k, radius_km=radius)
+        else:
+            matches = cafe_index.within(latitude, longitude, radius)
+        
+        nearby_cafes = []
+        if matches:
+            # Hydrate only the matched rows; the bounding box lets SQLite use
+            # the (latitude, longitude) index and drops rows moved since indexing
+            min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, matches[-1][0] + 0.01)
+            cafes = {
+                cafe.id: cafe
+                for cafe in Cafe.query.filter(
+                    Cafe.latitude.between(min_lat, max_lat),
+                    Cafe.longitude.between(min_lng, max_lng),
+                    Cafe.id.in_([cafe_id for _, cafe_id in matches])
+                )
+            }
+            for distance, cafe_id in matches:
+                cafe = cafes.get(cafe_id)
+                if cafe:
                     cafe_data = cafe.to_dict()
                     cafe_data['distance'] = round(distance, 2)
                     nearby_cafes.append(cafe_data)
@@ -145,6 +203,11 @@ def create_cafe():
         db.session.add(new_cafe)
         db.session.commit()
         
+        # Keep this worker's spatial index in sync; the others rebuild theirs
+        if _cafe_index_loaded and new_cafe.latitude is not None and new_cafe.longitude is not None:
+            cafe_index.insert(new_cafe.id, new_cafe.latitude, new_cafe.longitude)
+        _cafe_index_sync.bump(applied=True)
+        
         return jsonify({
             'success': True,
             'data': new_cafe.to_dict(),
@@ -4,37 +4,51 @@ Handles café events, bookings, and community features
 """
 
 from flask import Blueprint, request, jsonify
-from datetime import datetime, timedelta
-import uuid
-from ..models.coffee import db, Event, Cafe
+from datetime import datetime
+from ..models.coffee import db, Event, EventBooking
+from ..services.serialization import event_serializer, event_booking_serializer, json_response
+from ..services.pagination import InvalidCursor, Keyset, page_limit, paginate
 
 events_bp = Blueprint('events', __name__)
 
+EVENT_KEYSET = Keyset(Event.start_time, Event.id)
+
 @events_bp.route('/', methods=['GET'])
 def get_events():
-    """Get all events with filtering"""
+    """Get events with filtering, in start order and cursor-paginated"""
     try:
         # Filter parameters
         cafe_id = request.args.get('cafe_id')
         event_type = request.args.get('type')
         upcoming_only = request.args.get('upcoming', 'true').lower() == 'true'
+        cursor = request.args.get('cursor')
+        now = datetime.now()
         
-        query = Event.query.filter_by(is_active=True)
+        query = event_serializer.select().where(Event.is_active == True)
         
         if cafe_id:
-            query = query.filter_by(cafe_id=cafe_id)
+            query = query.where(Event.cafe_id == cafe_id)
         if event_type:
-            query = query.filter_by(event_type=event_type)
-        if upcoming_only:
-            query = query.filter(Event.start_time > datetime.now())
+            query = query.where(Event.event_type == event_type)
+        # A cursor already past now bounds start_time by itself; keeping both range
+        # conditions would let SQLite seek on start_time > now and scan to the cursor
+        if upcoming_only and not (cursor and EVENT_KEYSET.decode(cursor)[0] > now):
+            query = query.where(Event.start_time > now)
         
-        events = query.order_by(Event.start_time.asc()).all()
+        rows, next_cursor = paginate(db.session, query, EVENT_KEYSET, cursor, page_limit(request.args))
+        events = event_serializer.rows(rows)
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'data': [event.to_dict() for event in events],
-            'count': len(events)
-        }), 200
+            'data': events,
+            'count': len(events),
+            'next_cursor': next_cursor
+        }, 200)
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -45,7 +59,7 @@ def get_events():
 def get_event(event_id):
     """Get specific event by ID"""
     try:
-        event = Event.query.get(event_id)
+        event = db.session.get(Event, event_id)
         if not event:
             return jsonify({
                 'success': False,
@@ -124,7 +138,13 @@ def book_event(event_id):
                 'error': 'User ID is required'
             }), 400
         
-        event = Event.query.get(event_id)
+        if not isinstance(tickets, int) or tickets <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'Tickets must be a positive integer'
+            }), 400
+        
+        event = db.session.get(Event, event_id)
         if not event:
             return jsonify({
                 'success': False,
@@ -143,26 +163,46 @@ def book_event(event_id):
                 'error': 'Event has already started'
             }), 400
         
-        # Check capacity
-        if event.max_capacity and (event.current_bookings + tickets) > event.max_capacity:
+        # Reserve capacity with one conditional UPDATE so simultaneous
+        # bookings can never push current_bookings past max_capacity
+        booked = db.func.coalesce(Event.current_bookings, 0)
+        current_bookings = db.session.execute(
+            db.update(Event)
+            .where(
+                Event.id == event_id,
+                db.or_(Event.max_capacity.is_(None), booked + tickets <= Event.max_capacity)
+            )
+            .values(current_bookings=booked + tickets)
+            .returning(Event.current_bookings)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        
+        if current_bookings is None:
+            db.session.rollback()
             return jsonify({
                 'success': False,
                 'error': 'Event is fully booked'
             }), 400
         
-        # Update bookings
-        event.current_bookings += tickets
-        
+        max_capacity = event.max_capacity
+        booking = EventBooking(
+            event_id=event_id,
+            user_id=user_id,
+            tickets=tickets,
+            total_cost=(event.price or 0.0) * tickets
+        )
+        db.session.add(booking)
         db.session.commit()
         
         return jsonify({
             'success': True,
             'data': {
-                'event_id': event.id,
+                'booking_id': booking.id,
+                'event_id': event_id,
                 'user_id': user_id,
                 'tickets': tickets,
-                'total_cost': event.price * tickets,
-                'remaining_capacity': event.max_capacity - event.current_bookings if event.max_capacity else None
+                'total_cost': booking.total_cost,
+                'remaining_capacity': max_capacity - current_bookings if max_capacity else None
             },
             'message': 'Event booked successfully'
         }), 200
@@ -174,6 +214,48 @@ def book_event(event_id):
             'error': str(e)
         }), 500
 
+@events_bp.route('/<event_id>/bookings', methods=['GET'])
+def get_event_bookings(event_id):
+    """Get bookings for an event, optionally for a single user"""
+    try:
+        user_id = request.args.get('user_id')
+        
+        query = event_booking_serializer.select().where(EventBooking.event_id == event_id)
+        if user_id:
+            query = query.where(EventBooking.user_id == user_id)
+        
+        bookings = event_booking_serializer.rows(db.session.execute(query.order_by(EventBooking.created_at.asc())))
+        
+        return json_response({
+            'success': True,
+            'data': bookings,
+            'count': len(bookings)
+        }, 200)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@events_bp.route('/bookings/user/<user_id>', methods=['GET'])
+def get_user_bookings(user_id):
+    """Get all event bookings made by a user"""
+    try:
+        bookings = event_booking_serializer.rows(db.session.execute(
+            event_booking_serializer.select().where(EventBooking.user_id == user_id)
+        ))
+        
+        return json_response({
+            'success': True,
+            'data': bookings,
+            'count': len(bookings)
+        }, 200)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @events_bp.route('/types', methods=['GET'])
 def get_event_types():
     """Get all available event types"""
@@ -3,18 +3,101 @@ Loyalty & Rewards API Routes
 Handles loyalty points, rewards, and gamification
 """
 
-from flask import Blueprint, request, jsonify
-from datetime import datetime, timedelta
-import uuid
-from ..models.coffee import db, User, LoyaltyTransaction, Order
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from datetime import datetime
+import json
+import threading
+from ..models.coffee import db, User, LoyaltyTransaction, Cafe
+from ..services.cache_sync import Resync
+from ..services.leaderboard import LeaderboardRegistry
+from ..services.loyalty_ledger import award_points_bulk
+from ..services.serialization import loyalty_transaction_serializer, json_response
+from ..services.pagination import InvalidCursor, Keyset, page_limit, paginate
 
 loyalty_bp = Blueprint('loyalty', __name__)
 
+# Incrementally maintained leaderboards (global, per city, per home café);
+# points other workers award only show up here at the next resync
+RESYNC_SECONDS = 60
+leaderboards = LeaderboardRegistry()
+_leaderboard_lock = threading.Lock()
+_leaderboard_sync = Resync(max_age=RESYNC_SECONDS)
+_cafe_cities = {}
+
+TRANSACTION_KEYSET = Keyset(LoyaltyTransaction.created_at, LoyaltyTransaction.id, descending=True)
+
+def _home_cafe_id(preferred_cafes):
+    """A member's home café is the first of their preferred cafés (parsed list or raw JSON)"""
+    cafes = preferred_cafes or []
+    if isinstance(cafes, str):
+        try:
+            cafes = json.loads(cafes)
+        except ValueError:
+            return None
+    return cafes[0] if isinstance(cafes, list) and cafes else None
+
+def _cafe_city(cafe_id):
+    if cafe_id and cafe_id not in _cafe_cities:
+        cafe = db.session.get(Cafe, cafe_id)
+        _cafe_cities[cafe_id] = cafe.city if cafe else None
+    return _cafe_cities.get(cafe_id)
+
+def track_leaderboard(user):
+    """Move a member on the leaderboards after their points changed"""
+    if not leaderboards.loaded:
+        return  # picked up by the next full rebuild
+    cafe_id = _home_cafe_id(user.preferred_cafes)
+    leaderboards.update(
+        user.id, user.loyalty_points or 0,
+        username=user.username,
+        level=user.loyalty_level,
+        total_orders=user.total_orders,
+        city=_cafe_city(cafe_id),
+        cafe_id=cafe_id
+    )
+
+def _rebuild_leaderboards():
+    """Build every leaderboard from the database in one streaming pass; callers hold _leaderboard_lock"""
+    global leaderboards, _cafe_cities
+    generation = _leaderboard_sync.generation
+    boards = LeaderboardRegistry()
+    cities = dict(db.session.query(Cafe.id, Cafe.city).all())
+    rows = db.session.query(
+        User.id, User.username, User.loyalty_points, User.loyalty_level,
+        User.total_orders, User.preferred_cafes
+    ).yield_per(5000)
+    for user_id, username, points, level, total_orders, preferred_cafes in rows:
+        cafe_id = _home_cafe_id(preferred_cafes)
+        boards.update(
+            user_id, points or 0,
+            username=username,
+            level=level,
+            total_orders=total_orders,
+            city=cities.get(cafe_id),
+            cafe_id=cafe_id
+        )
+    boards.loaded = True
+    # Swapped in whole, so concurrent reads never see a half-built board
+    leaderboards, _cafe_cities = boards, cities
+    _leaderboard_sync.synced(generation)
+
+def warm_leaderboards():
+    """Rebuild all leaderboards from the database in one streaming pass"""
+    with _leaderboard_lock:
+        _rebuild_leaderboards()
+
+def _ensure_leaderboards():
+    if leaderboards.loaded and not _leaderboard_sync.due():
+        return
+    with _leaderboard_lock:
+        if not leaderboards.loaded or _leaderboard_sync.due():
+            _rebuild_leaderboards()
+
 @loyalty_bp.route('/<user_id>/points', methods=['GET'])
 def get_user_points(user_id):
     """Get user's loyalty points and level"""
     try:
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         if not user:
             return jsonify({
                 'success': False,
@@ -54,15 +137,28 @@ def get_user_points(user_id):
 
 @loyalty_bp.route('/<user_id>/transactions', methods=['GET'])
 def get_loyalty_transactions(user_id):
-    """Get user's loyalty transaction history"""
+    """Get user's loyalty transaction history, newest first and cursor-paginated"""
     try:
-        transactions = LoyaltyTransaction.query.filter_by(user_id=user_id).order_by(LoyaltyTransaction.created_at.desc()).all()
+        rows, next_cursor = paginate(
+            db.session,
+            loyalty_transaction_serializer.select().where(LoyaltyTransaction.user_id == user_id),
+            TRANSACTION_KEYSET,
+            request.args.get('cursor'),
+            page_limit(request.args)
+        )
+        transactions = loyalty_transaction_serializer.rows(rows)
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'data': [transaction.to_dict() for transaction in transactions],
-            'count': len(transactions)
-        }), 200
+            'data': transactions,
+            'count': len(transactions),
+            'next_cursor': next_cursor
+        }, 200)
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -84,7 +180,7 @@ def earn_points(user_id):
                 'error': 'Points must be positive'
             }), 400
         
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         if not user:
             return jsonify({
                 'success': False,
@@ -105,6 +201,7 @@ def earn_points(user_id):
         
         db.session.add(transaction)
         db.session.commit()
+        track_leaderboard(user)
         
         return jsonify({
             'success': True,
@@ -119,6 +216,64 @@ def earn_points(user_id):
             'error': str(e)
         }), 500
 
+def _track_members(members):
+    """Leaderboard hook for bulk awards: the profile rows of the members whose points changed"""
+    for member in members:
+        track_leaderboard(member)
+
+@loyalty_bp.route('/bulk-earn', methods=['POST'])
+def bulk_earn_points():
+    """Award points to many users at once.
+    
+    Accepts either a JSON body {"awards": [...]} or an NDJSON stream
+    (Content-Type: application/x-ndjson) with one award object per line.
+    NDJSON requests get a streamed NDJSON response of per-record outcomes.
+    """
+    try:
+        chunk_size = min(max(request.args.get('chunk_size', 5000, type=int), 1), 50000)
+        
+        if request.mimetype == 'application/x-ndjson':
+            def read_records():
+                for line in request.stream:
+                    line = line.strip()
+                    if line:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            yield {}
+            
+            def generate():
+                for outcome in award_points_bulk(read_records(), chunk_size=chunk_size, on_commit=_track_members):
+                    yield json.dumps(outcome) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        data = request.get_json()
+        if not data or not isinstance(data.get('awards'), list):
+            return jsonify({
+                'success': False,
+                'error': 'awards list is required'
+            }), 400
+        
+        outcomes = list(award_points_bulk(data['awards'], chunk_size=chunk_size, on_commit=_track_members))
+        succeeded = sum(1 for outcome in outcomes if outcome['success'])
+        
+        return jsonify({
+            'success': True,
+            'data': outcomes,
+            'count': len(outcomes),
+            'succeeded': succeeded,
+            'failed': len(outcomes) - succeeded,
+            'message': f'{succeeded} of {len(outcomes)} awards applied'
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @loyalty_bp.route('/<user_id>/redeem', methods=['POST'])
 def redeem_points(user_id):
     """Redeem loyalty points"""
@@ -133,7 +288,7 @@ def redeem_points(user_id):
                 'error': 'Points must be positive'
             }), 400
         
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         if not user:
             return jsonify({
                 'success': False,
@@ -159,6 +314,7 @@ def redeem_points(user_id):
         
         db.session.add(transaction)
         db.session.commit()
+        track_leaderboard(user)
         
         return jsonify({
             'success': True,
@@ -175,23 +331,15 @@ def redeem_points(user_id):
 
 @loyalty_bp.route('/leaderboard', methods=['GET'])
 def get_leaderboard():
-    """Get loyalty points leaderboard"""
+    """Get loyalty points leaderboard (global, per city or per café)"""
     try:
-        limit = request.args.get('limit', 10, type=int)
-        
-        # Get top users by loyalty points
-        top_users = User.query.order_by(User.loyalty_points.desc()).limit(limit).all()
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        city = request.args.get('city')
+        cafe_id = request.args.get('cafe_id')
         
-        leaderboard = []
-        for i, user in enumerate(top_users, 1):
-            leaderboard.append({
-                'rank': i,
-                'user_id': user.id,
-                'username': user.username,
-                'points': user.loyalty_points,
-                'level': user.loyalty_level,
-                'total_orders': user.total_orders
-            })
+        _ensure_leaderboards()
+        leaderboard = leaderboards.top(limit, offset=offset, city=city, cafe_id=cafe_id)
         
         return jsonify({
             'success': True,
@@ -204,11 +352,42 @@ def get_leaderboard():
             'error': str(e)
         }), 500
 
+@loyalty_bp.route('/<user_id>/rank', methods=['GET'])
+def get_user_rank(user_id):
+    """Get user's rank on the global, city or café leaderboard"""
+    try:
+        city = request.args.get('city')
+        cafe_id = request.args.get('cafe_id')
+        
+        _ensure_leaderboards()
+        rank, members = leaderboards.rank(user_id, city=city, cafe_id=cafe_id)
+        if rank is None:
+            return jsonify({
+                'success': False,
+                'error': 'User not found on this leaderboard'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'user_id': user_id,
+                'rank': rank,
+                'total_members': members,
+                'city': city,
+                'cafe_id': cafe_id
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @loyalty_bp.route('/<user_id>/streak', methods=['POST'])
 def update_streak(user_id):
     """Update user's streak based on order activity"""
     try:
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         if not user:
             return jsonify({
                 'success': False,
@@ -3,9 +3,15 @@ Menu API Routes
 Handles all menu-related operations
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from datetime import datetime
 import uuid
+import hashlib
+import threading
+from ..models.coffee import db, Coffee
+from ..services.cache_sync import Resync, SharedDocument
+from ..services.serialization import dumps
+from ..services import recommendations
 
 menu_bp = Blueprint('menu', __name__)
 
@@ -61,6 +67,66 @@ menu_items = [
     }
 ]
 
+# The menu lives in process memory, so edits are published as a shared copy
+# that the other workers of a prefork server load on their next menu request
+MENU_DOCUMENT_BYTES = 1 << 20
+_menu_document = SharedDocument(MENU_DOCUMENT_BYTES)
+_menu_sync = Resync()
+
+# Pre-encoded response bodies per view, valid for the current menu generation
+_menu_views = {}
+_menu_lock = threading.Lock()
+
+def _invalidate_menu():
+    """Drop every cached view; called whenever a menu item changes"""
+    with _menu_lock:
+        _menu_views.clear()
+
+def _load_shared_menu():
+    """Replace this worker's items with the last published copy; callers hold _menu_document.lock"""
+    shared = _menu_document.read()
+    if shared is not None:
+        menu_items[:] = shared
+
+def _refresh_menu():
+    """Pick up menu edits made by any worker since this one last looked"""
+    if not _menu_sync.due():
+        return
+    generation = _menu_sync.generation
+    with _menu_document.lock:
+        _load_shared_menu()
+    _invalidate_menu()
+    _menu_sync.synced(generation)
+
+def _publish_menu():
+    """Share this worker's edited items; callers hold _menu_document.lock"""
+    _menu_document.write(menu_items)
+
+def _view_etag(view):
+    digest = hashlib.sha1(repr(view).encode('utf-8')).hexdigest()[:12]
+    return f'"menu-{_menu_sync.generation}-{digest}"'
+
+def _cached_response(view, build):
+    """Serve a view from cache, answering If-None-Match with 304 before touching any data"""
+    _refresh_menu()
+    etag = _view_etag(view)
+    if request.if_none_match.contains(etag.strip('"')):
+        response = Response(status=304)
+    else:
+        cached = _menu_views.get(view)
+        if cached is None or cached[0] != etag:
+            with _menu_lock:
+                etag = _view_etag(view)
+                body = dumps(build())
+                if len(_menu_views) >= 256:
+                    _menu_views.clear()  # arbitrary ?category= values must not grow the cache unbounded
+                cached = _menu_views[view] = (etag, body)
+        etag, body = cached
+        response = Response(body, status=200, mimetype='application/json')
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @menu_bp.route('/', methods=['GET'])
 def get_menu():
     """Get all menu items"""
@@ -69,19 +135,22 @@ def get_menu():
         category = request.args.get('category')
         available_only = request.args.get('available', 'true').lower() == 'true'
         
-        filtered_items = menu_items
-        
-        if category:
-            filtered_items = [item for item in filtered_items if item['category'] == category]
+        def build():
+            filtered_items = menu_items
+            
+            if category:
+                filtered_items = [item for item in filtered_items if item['category'] == category]
+            
+            if available_only:
+                filtered_items = [item for item in filtered_items if item['available']]
+            
+            return {
+                'success': True,
+                'data': filtered_items,
+                'count': len(filtered_items)
+            }
         
-        if available_only:
-            filtered_items = [item for item in filtered_items if item['available']]
-        
-        return jsonify({
-            'success': True,
-            'data': filtered_items,
-            'count': len(filtered_items)
-        }), 200
+        return _cached_response(('items', category or '*', int(available_only)), build)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -92,6 +161,7 @@ def get_menu():
 def get_menu_item(item_id):
     """Get specific menu item by ID"""
     try:
+        _refresh_menu()
         item = next((item for item in menu_items if item['id'] == item_id), None)
         if not item:
             return jsonify({
@@ -138,7 +208,12 @@ def create_menu_item():
             'updated_at': datetime.now().isoformat()
         }
         
-        menu_items.append(new_item)
+        with _menu_document.lock:
+            _load_shared_menu()
+            menu_items.append(new_item)
+            _publish_menu()
+        _menu_sync.bump()
+        _invalidate_menu()
         
         return jsonify({
             'success': True,
@@ -158,21 +233,27 @@ def update_menu_item(item_id):
     try:
         data = request.get_json()
         
-        # Find item
-        item = next((item for item in menu_items if item['id'] == item_id), None)
-        if not item:
-            return jsonify({
-                'success': False,
-                'error': 'Menu item not found'
-            }), 404
-        
-        # Update allowed fields
-        updatable_fields = ['name', 'description', 'price', 'category', 'size', 'available', 'image_url']
-        for field in updatable_fields:
-            if field in data:
-                item[field] = data[field]
-        
-        item['updated_at'] = datetime.now().isoformat()
+        with _menu_document.lock:
+            _load_shared_menu()
+            
+            # Find item
+            item = next((item for item in menu_items if item['id'] == item_id), None)
+            if not item:
+                return jsonify({
+                    'success': False,
+                    'error': 'Menu item not found'
+                }), 404
+            
+            # Update allowed fields
+            updatable_fields = ['name', 'description', 'price', 'category', 'size', 'available', 'image_url']
+            for field in updatable_fields:
+                if field in data:
+                    item[field] = data[field]
+            
+            item['updated_at'] = datetime.now().isoformat()
+            _publish_menu()
+        _menu_sync.bump()
+        _invalidate_menu()
         
         return jsonify({
             'success': True,
@@ -190,10 +271,62 @@ def update_menu_item(item_id):
 def get_categories():
     """Get all menu categories"""
     try:
-        categories = list(set(item['category'] for item in menu_items))
+        def build():
+            categories = list(set(item['category'] for item in menu_items))
+            return {
+                'success': True,
+                'data': categories
+            }
+        
+        return _cached_response(('categories',), build)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def _recommendation_limit():
+    """Clamp ?limit= to the number of neighbours the job stores per item"""
+    return min(max(request.args.get('limit', recommendations.DEFAULT_LIMIT, type=int), 1), recommendations.TOP_K)
+
+@menu_bp.route('/<item_id>/recommendations', methods=['GET'])
+def get_item_recommendations(item_id):
+    """Get items customers also ordered with this one, from the precomputed lists"""
+    try:
+        rows = recommendations.for_item(db.session, item_id, _recommendation_limit())
+        if not rows and db.session.get(Coffee, item_id) is None:
+            return jsonify({
+                'success': False,
+                'error': 'Menu item not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': [
+                {**coffee.to_dict(), 'score': round(recommendation.score, 4), 'co_orders': recommendation.co_orders}
+                for recommendation, coffee in rows
+            ],
+            'count': len(rows)
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@menu_bp.route('/recommendations/user/<user_id>', methods=['GET'])
+def get_user_recommendations(user_id):
+    """Get recommendations for a user from their favourites and recent orders"""
+    try:
+        picked = recommendations.for_user(db.session, user_id, _recommendation_limit())
+        
         return jsonify({
             'success': True,
-            'data': categories
+            'data': [
+                {**coffee.to_dict(), 'score': round(score, 4), 'reason': reason}
+                for coffee, score, reason in picked
+            ],
+            'count': len(picked)
         }), 200
     except Exception as e:
         return jsonify({
@@ -4,36 +4,77 @@ Handles all order-related operations
 """
 
 from flask import Blueprint, request, jsonify
-from datetime import datetime
-import uuid
+from ..models.coffee import db, Coffee, Order, OrderItem, OrderTracking
+from ..services.order_events import order_events
+from ..services.pagination import InvalidCursor, Keyset, page_limit, paginate
+from ..services import eager_loading, kitchen_display, kitchen_scheduler
 
 orders_bp = Blueprint('orders', __name__)
 
-# Mock data for development
-orders_db = [
-    {
-        'id': '1',
-        'customer_id': '1',
-        'items': [
-            {'coffee_id': '1', 'name': 'Espresso', 'quantity': 2, 'price': 3.50},
-            {'coffee_id': '2', 'name': 'Cappuccino', 'quantity': 1, 'price': 4.50}
-        ],
-        'total': 11.50,
-        'status': 'pending',
-        'created_at': '2024-01-15T10:30:00Z',
-        'updated_at': '2024-01-15T10:30:00Z'
-    }
-]
+ORDER_HISTORY_KEYSET = Keyset(Order.created_at, Order.id, descending=True)
 
 @orders_bp.route('/', methods=['GET'])
 def get_orders():
-    """Get all orders"""
+    """Get orders newest first, filtered by customer/status and cursor-paginated"""
     try:
+        filters = []
+        if request.args.get('customer_id'):
+            filters.append(Order.customer_id == request.args['customer_id'])
+        if request.args.get('status'):
+            filters.append(Order.status == request.args['status'])
+        
+        orders, next_cursor = paginate(
+            db.session,
+            eager_loading.ORDER_GRAPH.apply(db.select(Order).where(*filters)),
+            ORDER_HISTORY_KEYSET,
+            request.args.get('cursor'),
+            page_limit(request.args),
+            scalars=True
+        )
+        total = db.session.scalar(db.select(db.func.count()).select_from(Order).where(*filters))
+        
         return jsonify({
             'success': True,
-            'data': orders_db,
-            'count': len(orders_db)
+            'data': [order.to_dict() for order in orders],
+            'count': len(orders),
+            'total': total,
+            'next_cursor': next_cursor
         }), 200
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@orders_bp.route('/history/<customer_id>', methods=['GET'])
+def get_order_history(customer_id):
+    """Get a customer's orders with their items from the database, newest first, cursor-paginated"""
+    try:
+        orders, next_cursor = paginate(
+            db.session,
+            eager_loading.orders_for_customer(customer_id, status=request.args.get('status')),
+            ORDER_HISTORY_KEYSET,
+            request.args.get('cursor'),
+            page_limit(request.args),
+            scalars=True
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': [order.to_dict() for order in orders],
+            'count': len(orders),
+            'next_cursor': next_cursor
+        }), 200
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -44,7 +85,7 @@ def get_orders():
 def get_order(order_id):
     """Get specific order by ID"""
     try:
-        order = next((order for order in orders_db if order['id'] == order_id), None)
+        order = db.session.execute(eager_loading.order_detail(order_id)).unique().scalar_one_or_none()
         if not order:
             return jsonify({
                 'success': False,
@@ -53,7 +94,7 @@ def get_order(order_id):
         
         return jsonify({
             'success': True,
-            'data': order
+            'data': order.to_dict()
         }), 200
     except Exception as e:
         return jsonify({
@@ -74,18 +115,78 @@ def create_order():
                 'error': 'Missing required fields: customer_id, items'
             }), 400
         
-        # Create new order
-        new_order = {
-            'id': str(uuid.uuid4()),
-            'customer_id': data['customer_id'],
-            'items': data['items'],
-            'total': sum(item.get('price', 0) * item.get('quantity', 1) for item in data['items']),
-            'status': 'pending',
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
+        # Aggregate requested quantities per menu item
+        quantities = {}
+        for item in data['items']:
+            coffee_id = item.get('coffee_id')
+            quantity = item.get('quantity', 1)
+            if not coffee_id or not isinstance(quantity, int) or quantity <= 0:
+                return jsonify({
+                    'success': False,
+                    'error': 'Each item needs a coffee_id and a positive integer quantity'
+                }), 400
+            quantities[coffee_id] = quantities.get(coffee_id, 0) + quantity
+        
+        # Resolve all prices with a single IN (...) query; client prices are ignored
+        coffees = {
+            coffee.id: coffee
+            for coffee in Coffee.query.filter(Coffee.id.in_(list(quantities))).all()
         }
+        missing = [coffee_id for coffee_id in quantities if coffee_id not in coffees]
+        if missing:
+            return jsonify({
+                'success': False,
+                'error': f'Menu items not found: {", ".join(missing)}'
+            }), 400
+        unavailable = [coffees[coffee_id].name for coffee_id in quantities if not coffees[coffee_id].available]
+        if unavailable:
+            return jsonify({
+                'success': False,
+                'error': f'Items currently unavailable: {", ".join(unavailable)}'
+            }), 400
+        
+        order = Order(
+            customer_id=data['customer_id'],
+            total=sum(coffees[coffee_id].price * quantity for coffee_id, quantity in quantities.items()),
+            status='pending',
+            order_type=data.get('order_type', 'dine_in'),
+            cafe_id=data.get('cafe_id'),
+            table_number=data.get('table_number'),
+            payment_method=data.get('payment_method'),
+            customization_notes=data.get('customization_notes')
+        )
+        for item in data['items']:
+            coffee = coffees[item['coffee_id']]
+            order.items.append(OrderItem(
+                coffee_id=coffee.id,
+                quantity=item.get('quantity', 1),
+                price=coffee.price,
+                special_instructions=item.get('special_instructions')
+            ))
         
-        orders_db.append(new_order)
+        # Decrement stock atomically; the WHERE clause makes overselling impossible
+        # even when concurrent orders race for the last units. Sorted ids keep
+        # lock acquisition order stable across transactions.
+        for coffee_id in sorted(quantities):
+            quantity = quantities[coffee_id]
+            result = db.session.execute(
+                db.update(Coffee)
+                .where(Coffee.id == coffee_id, Coffee.stock_quantity >= quantity)
+                .values(stock_quantity=Coffee.stock_quantity - quantity)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount != 1:
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'error': f'Insufficient stock for {coffees[coffee_id].name}'
+                }), 409
+        
+        # Order and all order items are written in the same transaction
+        db.session.add(order)
+        db.session.flush()
+        new_order = order.to_dict()
+        db.session.commit()
         
         return jsonify({
             'success': True,
@@ -94,6 +195,7 @@ def create_order():
         }), 201
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'error': str(e)
@@ -112,24 +214,42 @@ def update_order_status(order_id):
                 'error': 'Status is required'
             }), 400
         
-        # Find and update order
-        order = next((order for order in orders_db if order['id'] == order_id), None)
+        if new_status not in kitchen_display.ORDER_STATUSES:
+            return jsonify({
+                'success': False,
+                'error': f'status must be one of: {", ".join(kitchen_display.ORDER_STATUSES)}'
+            }), 400
+        
+        order = db.session.get(Order, order_id)
         if not order:
             return jsonify({
                 'success': False,
                 'error': 'Order not found'
             }), 404
         
-        order['status'] = new_status
-        order['updated_at'] = datetime.now().isoformat()
+        # Same path as the kitchen display: tracking row, rollups, green points and ticket in one transaction
+        changes, _, tracking = kitchen_display.transition(db.session, order.cafe_id, [order_id], new_status)
+        db.session.commit()
+        
+        try:
+            kitchen_scheduler.orders_changed(db.session, changes)
+        except Exception:
+            # The change is committed; rebuild the café's queue from the database on next use
+            kitchen_scheduler.kitchens.invalidate(order.cafe_id)
+        
+        for row in tracking:
+            order_events.publish(row['order_id'], row['id'], OrderTracking(**row).to_dict())
+        
+        order = db.session.execute(eager_loading.order_detail(order_id)).unique().scalar_one()
         
         return jsonify({
             'success': True,
-            'data': order,
+            'data': order.to_dict(),
             'message': 'Order status updated successfully'
         }), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'error': str(e)
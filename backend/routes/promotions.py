@@ -4,47 +4,81 @@ Handles marketing promotions, offers, and geo-targeted campaigns
 """
 
 from flask import Blueprint, request, jsonify
-from datetime import datetime, timedelta
-import uuid
+from datetime import datetime
+import threading
 from ..models.coffee import db, Promotion
+from ..services.cache_sync import Resync
+from ..services.promotion_engine import CompiledPromotion, PromotionEngine, parse_cities
+from ..services.serialization import promotion_serializer, json_response
+from ..services.pagination import InvalidCursor, Keyset, page_limit, paginate
 
 promotions_bp = Blueprint('promotions', __name__)
 
+# Compiled active promotions keyed by promo code; checkout never hits the DB
+promotion_engine = PromotionEngine()
+_promotion_lock = threading.Lock()
+# Other workers create and use promotions too: recompile after their changes,
+# and every RESYNC_SECONDS for promotions edited outside the API
+RESYNC_SECONDS = 300
+_promotion_sync = Resync(max_age=RESYNC_SECONDS)
+
+PROMOTION_KEYSET = Keyset(Promotion.created_at, Promotion.id, descending=True)
+
+def _ensure_promotions():
+    if promotion_engine.loaded and not _promotion_sync.due():
+        return
+    with _promotion_lock:
+        if not promotion_engine.loaded or _promotion_sync.due():
+            generation = _promotion_sync.generation
+            promotion_engine.load(
+                Promotion.query.filter(Promotion.is_active == True, Promotion.promo_code.isnot(None)).yield_per(5000)
+            )
+            _promotion_sync.synced(generation)
+
+def warm_promotions():
+    """Compile active promotions now (e.g. in a preloading master) rather than on first use"""
+    _ensure_promotions()
+
 @promotions_bp.route('/', methods=['GET'])
 def get_promotions():
-    """Get all active promotions"""
+    """Get active promotions, newest first and cursor-paginated"""
     try:
         # Filter parameters
         promo_type = request.args.get('type')
         city = request.args.get('city')
         user_location = request.args.get('user_location')
         
-        query = Promotion.query.filter_by(is_active=True)
-        query = query.filter(Promotion.start_date <= datetime.now())
-        query = query.filter(Promotion.end_date >= datetime.now())
+        query = promotion_serializer.select().where(Promotion.is_active == True)
+        query = query.where(Promotion.start_date <= datetime.now())
+        query = query.where(Promotion.end_date >= datetime.now())
         
         if promo_type:
-            query = query.filter_by(promo_type=promo_type)
-        
-        promotions = query.order_by(Promotion.created_at.desc()).all()
+            query = query.where(Promotion.promo_type == promo_type)
         
         # Filter geo-targeted promotions
+        keep = None
         if city or user_location:
-            filtered_promotions = []
-            for promo in promotions:
-                if promo.geo_targeted:
-                    target_cities = promo.target_cities or '[]'
-                    if city and city in target_cities:
-                        filtered_promotions.append(promo)
-                else:
-                    filtered_promotions.append(promo)
-            promotions = filtered_promotions
+            wanted = city.strip().casefold() if city else None
+            keep = lambda row: not row.geo_targeted or (
+                wanted is not None and wanted in parse_cities(row._target_cities)
+            )
         
-        return jsonify({
+        rows, next_cursor = paginate(
+            db.session, query, PROMOTION_KEYSET, request.args.get('cursor'), page_limit(request.args), keep=keep
+        )
+        promotions = promotion_serializer.rows(rows)
+        
+        return json_response({
             'success': True,
-            'data': [promo.to_dict() for promo in promotions],
-            'count': len(promotions)
-        }), 200
+            'data': promotions,
+            'count': len(promotions),
+            'next_cursor': next_cursor
+        }, 200)
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -55,7 +89,7 @@ def get_promotions():
 def get_promotion(promo_id):
     """Get specific promotion by ID"""
     try:
-        promotion = Promotion.query.get(promo_id)
+        promotion = db.session.get(Promotion, promo_id)
         if not promotion:
             return jsonify({
                 'success': False,
@@ -87,60 +121,21 @@ def validate_promo_code():
                 'error': 'Promo code is required'
             }), 400
         
-        promotion = Promotion.query.filter_by(promo_code=promo_code).first()
+        _ensure_promotions()
+        promotion = promotion_engine.get(promo_code)
         if not promotion:
             return jsonify({
                 'success': False,
                 'error': 'Invalid promo code'
             }), 404
         
-        # Check if promotion is active
-        if not promotion.is_active:
-            return jsonify({
-                'success': False,
-                'error': 'Promotion is not active'
-            }), 400
-        
-        # Check date validity
-        now = datetime.now()
-        if now < promotion.start_date or now > promotion.end_date:
-            return jsonify({
-                'success': False,
-                'error': 'Promotion has expired'
-            }), 400
-        
-        # Check usage limit
-        if promotion.usage_limit and promotion.usage_count >= promotion.usage_limit:
+        discount_amount, error = promotion.validate(order_amount, user_location)
+        if error:
             return jsonify({
                 'success': False,
-                'error': 'Promotion usage limit reached'
+                'error': error
             }), 400
         
-        # Check minimum order amount
-        if promotion.min_order_amount and order_amount < promotion.min_order_amount:
-            return jsonify({
-                'success': False,
-                'error': f'Minimum order amount of ₹{promotion.min_order_amount} required'
-            }), 400
-        
-        # Check geo-targeting
-        if promotion.geo_targeted and user_location:
-            target_cities = promotion.target_cities or '[]'
-            if user_location not in target_cities:
-                return jsonify({
-                    'success': False,
-                    'error': 'Promotion not available in your location'
-                }), 400
-        
-        # Calculate discount
-        discount_amount = 0
-        if promotion.discount_percentage:
-            discount_amount = (order_amount * promotion.discount_percentage) / 100
-            if promotion.max_discount:
-                discount_amount = min(discount_amount, promotion.max_discount)
-        elif promotion.discount_amount:
-            discount_amount = promotion.discount_amount
-        
         return jsonify({
             'success': True,
             'data': {
@@ -174,6 +169,15 @@ def create_promotion():
                     'error': f'Missing required field: {field}'
                 }), 400
         
+        target_cities = data.get('target_cities')
+        if target_cities is not None and not isinstance(target_cities, str) and not (
+            isinstance(target_cities, list) and all(isinstance(city, str) for city in target_cities)
+        ):
+            return jsonify({
+                'success': False,
+                'error': 'target_cities must be a list of city names or a comma-separated string'
+            }), 400
+        
         # Parse datetime strings
         start_date = datetime.fromisoformat(data['start_date'].replace('Z', '+00:00'))
         end_date = datetime.fromisoformat(data['end_date'].replace('Z', '+00:00'))
@@ -192,12 +196,19 @@ def create_promotion():
             end_date=end_date,
             usage_limit=data.get('usage_limit'),
             geo_targeted=data.get('geo_targeted', False),
-            target_cities=data.get('target_cities')
+            target_cities=target_cities
         )
         
         db.session.add(new_promotion)
+        db.session.flush()
+        # Compile before committing, so a promotion the engine cannot use is never stored
+        compiled = CompiledPromotion.from_model(new_promotion)
         db.session.commit()
         
+        if promotion_engine.loaded:
+            promotion_engine.upsert(compiled)
+        _promotion_sync.bump(applied=True)
+        
         return jsonify({
             'success': True,
             'data': new_promotion.to_dict(),
@@ -215,7 +226,7 @@ def create_promotion():
 def use_promotion(promo_id):
     """Mark promotion as used"""
     try:
-        promotion = Promotion.query.get(promo_id)
+        promotion = db.session.get(Promotion, promo_id)
         if not promotion:
             return jsonify({
                 'success': False,
@@ -226,6 +237,8 @@ def use_promotion(promo_id):
         promotion.usage_count += 1
         
         db.session.commit()
+        promotion_engine.record_use(promotion.id, promotion.usage_count)
+        _promotion_sync.bump(applied=True)
         
         return jsonify({
             'success': True,
@@ -5,16 +5,21 @@ Handles sustainability tracking, green points, and farm-to-cup information
 
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
-import uuid
-from ..models.coffee import db, Coffee, User, Order
+from ..models.coffee import db, Coffee, User, GreenPointsTransaction
+from ..services.serialization import StaticPayload
+from ..services.pagination import InvalidCursor, Keyset, page_limit, paginate
+from ..services import green_points
+from ..services import sustainability_rollup as rollups
 
 sustainability_bp = Blueprint('sustainability', __name__)
 
+GREEN_POINTS_KEYSET = Keyset(GreenPointsTransaction.created_at, GreenPointsTransaction.id, descending=True)
+
 @sustainability_bp.route('/coffee/<coffee_id>/sustainability', methods=['GET'])
 def get_coffee_sustainability(coffee_id):
     """Get sustainability information for a coffee item"""
     try:
-        coffee = Coffee.query.get(coffee_id)
+        coffee = db.session.get(Coffee, coffee_id)
         if not coffee:
             return jsonify({
                 'success': False,
@@ -77,29 +82,50 @@ def get_farm_to_cup_info():
 def get_user_green_points(user_id):
     """Get user's green points for eco-friendly actions"""
     try:
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({
-                'success': False,
-                'error': 'User not found'
-            }), 404
-        
-        # Calculate green points based on eco-friendly orders
-        eco_friendly_orders = Order.query.filter_by(customer_id=user_id).join(Coffee).filter(
-            Coffee.organic == True
-        ).count()
+        # The balance is kept current by every award; one primary-key read
+        account = green_points.balance(db.session, user_id)
+        if not account:
+            if not db.session.get(User, user_id):
+                return jsonify({
+                    'success': False,
+                    'error': 'User not found'
+                }), 404
+            account = green_points.empty_account(user_id)
         
-        green_points = eco_friendly_orders * 10  # 10 points per eco-friendly order
+        return jsonify({
+            'success': True,
+            'data': account.to_dict()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@sustainability_bp.route('/green-points/<user_id>/history', methods=['GET'])
+def get_green_points_history(user_id):
+    """Get user's green points ledger, newest first, cursor-paginated"""
+    try:
+        entries, next_cursor = paginate(
+            db.session,
+            db.select(GreenPointsTransaction).where(GreenPointsTransaction.user_id == user_id),
+            GREEN_POINTS_KEYSET,
+            request.args.get('cursor'),
+            page_limit(request.args),
+            scalars=True
+        )
         
         return jsonify({
             'success': True,
-            'data': {
-                'user_id': user.id,
-                'green_points': green_points,
-                'eco_friendly_orders': eco_friendly_orders,
-                'sustainability_level': 'Bronze' if green_points < 100 else 'Silver' if green_points < 500 else 'Gold'
-            }
+            'data': [entry.to_dict() for entry in entries],
+            'count': len(entries),
+            'next_cursor': next_cursor
         }), 200
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -111,8 +137,7 @@ def earn_green_points(user_id):
     """Earn green points for eco-friendly actions"""
     try:
         data = request.get_json()
-        action = data.get('action')  # 'own_cup', 'eco_packaging', 'organic_order'
-        points = data.get('points', 0)
+        action = data.get('action')  # 'own_cup', 'eco_packaging'
         
         if not action:
             return jsonify({
@@ -120,33 +145,41 @@ def earn_green_points(user_id):
                 'error': 'Action is required'
             }), 400
         
-        user = User.query.get(user_id)
+        # Organic orders earn their points automatically when the order completes
+        if action == green_points.ORGANIC_ORDER:
+            return jsonify({
+                'success': False,
+                'error': 'Organic order points are awarded when the order is completed'
+            }), 400
+        
+        # Known actions have fixed rewards; others take the requested points
+        points = green_points.ACTION_POINTS.get(action, data.get('points', 0))
+        if not isinstance(points, int) or isinstance(points, bool) or points <= 0:
+            return jsonify({
+                'success': False,
+                'error': 'Points must be positive'
+            }), 400
+        
+        user = db.session.get(User, user_id)
         if not user:
             return jsonify({
                 'success': False,
                 'error': 'User not found'
             }), 404
         
-        # Calculate points based on action
-        if action == 'own_cup':
-            points = 20
-        elif action == 'eco_packaging':
-            points = 15
-        elif action == 'organic_order':
-            points = 10
-        
-        # Update user's loyalty points (green points are part of loyalty system)
-        user.loyalty_points += points
-        
+        # Ledger row and balance commit together; loyalty points are untouched
+        green_points.award(db.session, user_id, action, points)
         db.session.commit()
         
+        account = green_points.balance(db.session, user_id)
+        
         return jsonify({
             'success': True,
             'data': {
                 'user_id': user.id,
                 'action': action,
                 'points_earned': points,
-                'total_loyalty_points': user.loyalty_points
+                'total_green_points': account.points
             },
             'message': f'{points} green points earned for {action}'
         }), 200
@@ -160,30 +193,52 @@ def earn_green_points(user_id):
 
 @sustainability_bp.route('/impact', methods=['GET'])
 def get_sustainability_impact():
-    """Get overall sustainability impact metrics"""
+    """Get overall sustainability impact metrics (optionally for one café and/or day)"""
     try:
-        # Calculate sustainability metrics
-        total_organic_orders = db.session.query(Order).join(Coffee).filter(
-            Coffee.organic == True
-        ).count()
+        cafe_id = request.args.get('cafe_id', rollups.ALL_CAFES)
+        day = request.args.get('day')
+        if day:
+            try:
+                day = datetime.strptime(day, '%Y-%m-%d').date().isoformat()
+            except ValueError:
+                return jsonify({
+                    'success': False,
+                    'error': 'day must be YYYY-MM-DD'
+                }), 400
         
-        total_fair_trade_orders = db.session.query(Order).join(Coffee).filter(
-            Coffee.fair_trade == True
-        ).count()
+        # Completed orders are rolled up as they complete; this is a primary-key read
+        impact = rollups.impact(db.session, cafe_id, day or rollups.LIFETIME)
         
-        total_co2_saved = db.session.query(db.func.sum(Coffee.carbon_footprint)).join(Order).scalar() or 0
+        return jsonify({
+            'success': True,
+            'data': impact.to_dict()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@sustainability_bp.route('/impact/daily', methods=['GET'])
+def get_daily_sustainability_impact():
+    """Get per-day sustainability metrics for a date range (defaults to the last 30 days)"""
+    try:
+        cafe_id = request.args.get('cafe_id', rollups.ALL_CAFES)
+        try:
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if 'end' in request.args else datetime.utcnow().date()
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if 'start' in request.args else end - timedelta(days=29)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'start and end must be YYYY-MM-DD'
+            }), 400
         
-        avg_sustainability_rating = db.session.query(db.func.avg(Coffee.sustainability_rating)).scalar() or 0
+        days = rollups.daily(db.session, cafe_id, start.isoformat(), end.isoformat())
         
         return jsonify({
             'success': True,
-            'data': {
-                'total_organic_orders': total_organic_orders,
-                'total_fair_trade_orders': total_fair_trade_orders,
-                'total_co2_saved': round(total_co2_saved, 2),
-                'average_sustainability_rating': round(avg_sustainability_rating, 2),
-                'eco_friendly_percentage': round((total_organic_orders / max(total_organic_orders + total_fair_trade_orders, 1)) * 100, 2)
-            }
+            'data': [day.to_dict() for day in days],
+            'count': len(days)
         }), 200
     except Exception as e:
         return jsonify({
@@ -191,38 +246,39 @@ def get_sustainability_impact():
             'error': str(e)
         }), 500
 
+# Static catalogue, encoded once at import
+ECO_PRACTICES = StaticPayload({
+    'success': True,
+    'data': [
+        {
+            'id': 'own_cup',
+            'name': 'Bring Your Own Cup',
+            'description': 'Bring your own reusable cup and get 20 green points',
+            'points': 20,
+            'impact': 'Reduces single-use cup waste'
+        },
+        {
+            'id': 'eco_packaging',
+            'name': 'Eco-Friendly Packaging',
+            'description': 'Choose eco-friendly packaging options',
+            'points': 15,
+            'impact': 'Reduces plastic waste'
+        },
+        {
+            'id': 'organic_order',
+            'name': 'Organic Coffee',
+            'description': 'Order organic and fair-trade coffee',
+            'points': 10,
+            'impact': 'Supports sustainable farming'
+        }
+    ]
+})
+
 @sustainability_bp.route('/practices', methods=['GET'])
 def get_eco_practices():
     """Get information about eco-friendly practices"""
     try:
-        practices = [
-            {
-                'id': 'own_cup',
-                'name': 'Bring Your Own Cup',
-                'description': 'Bring your own reusable cup and get 20 green points',
-                'points': 20,
-                'impact': 'Reduces single-use cup waste'
-            },
-            {
-                'id': 'eco_packaging',
-                'name': 'Eco-Friendly Packaging',
-                'description': 'Choose eco-friendly packaging options',
-                'points': 15,
-                'impact': 'Reduces plastic waste'
-            },
-            {
-                'id': 'organic_order',
-                'name': 'Organic Coffee',
-                'description': 'Order organic and fair-trade coffee',
-                'points': 10,
-                'impact': 'Supports sustainable farming'
-            }
-        ]
-        
-        return jsonify({
-            'success': True,
-            'data': practices
-        }), 200
+        return ECO_PRACTICES.response()
     except Exception as e:
         return jsonify({
             'success': False,
@@ -3,18 +3,75 @@ Real-time Tracking API Routes
 Handles order tracking, stock updates, and live status
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, Response, stream_with_context
 from datetime import datetime, timedelta
 import uuid
-from ..models.coffee import db, Order, OrderTracking, StockUpdate, Coffee
+import json
+from ..models.coffee import db, Order, OrderTracking, StockUpdate, Coffee, KitchenCapacity
+from ..services.order_events import order_events
+from ..services.sustainability_rollup import completion_changed, record_order_completion
+from ..services import green_points
+from ..services import kitchen_display, kitchen_scheduler
+from ..services.serialization import stock_update_serializer, json_response
+from ..services.pagination import InvalidCursor, Keyset, page_limit, paginate
 
 tracking_bp = Blueprint('tracking', __name__)
 
+HEARTBEAT_SECONDS = 15
+FINAL_STATUSES = ('completed', 'cancelled')
+STOCK_RETRIES = 5  # compare-and-set attempts before reporting a conflict
+STOCK_UPDATE_KEYSET = Keyset(StockUpdate.created_at, StockUpdate.id, descending=True)
+
+def _stock_levels(coffee_ids):
+    """Current stock per item (missing items are left out)"""
+    return dict(db.session.execute(
+        db.select(Coffee.id, db.func.coalesce(Coffee.stock_quantity, 0)).where(Coffee.id.in_(coffee_ids))
+    ).all())
+
+def _set_stock_levels(expected, levels):
+    """Compare-and-set: move each item from its `expected` level to `levels[id]` in one UPDATE.
+    
+    Availability is recomputed in the same statement. Returns {coffee_id:
+    (name, level, available)}, or None after rolling back when another
+    writer changed one of the items since `expected` was read.
+    """
+    new_level = db.case(levels, value=Coffee.id)
+    rows = db.session.execute(
+        db.update(Coffee)
+        .where(Coffee.id.in_(list(levels)),
+               db.func.coalesce(Coffee.stock_quantity, 0) == db.case(expected, value=Coffee.id))
+        .values(stock_quantity=new_level, available=new_level > db.func.coalesce(Coffee.min_stock_level, 0))
+        .returning(Coffee.id, Coffee.name, Coffee.stock_quantity, Coffee.available)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if len(rows) != len(levels):
+        db.session.rollback()
+        return None
+    return {coffee_id: (name, quantity, available) for coffee_id, name, quantity, available in rows}
+
+def _committed_events(app):
+    """order_events.poll source: tracking rows created after a time, from any process"""
+    def fetch(since):
+        with app.app_context():
+            rows = OrderTracking.query.filter(OrderTracking.created_at > since).order_by(OrderTracking.created_at).all()
+            return [(row.order_id, row.id, row.to_dict()) for row in rows]
+    return fetch
+
+def _order_updates(order_id):
+    """An order's tracking updates as dicts, oldest first"""
+    return [
+        update.to_dict()
+        for update in OrderTracking.query.filter_by(order_id=order_id).order_by(OrderTracking.created_at.asc())
+    ]
+
+def _sse(event_id, data, event='tracking'):
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n'
+
 @tracking_bp.route('/orders/<order_id>/status', methods=['GET'])
 def get_order_status(order_id):
     """Get real-time order status and tracking"""
     try:
-        order = Order.query.get(order_id)
+        order = db.session.get(Order, order_id)
         if not order:
             return jsonify({
                 'success': False,
@@ -24,14 +81,20 @@ def get_order_status(order_id):
         # Get tracking updates
         tracking_updates = OrderTracking.query.filter_by(order_id=order_id).order_by(OrderTracking.created_at.desc()).all()
         
-        # Calculate estimated time
+        # Calculate estimated time: a staff-set estimate wins, then the café's kitchen plan
         estimated_time = None
         if order.estimated_ready_time:
             estimated_time = order.estimated_ready_time.isoformat()
-        elif order.preparation_start_time:
-            # Estimate based on preparation time
-            prep_time = timedelta(minutes=10)  # Default preparation time
-            estimated_time = (order.preparation_start_time + prep_time).isoformat()
+        else:
+            eta = kitchen_scheduler.estimated_ready_time(db.session, order)
+            if eta is None and order.ready_time:
+                eta = order.ready_time
+            elif eta is None and order.preparation_start_time:
+                # Not in a kitchen queue: the order's own preparation time from when it started
+                prep_time = timedelta(seconds=kitchen_scheduler.order_seconds(db.session, order.id))
+                eta = order.preparation_start_time + prep_time
+            if eta is not None:
+                estimated_time = eta.isoformat()
         
         return jsonify({
             'success': True,
@@ -52,6 +115,66 @@ def get_order_status(order_id):
             'error': str(e)
         }), 500
 
+@tracking_bp.route('/orders/<order_id>/stream', methods=['GET'])
+def stream_order_status(order_id):
+    """Stream tracking updates for an order as Server-Sent Events"""
+    try:
+        order = db.session.get(Order, order_id)
+        if not order:
+            return jsonify({
+                'success': False,
+                'error': 'Order not found'
+            }), 404
+        
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        # Updates committed by other worker processes arrive through the poll
+        order_events.poll(_committed_events(current_app._get_current_object()))
+        
+        def generate():
+            # Subscribe before reading so nothing committed in between is lost
+            subscription = order_events.subscribe(order_id)
+            try:
+                updates = _order_updates(order_id)
+                seen = {update['id'] for update in updates}
+                missed = []
+                if last_event_id in seen:
+                    missed = updates[[update['id'] for update in updates].index(last_event_id) + 1:]
+                status = db.session.query(Order.status).filter_by(id=order_id).scalar()
+                
+                # Release the DB connection; idle streams must not pin the pool
+                db.session.close()
+                
+                yield f'retry: {HEARTBEAT_SECONDS * 1000}\n\n'
+                for update in missed:
+                    yield _sse(update['id'], update)
+                if status in FINAL_STATUSES:
+                    return
+                while True:
+                    if not subscription.wait(HEARTBEAT_SECONDS):
+                        yield ': heartbeat\n\n'
+                        continue
+                    # An event only wakes the stream: updates are read back in creation order,
+                    # so one that reached this worker late through the poll is not skipped
+                    updates = [update for update in _order_updates(order_id) if update['id'] not in seen]
+                    db.session.close()
+                    for update in updates:
+                        seen.add(update['id'])
+                        yield _sse(update['id'], update)
+                        if update['status'] in FINAL_STATUSES:
+                            return
+            finally:
+                order_events.unsubscribe(subscription)
+        
+        return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @tracking_bp.route('/orders/<order_id>/update', methods=['POST'])
 def update_order_status(order_id):
     """Update order status with tracking"""
@@ -67,24 +190,15 @@ def update_order_status(order_id):
                 'error': 'Status is required'
             }), 400
         
-        order = Order.query.get(order_id)
+        order = db.session.get(Order, order_id)
         if not order:
             return jsonify({
                 'success': False,
                 'error': 'Order not found'
             }), 404
         
-        # Update order status
-        old_status = order.status
-        order.status = new_status
-        order.updated_at = datetime.now()
-        
-        # Set specific timestamps based on status
-        if new_status == 'preparing' and not order.preparation_start_time:
-            order.preparation_start_time = datetime.now()
-        elif new_status == 'ready' and not order.ready_time:
-            order.ready_time = datetime.now()
-            order.preparation_end_time = datetime.now()
+        # Update order status and the timestamps it implies
+        old_status = kitchen_display.apply_status(order, new_status)
         
         # Set estimated time
         if estimated_time:
@@ -99,8 +213,24 @@ def update_order_status(order_id):
         )
         
         db.session.add(tracking_update)
+        
+        # Sustainability rollups and green points change in the same transaction as the status
+        sign = completion_changed(old_status, new_status)
+        if sign:
+            counters = record_order_completion(db.session, order, sign)
+            green_points.record_order(db.session, order, counters['organic_orders'], sign)
+        kitchen_display.sync_tickets(db.session, [(order, old_status)])
+        
         db.session.commit()
         
+        try:
+            kitchen_scheduler.order_changed(db.session, order, old_status)
+        except Exception:
+            # The change is committed; rebuild the café's queue from the database on next use
+            kitchen_scheduler.kitchens.invalidate(order.cafe_id)
+        
+        order_events.publish(order_id, tracking_update.id, tracking_update.to_dict())
+        
         return jsonify({
             'success': True,
             'data': {
@@ -120,28 +250,183 @@ def update_order_status(order_id):
             'error': str(e)
         }), 500
 
+@tracking_bp.route('/kitchen/<cafe_id>', methods=['GET'])
+def get_kitchen(cafe_id):
+    """Get a café's barista capacity and kitchen queue load"""
+    try:
+        queue = kitchen_scheduler.kitchens.queue(db.session, cafe_id)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'cafe_id': cafe_id,
+                'baristas': queue.baristas,
+                'open_orders': len(queue),
+                'backlog_minutes': round(queue.backlog_seconds(kitchen_scheduler.to_seconds(datetime.now())) / 60, 1)
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@tracking_bp.route('/kitchen/<cafe_id>', methods=['PUT'])
+def set_kitchen_capacity(cafe_id):
+    """Set how many baristas a café has on the line"""
+    try:
+        data = request.get_json() or {}
+        baristas = data.get('baristas')
+        if not isinstance(baristas, int) or isinstance(baristas, bool) or baristas < 1:
+            return jsonify({
+                'success': False,
+                'error': 'baristas must be a positive integer'
+            }), 400
+        
+        capacity = db.session.get(KitchenCapacity, cafe_id)
+        if capacity is None:
+            capacity = KitchenCapacity(cafe_id=cafe_id)
+            db.session.add(capacity)
+        capacity.baristas = baristas
+        db.session.commit()
+        kitchen_scheduler.kitchens.invalidate(cafe_id)
+        
+        return jsonify({
+            'success': True,
+            'data': capacity.to_dict(),
+            'message': 'Kitchen capacity updated'
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@tracking_bp.route('/kitchen/<cafe_id>/queue', methods=['GET'])
+def get_kitchen_queue(cafe_id):
+    """Get a café's open orders for the kitchen display, by promised time then order type"""
+    try:
+        status = request.args.get('status')
+        if status and status not in kitchen_display.DISPLAY_STATUSES:
+            return jsonify({
+                'success': False,
+                'error': f'status must be one of: {", ".join(kitchen_display.DISPLAY_STATUSES)}'
+            }), 400
+        
+        rows = kitchen_display.display(db.session, cafe_id, status)
+        queue = kitchen_scheduler.kitchens.queue(db.session, cafe_id)
+        now = kitchen_scheduler.to_seconds(datetime.now())
+        tickets = []
+        for ticket, order in rows:
+            eta = queue.eta(order.id, now=now)
+            tickets.append(kitchen_display.ticket_view(
+                ticket, order, kitchen_scheduler.to_datetime(eta) if eta is not None else None))
+        
+        return jsonify({
+            'success': True,
+            'data': tickets,
+            'count': len(tickets)
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@tracking_bp.route('/kitchen/<cafe_id>/transitions', methods=['POST'])
+def transition_kitchen_orders(cafe_id):
+    """Move many of a café's orders to one status in a single transaction"""
+    try:
+        data = request.get_json() or {}
+        order_ids = data.get('order_ids')
+        new_status = data.get('status')
+        from_status = data.get('from_status')
+        
+        if new_status not in kitchen_display.ORDER_STATUSES:
+            return jsonify({
+                'success': False,
+                'error': f'status must be one of: {", ".join(kitchen_display.ORDER_STATUSES)}'
+            }), 400
+        if (not isinstance(order_ids, list) or not order_ids
+                or not all(isinstance(order_id, str) for order_id in order_ids)):
+            return jsonify({
+                'success': False,
+                'error': 'order_ids must be a non-empty list of order ids'
+            }), 400
+        if len(order_ids) > kitchen_display.MAX_BATCH:
+            return jsonify({
+                'success': False,
+                'error': f'At most {kitchen_display.MAX_BATCH} orders per batch'
+            }), 400
+        
+        changes, skipped, tracking = kitchen_display.transition(
+            db.session, cafe_id, order_ids, new_status, data.get('message'), from_status)
+        db.session.commit()
+        
+        # Reload the committed orders in one query rather than one refresh per order
+        moved = [row['order_id'] for row in tracking]
+        if moved:
+            db.session.execute(db.select(Order).where(Order.id.in_(moved))).scalars().all()
+        
+        try:
+            kitchen_scheduler.orders_changed(db.session, changes)
+        except Exception:
+            # The batch is committed; rebuild the café's queue from the database on next use
+            kitchen_scheduler.kitchens.invalidate(cafe_id)
+        
+        for row in tracking:
+            order_events.publish(row['order_id'], row['id'], OrderTracking(**row).to_dict())
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'updated': [
+                    {'order_id': order.id, 'old_status': old_status, 'new_status': order.status}
+                    for order, old_status in changes
+                ],
+                'skipped': skipped
+            },
+            'count': len(changes),
+            'message': f'{len(changes)} orders moved to {new_status}'
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @tracking_bp.route('/stock/updates', methods=['GET'])
 def get_stock_updates():
-    """Get recent stock updates"""
+    """Get recent stock updates, newest first and cursor-paginated"""
     try:
         coffee_id = request.args.get('coffee_id')
         cafe_id = request.args.get('cafe_id')
-        limit = request.args.get('limit', 50, type=int)
         
-        query = StockUpdate.query
+        query = stock_update_serializer.select()
         
         if coffee_id:
-            query = query.filter_by(coffee_id=coffee_id)
+            query = query.where(StockUpdate.coffee_id == coffee_id)
         if cafe_id:
-            query = query.filter_by(cafe_id=cafe_id)
+            query = query.where(StockUpdate.cafe_id == cafe_id)
         
-        updates = query.order_by(StockUpdate.created_at.desc()).limit(limit).all()
+        rows, next_cursor = paginate(
+            db.session, query, STOCK_UPDATE_KEYSET, request.args.get('cursor'), page_limit(request.args)
+        )
+        updates = stock_update_serializer.rows(rows)
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'data': [update.to_dict() for update in updates],
-            'count': len(updates)
-        }), 200
+            'data': updates,
+            'count': len(updates),
+            'next_cursor': next_cursor
+        }, 200)
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -165,20 +450,44 @@ def update_stock():
                 'error': 'Coffee ID is required'
             }), 400
         
-        coffee = Coffee.query.get(coffee_id)
-        if not coffee:
+        if not isinstance(quantity_change, int):
             return jsonify({
                 'success': False,
-                'error': 'Coffee item not found'
-            }), 404
-        
-        # Update stock quantity
-        old_quantity = coffee.stock_quantity
-        new_quantity = max(0, old_quantity + quantity_change)
-        coffee.stock_quantity = new_quantity
+                'error': 'quantity_change must be an integer'
+            }), 400
         
-        # Update availability based on stock
-        coffee.available = new_quantity > coffee.min_stock_level
+        # Common case in one atomic UPDATE: the change does not take the level below zero,
+        # so the previous level is exactly the new one minus the change
+        new_level = Coffee.stock_quantity + quantity_change
+        row = db.session.execute(
+            db.update(Coffee)
+            .where(Coffee.id == coffee_id, new_level >= 0)
+            .values(stock_quantity=new_level, available=new_level > db.func.coalesce(Coffee.min_stock_level, 0))
+            .returning(Coffee.name, Coffee.stock_quantity, Coffee.available)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if row:
+            coffee_name, new_quantity, available = row
+            old_quantity = new_quantity - quantity_change
+        else:
+            # Clamped at zero (or not found): compare-and-set against the level read
+            for _ in range(STOCK_RETRIES):
+                old_levels = _stock_levels([coffee_id])
+                if coffee_id not in old_levels:
+                    return jsonify({
+                        'success': False,
+                        'error': 'Coffee item not found'
+                    }), 404
+                result = _set_stock_levels(old_levels, {coffee_id: max(old_levels[coffee_id] + quantity_change, 0)})
+                if result is not None:
+                    break
+            else:
+                return jsonify({
+                    'success': False,
+                    'error': 'Stock changed concurrently, please retry'
+                }), 409
+            old_quantity = old_levels[coffee_id]
+            coffee_name, new_quantity, available = result[coffee_id]
         
         # Create stock update record
         stock_update = StockUpdate(
@@ -196,12 +505,12 @@ def update_stock():
         return jsonify({
             'success': True,
             'data': {
-                'coffee_id': coffee.id,
-                'coffee_name': coffee.name,
+                'coffee_id': coffee_id,
+                'coffee_name': coffee_name,
                 'old_quantity': old_quantity,
                 'new_quantity': new_quantity,
                 'quantity_change': quantity_change,
-                'available': coffee.available,
+                'available': available,
                 'stock_update': stock_update.to_dict()
             },
             'message': 'Stock updated successfully'
@@ -214,11 +523,130 @@ def update_stock():
             'error': str(e)
         }), 500
 
+@tracking_bp.route('/stock/update/batch', methods=['POST'])
+def update_stock_batch():
+    """Apply many stock changes (e.g. a delivery) in one transaction"""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            data = {}
+        entries = data.get('updates')
+        updated_by = data.get('updated_by')
+        
+        if not isinstance(entries, list) or not entries:
+            return jsonify({
+                'success': False,
+                'error': 'updates list is required'
+            }), 400
+        
+        deltas = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                return jsonify({
+                    'success': False,
+                    'error': 'Each update must be an object'
+                }), 400
+            coffee_id = entry.get('coffee_id')
+            quantity_change = entry.get('quantity_change', 0)
+            if not coffee_id or not isinstance(coffee_id, str) or not isinstance(quantity_change, int):
+                return jsonify({
+                    'success': False,
+                    'error': 'Each update needs a coffee_id and an integer quantity_change'
+                }), 400
+            deltas[coffee_id] = deltas.get(coffee_id, 0) + quantity_change
+        
+        # Common case in one atomic UPDATE of the net changes: when no entry takes an item
+        # below zero, each entry's level follows back from the item's final level
+        new_level = Coffee.stock_quantity + db.case(deltas, value=Coffee.id, else_=0)
+        rows = db.session.execute(
+            db.update(Coffee)
+            .where(Coffee.id.in_(list(deltas)), new_level >= 0)
+            .values(stock_quantity=new_level, available=new_level > db.func.coalesce(Coffee.min_stock_level, 0))
+            .returning(Coffee.id, Coffee.name, Coffee.stock_quantity, Coffee.available)
+            .execution_options(synchronize_session=False)
+        ).all()
+        levels = {coffee_id: (name, quantity, available) for coffee_id, name, quantity, available in rows}
+        entry_levels = None
+        if len(levels) == len(deltas):
+            remaining = {coffee_id: level for coffee_id, (_, level, _) in levels.items()}
+            entry_levels = []
+            for entry in reversed(entries):
+                entry_levels.append(remaining[entry['coffee_id']])
+                remaining[entry['coffee_id']] -= entry.get('quantity_change', 0)
+            entry_levels.reverse()
+        
+        if entry_levels is None or min(entry_levels) < 0:
+            # Some entry clamps at zero (or an item is missing): apply the entries in order
+            # against the levels read and write them with one compare-and-set UPDATE
+            db.session.rollback()
+            for _ in range(STOCK_RETRIES):
+                old_levels = _stock_levels(list(deltas))
+                missing = [coffee_id for coffee_id in deltas if coffee_id not in old_levels]
+                if missing:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Coffee items not found: {", ".join(missing)}'
+                    }), 404
+                running = dict(old_levels)
+                entry_levels = []
+                for entry in entries:
+                    coffee_id = entry['coffee_id']
+                    running[coffee_id] = max(running[coffee_id] + entry.get('quantity_change', 0), 0)
+                    entry_levels.append(running[coffee_id])
+                levels = _set_stock_levels(old_levels, running)
+                if levels is not None:
+                    break
+            else:
+                return jsonify({
+                    'success': False,
+                    'error': 'Stock changed concurrently, please retry'
+                }), 409
+        
+        # Bulk-insert the audit trail, each entry with the level it left the item at
+        now = datetime.utcnow()
+        db.session.execute(db.insert(StockUpdate), [
+            {
+                'id': str(uuid.uuid4()),
+                'coffee_id': entry['coffee_id'],
+                'cafe_id': entry.get('cafe_id'),
+                'quantity_change': entry.get('quantity_change', 0),
+                'new_stock_level': level,
+                'reason': entry.get('reason', 'manual_update'),
+                'updated_by': entry.get('updated_by', updated_by),
+                'created_at': now
+            }
+            for entry, level in zip(entries, entry_levels)
+        ])
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'data': [
+                {
+                    'coffee_id': coffee_id,
+                    'coffee_name': name,
+                    'quantity_change': deltas[coffee_id],
+                    'new_quantity': quantity,
+                    'available': available
+                }
+                for coffee_id, (name, quantity, available) in levels.items()
+            ],
+            'count': len(levels),
+            'message': f'{len(entries)} stock updates applied'
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @tracking_bp.route('/orders/<order_id>/qr', methods=['GET'])
 def generate_qr_code(order_id):
     """Generate QR code for table ordering"""
     try:
-        order = Order.query.get(order_id)
+        order = db.session.get(Order, order_id)
         if not order:
             return jsonify({
                 'success': False,
@@ -6,6 +6,7 @@ Handles all user-related operations
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 import uuid
+from ..services.pagination import InvalidCursor, page_limit, paginate_sorted
 
 users_bp = Blueprint('users', __name__)
 
@@ -37,13 +38,23 @@ users_db = [
 
 @users_bp.route('/', methods=['GET'])
 def get_users():
-    """Get all users"""
+    """Get users in sign-up order, cursor-paginated"""
     try:
+        by_key = {(user['created_at'], user['id']): user for user in users_db}
+        keys, next_cursor = paginate_sorted(sorted(by_key), request.args.get('cursor'), page_limit(request.args))
+        users = [by_key[key] for key in keys]
+        
         return jsonify({
             'success': True,
-            'data': users_db,
-            'count': len(users_db)
+            'data': users,
+            'count': len(users),
+            'next_cursor': next_cursor
         }), 200
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -0,0 +1,81 @@
+"""
+Cache Sync
+Keeps the in-process caches of forked workers in step: a shared generation
+counter that any process bumps after a change, plus an optional resync age
+"""
+
+import json
+import mmap
+import multiprocessing
+import struct
+import time
+
+_LENGTH = struct.Struct('Q')
+
+
+class Resync:
+    """When one process's copy of a cache must be rebuilt.
+
+    The counter lives in shared memory allocated at import, so every worker
+    forked from a preloading master sees the others' bumps. A copy is due
+    once the counter moved past the generation it was built from, or, with
+    `max_age`, once it is that many seconds old (for caches other processes
+    change too often to bump on every write).
+    """
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self._lock = multiprocessing.Lock()
+        self._generation = multiprocessing.RawValue('Q', 0)
+        self._seen = None
+        self._synced_at = 0.0
+
+    @property
+    def generation(self):
+        return self._generation.value
+
+    def due(self):
+        if self._seen != self._generation.value:
+            return True
+        return self.max_age is not None and time.monotonic() - self._synced_at > self.max_age
+
+    def synced(self, generation):
+        """Record a rebuild that read the data after the counter showed `generation`"""
+        self._seen = generation
+        self._synced_at = time.monotonic()
+
+    def bump(self, applied=False):
+        """Mark every process's copy stale after a committed change.
+
+        `applied` means this process already made the change to its own copy,
+        so the copy stays current if it was current before.
+        """
+        with self._lock:
+            generation = self._generation.value
+            self._generation.value = generation + 1
+            if applied and self._seen == generation:
+                self._seen = generation + 1
+
+
+class SharedDocument:
+    """A small JSON document in anonymous shared memory, for data that only lives in process memory"""
+
+    def __init__(self, size):
+        self.lock = multiprocessing.Lock()  # held around every read and read-modify-write
+        self._buffer = mmap.mmap(-1, size)
+        self._buffer.write(_LENGTH.pack(0))
+
+    def read(self):
+        """The last document written, or None if nothing was"""
+        (length,) = _LENGTH.unpack(self._buffer[:_LENGTH.size])
+        if not length:
+            return None
+        return json.loads(self._buffer[_LENGTH.size:_LENGTH.size + length])
+
+    def write(self, value):
+        """Replace the document with `value`"""
+        data = json.dumps(value).encode('utf-8')
+        if _LENGTH.size + len(data) > len(self._buffer):
+            raise ValueError(f'document of {len(data)} bytes does not fit in {len(self._buffer)}')
+        self._buffer[_LENGTH.size:_LENGTH.size + len(data)] = data
+        self._buffer[:_LENGTH.size] = _LENGTH.pack(len(data))
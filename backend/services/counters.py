@@ -0,0 +1,22 @@
+"""
+Counter Upserts
+INSERT ... ON CONFLICT DO UPDATE that adds to existing counter columns, for
+rollup and balance tables updated inside the transaction of the triggering write
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def increment(session, model, key, counters, rows):
+    """Insert `rows` into `model`, or add their `counters` to the rows already at `key`.
+
+    `key` names the primary-key columns; any other column present in the rows
+    (e.g. updated_at) is overwritten on conflict. Several rows run as one executemany.
+    """
+    insert = _INSERTS[session.get_bind().dialect.name]
+    statement = insert(model)
+    assigned = {name: statement.excluded[name] for name in rows[0] if name not in key}
+    assigned.update({name: getattr(model, name) + statement.excluded[name] for name in counters})
+    session.execute(statement.on_conflict_do_update(index_elements=list(key), set_=assigned), rows)
@@ -0,0 +1,73 @@
+"""
+Eager Loading
+Query builders that load a serialization graph up front, so a page costs a
+fixed number of queries however many rows it holds, plus an opt-in mode in
+which any relationship the graph did not load raises instead of querying
+"""
+
+import os
+
+from sqlalchemy.orm import defaultload, joinedload, raiseload, selectinload
+
+from ..models.coffee import db, Coffee, Order, OrderItem
+
+# CCD_RAISE_ON_LAZY_LOAD=1 (development, benchmarks, tests) turns a lazy load
+# under a graph into sqlalchemy.exc.InvalidRequestError; off, it just queries
+RAISE_ON_LAZY_LOAD = os.environ.get('CCD_RAISE_ON_LAZY_LOAD') == '1'
+
+
+class Graph:
+    """Loader options for one object graph.
+
+    `options` eager-load the graph; `paths` lists every relationship path the
+    graph loads (as attribute tuples from the root) so the raise guards can
+    cover each level, not just the root entity.
+    """
+
+    def __init__(self, options, paths=()):
+        self.options = tuple(options)
+        self.paths = tuple(paths)
+
+    def guards(self):
+        """raiseload('*') at the root and below each loaded path; identity-map hits are still allowed"""
+        guards = [raiseload('*', sql_only=True)]
+        for path in self.paths:
+            guards.append(defaultload(*path).raiseload('*', sql_only=True))
+        return guards
+
+    def apply(self, statement, strict=None):
+        """`statement` with the graph's options, guarded when `strict` (default RAISE_ON_LAZY_LOAD)"""
+        options = list(self.options)
+        if RAISE_ON_LAZY_LOAD if strict is None else strict:
+            options += self.guards()
+        return statement.options(*options)
+
+
+# Order.to_dict -> items -> OrderItem.to_dict -> coffee_item.name.
+# Items come from one IN (...) query per page (a JOIN would repeat every order
+# column per line and break LIMIT); the coffee is a many-to-one, so it is
+# joined into that query with only the column the serializer reads.
+ORDER_GRAPH = Graph(
+    [selectinload(Order.items).joinedload(OrderItem.coffee_item).load_only(Coffee.name)],
+    paths=[(Order.items,), (Order.items, OrderItem.coffee_item)],
+)
+
+# One order per row with its items and their coffees joined in: for single
+# objects, where one round trip beats the extra IN (...) query
+ORDER_DETAIL_GRAPH = Graph(
+    [joinedload(Order.items).joinedload(OrderItem.coffee_item).load_only(Coffee.name)],
+    paths=[(Order.items,), (Order.items, OrderItem.coffee_item)],
+)
+
+
+def orders_for_customer(customer_id, status=None, strict=None):
+    """Select a customer's orders with their items and coffee names (pair with a Keyset for paging)"""
+    statement = db.select(Order).where(Order.customer_id == customer_id)
+    if status:
+        statement = statement.where(Order.status == status)
+    return ORDER_GRAPH.apply(statement, strict)
+
+
+def order_detail(order_id, strict=None):
+    """Select one order with its items and coffee names in a single query"""
+    return ORDER_DETAIL_GRAPH.apply(db.select(Order).where(Order.id == order_id), strict)
@@ -0,0 +1,145 @@
+"""
+Green Points
+Ledger rows plus a per-user balance, both written in the transaction of the
+action or order that earns them, and a set-based recompute from history
+"""
+
+import uuid
+from datetime import datetime
+
+from ..models.coffee import db, Coffee, GreenPointsAccount, GreenPointsTransaction, Order, OrderItem
+from .counters import increment
+
+ACTION_POINTS = {
+    'own_cup': 20,
+    'eco_packaging': 15,
+    'organic_order': 10,
+}
+ORGANIC_ORDER = 'organic_order'
+COMPLETED = 'completed'
+
+
+def award(session, user_id, action, points, order_id=None, eco_orders=0):
+    """Append a ledger row and move the user's balance; the caller commits"""
+    now = datetime.utcnow()
+    session.execute(db.insert(GreenPointsTransaction), [{
+        'id': str(uuid.uuid4()), 'user_id': user_id, 'action': action,
+        'points': points, 'order_id': order_id, 'created_at': now,
+    }])
+    increment(session, GreenPointsAccount, ('user_id',), ('points', 'eco_friendly_orders'), [
+        {'user_id': user_id, 'points': points, 'eco_friendly_orders': eco_orders, 'updated_at': now}
+    ])
+
+
+def record_order(session, order, organic_orders, sign=1):
+    """Award (sign=1) or take back (sign=-1) the organic-order points for a completed order"""
+    if organic_orders:
+        award(session, order.customer_id, ORGANIC_ORDER, ACTION_POINTS[ORGANIC_ORDER] * sign,
+              order_id=order.id, eco_orders=sign)
+
+
+def record_orders(session, orders):
+    """record_order for a batch of (order, organic_orders, sign): one ledger insert, one balance upsert"""
+    now = datetime.utcnow()
+    ledger, balances = [], {}
+    for order, organic_orders, sign in orders:
+        if not organic_orders or not sign:
+            continue
+        points = ACTION_POINTS[ORGANIC_ORDER] * sign
+        ledger.append({'id': str(uuid.uuid4()), 'user_id': order.customer_id, 'action': ORGANIC_ORDER,
+                       'points': points, 'order_id': order.id, 'created_at': now})
+        total, eco_orders = balances.get(order.customer_id, (0, 0))
+        balances[order.customer_id] = (total + points, eco_orders + sign)
+    if not ledger:
+        return
+    session.execute(db.insert(GreenPointsTransaction), ledger)
+    increment(session, GreenPointsAccount, ('user_id',), ('points', 'eco_friendly_orders'), [
+        {'user_id': user_id, 'points': points, 'eco_friendly_orders': eco_orders, 'updated_at': now}
+        for user_id, (points, eco_orders) in balances.items()
+    ])
+
+
+def balance(session, user_id):
+    """The user's account by primary key, or None if they have never earned green points"""
+    return session.get(GreenPointsAccount, user_id)
+
+
+def empty_account(user_id):
+    return GreenPointsAccount(user_id=user_id, points=0, eco_friendly_orders=0)
+
+
+def recompute(session, batch_size=10000):
+    """Rebuild the ledger's order rows and every balance from history.
+
+    1. Completed orders containing an organic item that carry no (net) organic
+       order points get a ledger row; reverted or non-completed orders holding
+       points get a correcting negative row. Action rows are left untouched.
+    2. Every balance is replaced with the ledger totals.
+    Runs as one transaction; returns (ledger rows added, accounts written).
+    """
+    organic = (
+        db.select(OrderItem.order_id)
+        .join(Coffee, Coffee.id == OrderItem.coffee_id)
+        .where(Coffee.organic == True)
+        .distinct()
+        .subquery()
+    )
+    held = (
+        db.select(GreenPointsTransaction.order_id, db.func.sum(GreenPointsTransaction.points).label('points'))
+        .where(GreenPointsTransaction.action == ORGANIC_ORDER)
+        .group_by(GreenPointsTransaction.order_id)
+        .subquery()
+    )
+    expected = db.case(
+        (db.and_(Order.status == COMPLETED, organic.c.order_id.isnot(None)), ACTION_POINTS[ORGANIC_ORDER]),
+        else_=0,
+    )
+    held_points = db.func.coalesce(held.c.points, 0)
+    drift = (
+        db.select(Order.id, Order.customer_id, expected - held_points)
+        .select_from(Order)
+        .outerjoin(organic, organic.c.order_id == Order.id)
+        .outerjoin(held, held.c.order_id == Order.id)
+        .where(expected != held_points)
+        .execution_options(yield_per=batch_size)
+    )
+
+    now = datetime.utcnow()
+    corrections = [
+        {'id': str(uuid.uuid4()), 'user_id': customer_id, 'action': ORGANIC_ORDER,
+         'points': points, 'order_id': order_id, 'created_at': now}
+        for order_id, customer_id, points in session.execute(drift)
+    ]
+    for start in range(0, len(corrections), batch_size):
+        session.execute(db.insert(GreenPointsTransaction), corrections[start:start + batch_size])
+
+    per_order = (
+        db.select(GreenPointsTransaction.order_id)
+        .where(GreenPointsTransaction.action == ORGANIC_ORDER)
+        .group_by(GreenPointsTransaction.order_id)
+        .having(db.func.sum(GreenPointsTransaction.points) > 0)
+        .subquery()
+    )
+    eco_orders = db.func.count(db.distinct(per_order.c.order_id))
+    totals = (
+        db.select(GreenPointsTransaction.user_id, db.func.sum(GreenPointsTransaction.points), eco_orders)
+        .select_from(GreenPointsTransaction)
+        .outerjoin(per_order, per_order.c.order_id == GreenPointsTransaction.order_id)
+        .group_by(GreenPointsTransaction.user_id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    session.execute(db.delete(GreenPointsAccount))
+    accounts = 0
+    batch = []
+    for user_id, points, eco in session.execute(totals):
+        batch.append({'user_id': user_id, 'points': points, 'eco_friendly_orders': eco, 'updated_at': now})
+        if len(batch) == batch_size:
+            session.execute(db.insert(GreenPointsAccount), batch)
+            accounts += len(batch)
+            batch = []
+    if batch:
+        session.execute(db.insert(GreenPointsAccount), batch)
+        accounts += len(batch)
+    session.commit()
+    return len(corrections), accounts
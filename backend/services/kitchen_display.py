@@ -0,0 +1,204 @@
+"""
+Kitchen Display
+Per-café queue of open orders for staff tablets, kept as one ticket row per
+order in promised-time order, and batched status transitions that move many
+orders with their tracking rows, rollups and tickets in one transaction
+"""
+
+import uuid
+from datetime import datetime
+
+from ..models.coffee import db, KitchenTicket, Order, OrderTracking
+from . import eager_loading, green_points, kitchen_scheduler
+from .sustainability_rollup import completion_changed, record_completions
+
+ORDER_STATUSES = ('pending', 'confirmed', 'preparing', 'ready', 'completed', 'cancelled')
+DISPLAY_STATUSES = ('confirmed', 'preparing', 'ready')
+# At the same promised time: couriers are waiting, then takeaway, then tables
+ORDER_TYPE_PRIORITY = {'delivery': 0, 'takeaway': 1, 'dine_in': 2}
+MAX_BATCH = 100
+
+
+def priority(order):
+    return ORDER_TYPE_PRIORITY.get(order.order_type, len(ORDER_TYPE_PRIORITY))
+
+
+def apply_status(order, new_status, now=None):
+    """Move an order to `new_status`, stamping the times that status implies; returns the old status"""
+    now = now or datetime.now()
+    old_status = order.status
+    order.status = new_status
+    order.updated_at = now
+    if new_status == 'preparing' and not order.preparation_start_time:
+        order.preparation_start_time = now
+    elif new_status == 'ready' and not order.ready_time:
+        order.ready_time = now
+        order.preparation_end_time = now
+    return old_status
+
+
+def promises(session, orders, now=None):
+    """order id -> promised ready time for orders reaching the display.
+
+    A staff-set estimated_ready_time is the promise; otherwise the time is
+    the order's ETA in its café's kitchen queue, or quoted from that queue as
+    if the orders joined it now, oldest first; an order that arrives already
+    ready is due now.
+    """
+    now = now or datetime.now()
+    promised = {}
+    quoting = {}
+    for order in orders:
+        if order.estimated_ready_time:
+            promised[order.id] = order.estimated_ready_time
+        elif order.status in kitchen_scheduler.OPEN_STATUSES:
+            quoting.setdefault(order.cafe_id, []).append(order)
+        else:
+            promised[order.id] = now
+    if quoting:
+        seconds = kitchen_scheduler.orders_seconds(session, [order.id for group in quoting.values() for order in group])
+        clock = kitchen_scheduler.to_seconds(now)
+        for cafe_id, group in quoting.items():
+            queue = kitchen_scheduler.kitchens.queue(session, cafe_id)
+            new = sorted((order for order in group if order.id not in queue), key=kitchen_scheduler.queue_key)
+            finishes = queue.quote([seconds[order.id] for order in new], now=clock)
+            finishes = dict(zip((order.id for order in new), finishes))
+            for order in group:
+                finish = finishes[order.id] if order.id in finishes else queue.eta(order.id, now=clock)
+                promised[order.id] = kitchen_scheduler.to_datetime(finish)
+    return promised
+
+
+def sync_tickets(session, changes, now=None):
+    """Bring the tickets of changed orders ((order, old status) pairs) in line with their statuses.
+
+    Orders leaving the display lose their ticket, orders on it get their
+    status (and any staff-set promise) updated, and orders without a ticket
+    get one; one statement each, plus one primary-key read.
+    """
+    now = now or datetime.now()
+    leaving, staying = [], []
+    for order, _ in changes:
+        if not order.cafe_id:
+            continue
+        (staying if order.status in DISPLAY_STATUSES else leaving).append(order)
+
+    if leaving:
+        session.execute(db.delete(KitchenTicket).where(KitchenTicket.order_id.in_([order.id for order in leaving])))
+    if not staying:
+        return
+    ticketed = set(session.execute(
+        db.select(KitchenTicket.order_id).where(KitchenTicket.order_id.in_([order.id for order in staying]))
+    ).scalars())
+    updates = []
+    for order in staying:
+        if order.id in ticketed:
+            row = {'order_id': order.id, 'status': order.status, 'updated_at': now}
+            if order.estimated_ready_time:
+                row['promised_at'] = order.estimated_ready_time
+            updates.append(row)
+    if updates:
+        session.execute(db.update(KitchenTicket), updates)
+    arriving = [order for order in staying if order.id not in ticketed]
+    if arriving:
+        promised = promises(session, arriving, now)
+        session.execute(db.insert(KitchenTicket), [
+            {'order_id': order.id, 'cafe_id': order.cafe_id, 'status': order.status,
+             'promised_at': promised[order.id], 'priority': priority(order), 'updated_at': now}
+            for order in arriving
+        ])
+
+
+def transition(session, cafe_id, order_ids, new_status, message=None, from_status=None, now=None):
+    """Move a café's orders to `new_status` inside the caller's transaction.
+
+    Orders of another café, not in `from_status` (when given) or already in
+    `new_status` are skipped. The orders are read in one primary-key query,
+    tracking rows go in as one executemany, and completions update the
+    sustainability rollups and green points once for the whole batch.
+    Returns (changes as (order, old status) pairs, skipped, tracking rows).
+    """
+    now = now or datetime.now()
+    order_ids = list(dict.fromkeys(order_ids))
+    orders = {
+        order.id: order
+        for order in session.execute(
+            db.select(Order).where(Order.id.in_(order_ids), Order.cafe_id == cafe_id)
+        ).scalars()
+    }
+    changes, skipped = [], []
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        if order is None:
+            skipped.append({'order_id': order_id, 'reason': 'Order not found'})
+        elif from_status and order.status != from_status:
+            skipped.append({'order_id': order_id, 'reason': f'Order is {order.status}'})
+        elif order.status == new_status:
+            skipped.append({'order_id': order_id, 'reason': f'Order is already {new_status}'})
+        else:
+            changes.append((order, apply_status(order, new_status, now)))
+    if not changes:
+        return changes, skipped, []
+
+    created_at = datetime.utcnow()
+    tracking = [
+        {'id': str(uuid.uuid4()), 'order_id': order.id, 'status': new_status,
+         'message': message or f'Order status changed from {old_status} to {new_status}',
+         'estimated_time': order.estimated_ready_time, 'created_at': created_at}
+        for order, old_status in changes
+    ]
+    session.execute(db.insert(OrderTracking), tracking)
+
+    signs = [(order, completion_changed(old_status, new_status)) for order, old_status in changes]
+    counters = record_completions(session, signs)
+    green_points.record_orders(session, [
+        (order, counters[order.id]['organic_orders'], sign) for order, sign in signs if sign
+    ])
+    sync_tickets(session, changes, now)
+    return changes, skipped, tracking
+
+
+def display_query(cafe_id, status=None):
+    """Select a café's tickets with their orders and items, in queue order.
+
+    One query: a range read of ix_kitchen_tickets_queue, which is already in
+    (promised time, order type, order id) order, joined to each order and
+    its items by key.
+    """
+    statement = (
+        db.select(KitchenTicket, Order)
+        .join(Order, Order.id == KitchenTicket.order_id)
+        .where(KitchenTicket.cafe_id == cafe_id)
+        .order_by(KitchenTicket.promised_at, KitchenTicket.priority, KitchenTicket.order_id)
+    )
+    if status:
+        statement = statement.where(KitchenTicket.status == status)
+    return eager_loading.ORDER_DETAIL_GRAPH.apply(statement)
+
+
+def display(session, cafe_id, status=None):
+    """A café's (ticket, order) rows, orders loaded with their items"""
+    return session.execute(display_query(cafe_id, status)).unique().all()
+
+
+def ticket_view(ticket, order, eta=None):
+    return {
+        **ticket.to_dict(),
+        'order_type': order.order_type,
+        'table_number': order.table_number,
+        'customization_notes': order.customization_notes,
+        'created_at': order.created_at.isoformat() if order.created_at else None,
+        'estimated_ready_time': eta.isoformat() if eta else None,
+        'items': [item.to_dict() for item in order.items]
+    }
+
+
+def rebuild(session):
+    """Replace every ticket with one per open order of a café; returns the tickets written"""
+    session.execute(db.delete(KitchenTicket))
+    orders = session.execute(
+        db.select(Order).where(Order.status.in_(DISPLAY_STATUSES), Order.cafe_id.isnot(None))
+    ).scalars().all()
+    sync_tickets(session, [(order, None) for order in orders])
+    session.commit()
+    return len(orders)
@@ -0,0 +1,301 @@
+"""
+Kitchen Scheduler
+Per-café queue of confirmed/preparing orders planned onto the café's baristas;
+ETAs are read from the plan in O(1) and the plan is patched from the changed
+position on each status change instead of being rebuilt
+"""
+
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from ..models.coffee import db, Coffee, KitchenCapacity, Order, OrderItem
+
+OPEN_STATUSES = ('confirmed', 'preparing')
+PREPARING = 'preparing'
+DEFAULT_BARISTAS = 2
+DEFAULT_PREPARATION_MINUTES = 5  # for items without a preparation_time
+ON_PLAN_SECONDS = 30  # a completion this close to its planned finish leaves the plan as it is
+RESYNC_SECONDS = 30  # reload a café from the database this often (other workers change orders too)
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(moment):
+    return (moment - EPOCH).total_seconds()
+
+
+def to_datetime(seconds):
+    return EPOCH + timedelta(seconds=seconds)
+
+
+class _Ticket:
+    __slots__ = ('order_id', 'key', 'seconds', 'started_at', 'before', 'start', 'finish')
+
+    def __init__(self, order_id, key, seconds, started_at):
+        self.order_id = order_id
+        self.key = key  # queue order: (created_at seconds, order id)
+        self.seconds = seconds  # work for one barista
+        self.started_at = started_at  # set once preparing
+        self.before = ()  # barista free times just before this ticket was planned
+        self.start = self.finish = 0.0
+
+
+class KitchenQueue:
+    """One café's open orders, first come first served, list-scheduled onto `baristas`.
+
+    Each ticket goes to the barista who frees up first; a preparing ticket is
+    pinned to its real start. Every ticket keeps the barista free times it
+    was planned against, so a change at position p re-plans from p only and
+    stops as soon as the free times match the previous plan again. Appends
+    (new confirmations) cost O(log baristas); completions that land on plan
+    cost a dict pop. All times are seconds on one clock (see to_seconds).
+    """
+
+    def __init__(self, baristas=DEFAULT_BARISTAS):
+        self.baristas = max(int(baristas), 1)
+        self._tickets = []  # sorted by key
+        self._keys = []
+        self._by_order = {}
+        self._tail = None  # free times after the last ticket
+        self._lock = threading.Lock()
+        self.synced_at = 0.0
+
+    def __len__(self):
+        return len(self._tickets)
+
+    def __contains__(self, order_id):
+        return order_id in self._by_order
+
+    def _idle(self, now):
+        return [now] * self.baristas
+
+    def _plan(self, position, free, now):
+        """Re-plan tickets[position:] starting from barista free times `free`"""
+        heapq.heapify(free)
+        for ticket in self._tickets[position:]:
+            before = tuple(sorted(free))
+            if before == ticket.before and ticket.started_at is None:
+                return  # same state as last time: the rest of the plan stands
+            ticket.before = before
+            available = heapq.heappop(free)
+            ticket.start = ticket.started_at if ticket.started_at is not None else max(available, now)
+            ticket.finish = ticket.start + ticket.seconds
+            heapq.heappush(free, max(ticket.finish, available))
+        self._tail = free
+
+    def _position(self, ticket):
+        return bisect_left(self._keys, ticket.key)
+
+    def add(self, order_id, key, seconds, started_at=None, now=None):
+        """Queue an order (or update it if already queued); `key` orders the queue"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if order_id in self._by_order:
+                self._remove(order_id, now, replan=True)
+            ticket = _Ticket(order_id, key, seconds, started_at)
+            self._by_order[order_id] = ticket
+            position = bisect_left(self._keys, key)
+            self._tickets.insert(position, ticket)
+            self._keys.insert(position, key)
+            if position == len(self._tickets) - 1:
+                self._plan(position, list(self._tail or self._idle(now)), now)
+            else:
+                self._plan(position, list(self._tickets[position + 1].before), now)
+
+    def start(self, order_id, started_at, now=None):
+        """Pin a queued order to the moment preparation started"""
+        now = time.time() if now is None else now
+        with self._lock:
+            ticket = self._by_order.get(order_id)
+            if ticket is None:
+                return False
+            ticket.started_at = started_at
+            self._plan(self._position(ticket), list(ticket.before or self._idle(now)), now)
+            return True
+
+    def remove(self, order_id, now=None):
+        """Drop an order that left the kitchen (ready, completed, cancelled, ...)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._remove(order_id, now, replan=False)
+
+    def _remove(self, order_id, now, replan):
+        ticket = self._by_order.pop(order_id, None)
+        if ticket is None:
+            return False
+        position = self._position(ticket)
+        del self._tickets[position]
+        del self._keys[position]
+        if not self._tickets:
+            self._tail = None
+            return True
+        # A finish on plan frees its barista exactly when the rest of the plan assumed
+        if replan or abs(now - ticket.finish) > ON_PLAN_SECONDS:
+            self._plan(position, list(ticket.before or self._idle(now)), now)
+        return True
+
+    def eta(self, order_id, now=None):
+        """Planned finish of a queued order in seconds, never earlier than it could be done; None if not queued"""
+        ticket = self._by_order.get(order_id)
+        if ticket is None:
+            return None
+        now = time.time() if now is None else now
+        if ticket.started_at is None:
+            return max(ticket.finish, now + ticket.seconds)
+        return max(ticket.finish, now)
+
+    def quote(self, seconds, now=None):
+        """Ready times for orders of `seconds` work each, were they confirmed now in that order"""
+        now = time.time() if now is None else now
+        free = list(self._tail or self._idle(now))
+        heapq.heapify(free)
+        finishes = []
+        for work in seconds:
+            finish = max(heapq.heappop(free), now) + work
+            heapq.heappush(free, finish)
+            finishes.append(finish)
+        return finishes
+
+    def load(self, tickets, now=None):
+        """Replace the queue with (order_id, key, seconds, started_at) rows and plan it from scratch"""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = sorted(tickets, key=lambda row: row[1])
+            self._tickets = [_Ticket(*row) for row in rows]
+            self._keys = [ticket.key for ticket in self._tickets]
+            self._by_order = {ticket.order_id: ticket for ticket in self._tickets}
+            self._tail = None
+            self._plan(0, self._idle(now), now)
+
+    def backlog_seconds(self, now=None):
+        """Time until every barista is free, if nothing else arrives"""
+        now = time.time() if now is None else now
+        return max(max(self._tail) - now, 0.0) if self._tail else 0.0
+
+
+class KitchenRegistry:
+    """Queues by café, loaded lazily and resynced from the database every RESYNC_SECONDS"""
+
+    def __init__(self):
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def queue(self, session, cafe_id):
+        queue = self._queues.get(cafe_id)
+        if queue is None or time.time() - queue.synced_at > RESYNC_SECONDS:
+            with self._lock:
+                queue = self._queues.get(cafe_id)
+                if queue is None or time.time() - queue.synced_at > RESYNC_SECONDS:
+                    queue = self._queues[cafe_id] = load_queue(session, cafe_id)
+        return queue
+
+    def invalidate(self, cafe_id):
+        """Drop a café's queue; it is reloaded (e.g. with a new capacity) on next use"""
+        with self._lock:
+            self._queues.pop(cafe_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._queues.clear()
+
+
+kitchens = KitchenRegistry()
+
+ORDER_SECONDS = (
+    db.select(OrderItem.order_id,
+              db.func.sum(db.func.coalesce(Coffee.preparation_time, DEFAULT_PREPARATION_MINUTES)
+                          * OrderItem.quantity * 60))
+    .join(Coffee, Coffee.id == OrderItem.coffee_id)
+    .group_by(OrderItem.order_id)
+)
+
+
+def order_seconds(session, order_id):
+    """Barista work for one order: its items' preparation times x quantities"""
+    row = session.execute(ORDER_SECONDS.where(OrderItem.order_id == order_id)).first()
+    return float(row[1]) if row and row[1] else DEFAULT_PREPARATION_MINUTES * 60.0
+
+
+def orders_seconds(session, order_ids):
+    """order_seconds for many orders in one query"""
+    rows = dict(session.execute(ORDER_SECONDS.where(OrderItem.order_id.in_(order_ids))).all())
+    return {order_id: float(rows[order_id]) if rows.get(order_id) else DEFAULT_PREPARATION_MINUTES * 60.0
+            for order_id in order_ids}
+
+
+def queue_key(order):
+    return (to_seconds(order.created_at or datetime.now()), order.id)
+
+
+def capacity(session, cafe_id):
+    row = session.get(KitchenCapacity, cafe_id)
+    return row.baristas if row else DEFAULT_BARISTAS
+
+
+def open_orders(cafe_id):
+    """Select a café's open orders with their barista seconds (ix_orders_cafe_status, then one row per order)"""
+    return (
+        db.select(Order.id, Order.created_at, Order.preparation_start_time, Order.status,
+                  db.func.sum(db.func.coalesce(Coffee.preparation_time, DEFAULT_PREPARATION_MINUTES)
+                              * OrderItem.quantity * 60))
+        .select_from(Order)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Coffee, Coffee.id == OrderItem.coffee_id)
+        .where(Order.cafe_id == cafe_id, Order.status.in_(OPEN_STATUSES))
+        .group_by(Order.id)
+    )
+
+
+def load_queue(session, cafe_id):
+    """Build a café's queue from its open orders in one query"""
+    rows = session.execute(open_orders(cafe_id)).all()
+    queue = KitchenQueue(capacity(session, cafe_id))
+    now = to_seconds(datetime.now())
+    queue.load([
+        (order_id, (to_seconds(created_at or datetime.now()), order_id),
+         float(seconds) if seconds else DEFAULT_PREPARATION_MINUTES * 60.0,
+         to_seconds(started) if status == PREPARING and started else None)
+        for order_id, created_at, started, status, seconds in rows
+    ], now=now)
+    queue.synced_at = time.time()
+    return queue
+
+
+def order_changed(session, order, old_status):
+    """Apply an order's committed status change to its café's queue"""
+    orders_changed(session, [(order, old_status)])
+
+
+def orders_changed(session, changes):
+    """Apply committed status changes ((order, old status) pairs) to their cafés' queues.
+
+    Orders joining a queue have their work read in one query for the batch.
+    """
+    changes = [(order, old_status) for order, old_status in changes if order.cafe_id and old_status != order.status]
+    joining = [order.id for order, _ in changes
+               if order.status in OPEN_STATUSES and order.id not in kitchens.queue(session, order.cafe_id)]
+    seconds = orders_seconds(session, joining) if joining else {}
+    now = to_seconds(datetime.now())
+    for order, _ in changes:
+        queue = kitchens.queue(session, order.cafe_id)
+        if order.status not in OPEN_STATUSES:
+            queue.remove(order.id, now=now)
+            continue
+        started = to_seconds(order.preparation_start_time) if order.status == PREPARING and order.preparation_start_time else None
+        if order.id in queue:
+            if started is not None:
+                queue.start(order.id, started, now=now)
+        else:
+            work = seconds[order.id] if order.id in seconds else order_seconds(session, order.id)
+            queue.add(order.id, queue_key(order), work, started, now=now)
+
+
+def estimated_ready_time(session, order):
+    """Kitchen ETA for an order as a datetime, or None when the order is not in a kitchen queue"""
+    if not order.cafe_id or order.status not in OPEN_STATUSES:
+        return None
+    queue = kitchens.queue(session, order.cafe_id)
+    eta = queue.eta(order.id, now=to_seconds(datetime.now()))
+    return to_datetime(eta) if eta is not None else None
@@ -0,0 +1,269 @@
+"""
+Loyalty Leaderboard
+Order-statistic sorted list plus global, per-city and per-café boards
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+
+class OrderStatisticList:
+    """Sorted list with O(log n) insert, remove, rank and index lookup.
+
+    Values live in sorted buckets of roughly `load` items; a Fenwick tree over
+    bucket sizes turns a bucket position into a global rank.
+    """
+
+    def __init__(self, load=500):
+        self._load = load
+        self._lists = []
+        self._maxes = []
+        self._tree = []
+        self._dirty = True
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def _rebuild_tree(self):
+        tree = [len(lst) for lst in self._lists]
+        for i in range(len(tree)):
+            j = i + ((i + 1) & -(i + 1))
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree = tree
+        self._dirty = False
+
+    def _tree_add(self, pos, delta):
+        if self._dirty:
+            return
+        tree = self._tree
+        k = pos + 1
+        while k <= len(tree):
+            tree[k - 1] += delta
+            k += k & -k
+
+    def _prefix(self, pos):
+        """Number of values in buckets [0, pos)"""
+        if self._dirty:
+            self._rebuild_tree()
+        total = 0
+        while pos > 0:
+            total += self._tree[pos - 1]
+            pos &= pos - 1
+        return total
+
+    def _locate(self, index):
+        """Map a global index to (bucket, offset) by descending the Fenwick tree"""
+        if self._dirty:
+            self._rebuild_tree()
+        pos = 0
+        step = 1 << (len(self._tree).bit_length())
+        while step:
+            nxt = pos + step
+            if nxt <= len(self._tree) and self._tree[nxt - 1] <= index:
+                index -= self._tree[nxt - 1]
+                pos = nxt
+            step >>= 1
+        return pos, index
+
+    def add(self, value):
+        self._len += 1
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+            self._dirty = True
+            return
+        pos = bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._lists[pos].append(value)
+            self._maxes[pos] = value
+        else:
+            insort(self._lists[pos], value)
+        self._tree_add(pos, 1)
+        lst = self._lists[pos]
+        if len(lst) > 2 * self._load:
+            self._lists[pos:pos + 1] = [lst[:self._load], lst[self._load:]]
+            self._maxes[pos:pos + 1] = [lst[self._load - 1], lst[-1]]
+            self._dirty = True
+
+    def remove(self, value):
+        pos = bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            raise ValueError(f'{value!r} not in list')
+        lst = self._lists[pos]
+        idx = bisect_left(lst, value)
+        if idx == len(lst) or lst[idx] != value:
+            raise ValueError(f'{value!r} not in list')
+        del lst[idx]
+        self._len -= 1
+        if lst:
+            self._maxes[pos] = lst[-1]
+            self._tree_add(pos, -1)
+        else:
+            del self._lists[pos]
+            del self._maxes[pos]
+            self._dirty = True
+
+    def bisect_left(self, value):
+        """Number of values strictly less than value"""
+        if not self._lists:
+            return 0
+        pos = bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._prefix(pos) + bisect_left(self._lists[pos], value)
+
+    def bisect_right(self, value):
+        """Number of values less than or equal to value"""
+        if not self._lists:
+            return 0
+        pos = bisect_right(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._prefix(pos) + bisect_right(self._lists[pos], value)
+
+    def slice(self, start, stop):
+        """Return values[start:stop] without materialising the whole list"""
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        pos, offset = self._locate(start)
+        result = []
+        remaining = stop - start
+        while remaining > 0 and pos < len(self._lists):
+            chunk = self._lists[pos][offset:offset + remaining]
+            result.extend(chunk)
+            remaining -= len(chunk)
+            pos += 1
+            offset = 0
+        return result
+
+
+class Leaderboard:
+    """Members ranked by points (descending), ties broken by member ID"""
+
+    def __init__(self):
+        self._entries = OrderStatisticList()
+        self._points = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def set(self, member_id, points):
+        old = self._points.get(member_id)
+        if old == points:
+            return
+        if old is not None:
+            self._entries.remove((-old, member_id))
+        self._entries.add((-points, member_id))
+        self._points[member_id] = points
+
+    def discard(self, member_id):
+        old = self._points.pop(member_id, None)
+        if old is not None:
+            self._entries.remove((-old, member_id))
+
+    def rank(self, member_id):
+        """1-based competition rank (members with equal points share a rank), or None"""
+        points = self._points.get(member_id)
+        if points is None:
+            return None
+        return self._entries.bisect_left((-points,)) + 1
+
+    def top(self, limit, offset=0):
+        """Return [(rank, member_id, points)] for one page of the board"""
+        rows = []
+        for neg_points, member_id in self._entries.slice(offset, offset + limit):
+            rows.append((self._entries.bisect_left((neg_points,)) + 1, member_id, -neg_points))
+        return rows
+
+
+class LeaderboardRegistry:
+    """Global, per-city and per-café boards kept in step with each other"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self._global = Leaderboard()
+        self._by_city = {}
+        self._by_cafe = {}
+        self._members = {}  # user_id -> {'username', 'level', 'total_orders', 'city', 'cafe_id'}
+
+    def board(self, city=None, cafe_id=None):
+        if cafe_id:
+            return self._by_cafe.get(cafe_id)
+        if city:
+            return self._by_city.get(city.lower())
+        return self._global
+
+    def update(self, user_id, points, username=None, level=None, total_orders=None, city=None, cafe_id=None):
+        """Insert or move a member; omitted profile fields keep their previous values"""
+        with self._lock:
+            member = self._members.get(user_id)
+            if member is None:
+                member = self._members[user_id] = {
+                    'username': username, 'level': level, 'total_orders': total_orders,
+                    'city': city, 'cafe_id': cafe_id
+                }
+            else:
+                if username is not None:
+                    member['username'] = username
+                if level is not None:
+                    member['level'] = level
+                if total_orders is not None:
+                    member['total_orders'] = total_orders
+                for field, value in (('city', city), ('cafe_id', cafe_id)):
+                    if value is not None and member[field] != value:
+                        self._scoped(field, member[field]).discard(user_id)
+                        member[field] = value
+            self._global.set(user_id, points)
+            if member['city']:
+                self._scoped('city', member['city'], create=True).set(user_id, points)
+            if member['cafe_id']:
+                self._scoped('cafe_id', member['cafe_id'], create=True).set(user_id, points)
+
+    def _scoped(self, field, key, create=False):
+        boards = self._by_city if field == 'city' else self._by_cafe
+        if field == 'city' and key:
+            key = key.lower()
+        board = boards.get(key)
+        if board is None:
+            board = Leaderboard()
+            if create:
+                boards[key] = board
+        return board
+
+    def rank(self, user_id, city=None, cafe_id=None):
+        with self._lock:
+            board = self.board(city, cafe_id)
+            if board is None:
+                return None, 0
+            return board.rank(user_id), len(board)
+
+    def top(self, limit, offset=0, city=None, cafe_id=None):
+        with self._lock:
+            board = self.board(city, cafe_id)
+            if board is None:
+                return []
+            return [
+                dict(rank=rank, user_id=user_id, points=points, **self._profile(user_id))
+                for rank, user_id, points in board.top(limit, offset)
+            ]
+
+    def _profile(self, user_id):
+        member = self._members[user_id]
+        return {
+            'username': member['username'],
+            'level': member['level'],
+            'total_orders': member['total_orders']
+        }
+
+    def clear(self):
+        with self._lock:
+            self._global = Leaderboard()
+            self._by_city = {}
+            self._by_cafe = {}
+            self._members = {}
+            self.loaded = False
@@ -0,0 +1,121 @@
+"""
+Loyalty Ledger
+Bulk points awards written as chunked, set-based transactions
+"""
+
+import uuid
+from datetime import datetime
+from itertools import islice
+
+from ..models.coffee import db, User, LoyaltyTransaction
+
+FIELDS = ('user_id', 'points', 'description', 'order_id')
+# Ids per IN (...) list, well under SQLite's 32766 bind-parameter limit
+LOOKUP_BATCH = 10000
+# What on_commit gets for each member whose balance changed
+PROFILE = (User.id, User.username, User.loyalty_points, User.loyalty_level, User.total_orders,
+           User.preferred_cafes.label('preferred_cafes'))
+
+
+def _normalize(record):
+    """Accept a (user_id, points, description, order_id) tuple or a dict"""
+    if isinstance(record, dict):
+        return {field: record.get(field) for field in FIELDS}
+    values = tuple(record) + (None,) * (len(FIELDS) - len(record))
+    return dict(zip(FIELDS, values))
+
+
+def _chunks(records, size):
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _lookup(columns, user_ids):
+    """Rows of `columns` for `user_ids`, looked up LOOKUP_BATCH ids per IN (...) list"""
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), LOOKUP_BATCH):
+        yield from db.session.query(*columns).filter(User.id.in_(user_ids[start:start + LOOKUP_BATCH]))
+
+
+def award_points_bulk(records, chunk_size=5000, on_commit=None):
+    """Award loyalty points for a stream of records, yielding one outcome per record.
+
+    Each chunk is one transaction: an IN (...) lookup of the users, one
+    executemany insert of LoyaltyTransaction rows and one executemany
+    primary-key UPDATE applying the net balance delta per user. `on_commit`
+    receives the changed members' PROFILE rows (with their new balances)
+    after each chunk commits.
+    """
+    index = 0
+    for chunk in _chunks(records, chunk_size):
+        outcomes = []
+        valid = []
+        for record in chunk:
+            try:
+                award = _normalize(record)
+            except TypeError:
+                award = {'user_id': None, 'points': None}
+            outcome = {'index': index, 'user_id': award['user_id'], 'success': False}
+            index += 1
+            outcomes.append(outcome)
+            points = award['points']
+            if not award['user_id']:
+                outcome['error'] = 'User ID is required'
+            elif not isinstance(points, int) or isinstance(points, bool) or points <= 0:
+                outcome['error'] = 'Points must be positive'
+            else:
+                valid.append((outcome, award))
+
+        try:
+            user_ids = {award['user_id'] for _, award in valid}
+            existing = {user_id for (user_id,) in _lookup((User.id,), user_ids)}
+
+            now = datetime.utcnow()
+            rows = []
+            deltas = {}
+            for outcome, award in valid:
+                if award['user_id'] not in existing:
+                    outcome['error'] = 'User not found'
+                    continue
+                transaction_id = str(uuid.uuid4())
+                rows.append({
+                    'id': transaction_id,
+                    'user_id': award['user_id'],
+                    'transaction_type': 'earned',
+                    'points': award['points'],
+                    'description': award['description'] or 'Points earned',
+                    'order_id': award['order_id'],
+                    'created_at': now
+                })
+                deltas[award['user_id']] = deltas.get(award['user_id'], 0) + award['points']
+                outcome['transaction_id'] = transaction_id
+
+            members = []
+            if rows:
+                db.session.execute(db.insert(LoyaltyTransaction), rows)
+                db.session.execute(
+                    db.update(User.__table__)
+                    .where(User.__table__.c.id == db.bindparam('user_id'))
+                    .values(loyalty_points=db.func.coalesce(User.__table__.c.loyalty_points, 0) + db.bindparam('delta')),
+                    [{'user_id': user_id, 'delta': delta} for user_id, delta in deltas.items()]
+                )
+                members = list(_lookup(PROFILE, deltas))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for outcome, _ in valid:
+                outcome.pop('transaction_id', None)
+                outcome.setdefault('error', str(e))
+        else:
+            for outcome, award in valid:
+                if 'transaction_id' in outcome:
+                    outcome['success'] = True
+                    outcome['points'] = award['points']
+            if on_commit and members:
+                on_commit(members)
+
+        yield from outcomes
@@ -0,0 +1,350 @@
+"""
+Request Metrics
+Per-endpoint latency/size histograms, in-flight gauges, SQL statement counts and
+DB time, and N+1 detection; recorded into per-thread shards without locks and
+merged into Prometheus text on scrape
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+N_PLUS_ONE_THRESHOLD = 5  # same lazy load or identical statement this many times in one request
+UNMATCHED = '<unmatched>'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_TABLE = re.compile(r'\b(?:FROM|UPDATE|INTO)\s+"?(\w+)', re.IGNORECASE)
+
+
+def _bucket(bounds, value):
+    """Index of the first bucket whose upper bound holds `value` (len(bounds) is +Inf)"""
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+    return len(bounds)
+
+
+class _EndpointStats:
+    """Everything recorded for one (blueprint, endpoint) in one thread"""
+
+    __slots__ = ('latency', 'latency_sum', 'size', 'size_sum', 'queries', 'query_count', 'db_seconds',
+                 'statuses', 'started', 'finished')
+
+    def __init__(self):
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.size = [0] * (len(SIZE_BUCKETS) + 1)
+        self.size_sum = 0
+        self.queries = [0] * (len(QUERY_BUCKETS) + 1)
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.statuses = {}
+        self.started = 0
+        self.finished = 0
+
+    def merge(self, other):
+        for name in ('latency', 'size', 'queries'):
+            mine = getattr(self, name)
+            for index, value in enumerate(getattr(other, name)):
+                mine[index] += value
+        self.latency_sum += other.latency_sum
+        self.size_sum += other.size_sum
+        self.query_count += other.query_count
+        self.db_seconds += other.db_seconds
+        for status, count in other.statuses.copy().items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.started += other.started
+        self.finished += other.finished
+
+
+class _Shard:
+    """One thread's accumulators; only that thread writes, the scraper only reads"""
+
+    __slots__ = ('endpoints', 'lazy_loads', 'n_plus_one', 'background_queries', 'background_seconds')
+
+    def __init__(self):
+        self.endpoints = {}   # (blueprint, endpoint) -> _EndpointStats
+        self.lazy_loads = {}  # (endpoint, relationship) -> count
+        self.n_plus_one = {}  # (endpoint, kind, source) -> requests flagged
+        self.background_queries = 0
+        self.background_seconds = 0.0
+
+    def stats(self, key):
+        stats = self.endpoints.get(key)
+        if stats is None:
+            stats = self.endpoints[key] = _EndpointStats()
+        return stats
+
+    def merge(self, other):
+        for key, stats in other.endpoints.copy().items():
+            self.stats(key).merge(stats)
+        for name in ('lazy_loads', 'n_plus_one'):
+            mine = getattr(self, name)
+            for key, count in getattr(other, name).copy().items():
+                mine[key] = mine.get(key, 0) + count
+        self.background_queries += other.background_queries
+        self.background_seconds += other.background_seconds
+
+
+class _RequestState:
+    __slots__ = ('key', 'start', 'queries', 'db_seconds', 'statements', 'lazy', 'size')
+
+    def __init__(self, key):
+        self.key = key
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+        self.lazy = Counter()
+        self.size = None
+
+
+class MetricsRegistry:
+    """Per-thread shards plus a retired shard holding the totals of threads that exited"""
+
+    def __init__(self, n_plus_one_threshold=N_PLUS_ONE_THRESHOLD):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._local = threading.local()
+        self._shards = []  # (thread, shard)
+        self._retired = _Shard()
+        self._lock = threading.Lock()  # taken when a thread registers and on scrape, never per request
+        self._warned = set()
+
+    def shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    # Request lifecycle (called from the Flask hooks) ------------------------
+
+    def begin(self, blueprint, endpoint):
+        key = (blueprint or '', endpoint)
+        self.shard().stats(key).started += 1
+        self._local.request = _RequestState(key)
+
+    def response_size(self, size):
+        state = getattr(self._local, 'request', None)
+        if state is not None:
+            state.size = size
+
+    def end(self, status):
+        state = getattr(self._local, 'request', None)
+        if state is None:
+            return
+        self._local.request = None
+        elapsed = time.perf_counter() - state.start
+        shard = self.shard()
+        stats = shard.stats(state.key)
+        stats.finished += 1
+        stats.latency[_bucket(LATENCY_BUCKETS, elapsed)] += 1
+        stats.latency_sum += elapsed
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        if state.size is not None:
+            stats.size[_bucket(SIZE_BUCKETS, state.size)] += 1
+            stats.size_sum += state.size
+        stats.queries[_bucket(QUERY_BUCKETS, state.queries)] += 1
+        stats.query_count += state.queries
+        stats.db_seconds += state.db_seconds
+
+        endpoint = state.key[1]
+        for relationship, count in state.lazy.items():
+            key = (endpoint, relationship)
+            shard.lazy_loads[key] = shard.lazy_loads.get(key, 0) + count
+            if count >= self.n_plus_one_threshold:
+                self._flag(shard, endpoint, 'lazy_load', relationship, count)
+        if state.queries >= self.n_plus_one_threshold:
+            for statement, count in state.statements.items():
+                if count >= self.n_plus_one_threshold:
+                    match = _TABLE.search(statement)
+                    self._flag(shard, endpoint, 'repeated_statement', match.group(1) if match else '?', count,
+                               statement)
+
+    def _flag(self, shard, endpoint, kind, source, count, statement=None):
+        key = (endpoint, kind, source)
+        shard.n_plus_one[key] = shard.n_plus_one.get(key, 0) + 1
+        if key not in self._warned:
+            self._warned.add(key)
+            detail = f': {statement[:200]}' if statement else ''
+            log.warning('possible N+1 in %s: %s %s ran %d times in one request%s',
+                        endpoint, kind.replace('_', ' '), source, count, detail)
+
+    # SQL events -----------------------------------------------------------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        state = getattr(self._local, 'request', None)
+        if state is None:
+            shard = self.shard()
+            shard.background_queries += 1
+            shard.background_seconds += elapsed
+            return
+        state.queries += 1
+        state.db_seconds += elapsed
+        state.statements[statement] += 1
+
+    def _handle_error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None:
+            starts = connection.info.get('metrics_query_start')
+            if starts:
+                starts.pop()
+
+    def _do_orm_execute(self, orm_execute_state):
+        # lazy_loaded_from is only set by lazy loads; selectin/subquery eager loads leave it None
+        if orm_execute_state.is_select and orm_execute_state.lazy_loaded_from is not None:
+            state = getattr(self._local, 'request', None)
+            if state is not None:
+                state.lazy[str(orm_execute_state.loader_strategy_path[-1])] += 1
+
+    def watch_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(engine, 'handle_error', self._handle_error)
+
+    def watch_sessions(self):
+        event.listen(Session, 'do_orm_execute', self._do_orm_execute)
+
+    # Scrape ---------------------------------------------------------------
+
+    def snapshot(self):
+        """Merge every shard; shards of exited threads are folded into the retired totals"""
+        merged = _Shard()
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self._retired.merge(shard)
+            self._shards = alive
+            merged.merge(self._retired)
+            shards = [shard for _, shard in alive]
+        for shard in shards:
+            merged.merge(shard)
+        return merged
+
+    def render(self):
+        return render_prometheus(self.snapshot())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, bounds, counts, total, labels):
+    cumulative = 0
+    for bound, count in zip(bounds, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels(**labels, le=f"{bound:g}")} {cumulative}')
+    cumulative += counts[-1]
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {total:g}')
+    lines.append(f'{name}_count{_labels(**labels)} {cumulative}')
+
+
+def render_prometheus(shard):
+    """Prometheus text exposition (format 0.0.4) of a merged shard"""
+    lines = []
+    endpoints = sorted(shard.endpoints.items())
+
+    def header(name, kind, text):
+        lines.append(f'# HELP {name} {text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    header('ccd_http_requests_total', 'counter', 'Completed HTTP requests')
+    for (blueprint, endpoint), stats in endpoints:
+        for status, count in sorted(stats.statuses.items()):
+            lines.append(f'ccd_http_requests_total{_labels(blueprint=blueprint, endpoint=endpoint, status=status)} {count}')
+
+    header('ccd_http_request_duration_seconds', 'histogram', 'Request latency from routing to teardown')
+    for (blueprint, endpoint), stats in endpoints:
+        _histogram(lines, 'ccd_http_request_duration_seconds', LATENCY_BUCKETS, stats.latency, stats.latency_sum,
+                   {'blueprint': blueprint, 'endpoint': endpoint})
+
+    header('ccd_http_response_size_bytes', 'histogram', 'Response body size (responses with a known length)')
+    for (blueprint, endpoint), stats in endpoints:
+        _histogram(lines, 'ccd_http_response_size_bytes', SIZE_BUCKETS, stats.size, stats.size_sum,
+                   {'blueprint': blueprint, 'endpoint': endpoint})
+
+    header('ccd_http_requests_in_flight', 'gauge', 'Requests currently being handled by this process')
+    for (blueprint, endpoint), stats in endpoints:
+        lines.append(f'ccd_http_requests_in_flight{_labels(blueprint=blueprint, endpoint=endpoint)} '
+                     f'{stats.started - stats.finished}')
+
+    header('ccd_http_sql_queries_per_request', 'histogram', 'SQL statements executed per request')
+    for (blueprint, endpoint), stats in endpoints:
+        _histogram(lines, 'ccd_http_sql_queries_per_request', QUERY_BUCKETS, stats.queries, stats.query_count,
+                   {'blueprint': blueprint, 'endpoint': endpoint})
+
+    header('ccd_http_db_seconds_total', 'counter', 'Time spent executing SQL statements during requests')
+    for (blueprint, endpoint), stats in endpoints:
+        lines.append(f'ccd_http_db_seconds_total{_labels(blueprint=blueprint, endpoint=endpoint)} {stats.db_seconds:g}')
+
+    header('ccd_sql_lazy_loads_total', 'counter', 'Relationship lazy loads that hit the database, by relationship')
+    for (endpoint, relationship), count in sorted(shard.lazy_loads.items()):
+        lines.append(f'ccd_sql_lazy_loads_total{_labels(endpoint=endpoint, relationship=relationship)} {count}')
+
+    header('ccd_sql_n_plus_one_requests_total', 'counter',
+           f'Requests repeating one lazy load or statement at least {N_PLUS_ONE_THRESHOLD} times')
+    for (endpoint, kind, source), count in sorted(shard.n_plus_one.items()):
+        lines.append(f'ccd_sql_n_plus_one_requests_total{_labels(endpoint=endpoint, kind=kind, source=source)} {count}')
+
+    header('ccd_sql_background_queries_total', 'counter', 'SQL statements executed outside any request')
+    lines.append(f'ccd_sql_background_queries_total {shard.background_queries}')
+    header('ccd_sql_background_seconds_total', 'counter', 'Time spent in SQL outside any request')
+    lines.append(f'ccd_sql_background_seconds_total {shard.background_seconds:g}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app, db, registry=None):
+    """Record every request of `app` and every statement on `db`'s engine; returns the registry"""
+    registry = registry or MetricsRegistry(app.config.get('METRICS_N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD))
+
+    @app.before_request
+    def _metrics_begin():
+        rule = request.url_rule
+        endpoint = f'{request.method} {rule.rule}' if rule is not None else UNMATCHED
+        registry.begin(request.blueprint, endpoint)
+        g.metrics_started = True
+
+    @app.after_request
+    def _metrics_size(response):
+        # Only buffered bodies are measured; asking a generator for its length would drain it
+        registry.response_size(response.calculate_content_length() if response.is_sequence
+                               else response.content_length)
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_end(exception):
+        if g.get('metrics_started'):
+            registry.end(500 if exception is not None else g.get('metrics_status', 500))
+
+    with app.app_context():
+        registry.watch_engine(db.engine)
+    registry.watch_sessions()
+    return registry
@@ -0,0 +1,115 @@
+"""
+Order Event Hub
+In-process publish/subscribe for live order tracking updates, plus a poll of
+the events other processes committed
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+POLL_SECONDS = 1.0
+# Each poll re-reads this much history: rows are stamped before they commit,
+# so one can land behind the previous poll's horizon
+POLL_WINDOW_SECONDS = 10
+RECENT_EVENTS = 20000  # event ids remembered so a polled event is not delivered twice
+
+
+class Subscription:
+    """One listener on one order; kept deliberately small since thousands sit idle"""
+
+    __slots__ = ('order_id', '_pending', '_ready')
+
+    def __init__(self, order_id):
+        self.order_id = order_id
+        self._pending = deque()
+        self._ready = threading.Event()
+
+    def deliver(self, event):
+        self._pending.append(event)
+        self._ready.set()
+
+    def wait(self, timeout):
+        """Return queued (event_id, data) pairs, or [] if timeout elapses first"""
+        if not self._ready.wait(timeout):
+            return []
+        self._ready.clear()
+        events = []
+        while self._pending:
+            events.append(self._pending.popleft())
+        return events
+
+
+class OrderEventHub:
+    """Fan tracking events out to every subscriber of the order they belong to"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # order_id -> set of Subscription
+        self._recent = deque()
+        self._recent_ids = set()
+        self._poller_pid = None
+
+    def subscribe(self, order_id):
+        subscription = Subscription(order_id)
+        with self._lock:
+            self._subscribers.setdefault(order_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.order_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.order_id]
+
+    def publish(self, order_id, event_id, data):
+        """Deliver an event to the order's subscribers; returns how many received it"""
+        with self._lock:
+            if event_id in self._recent_ids:
+                return 0
+            self._recent.append(event_id)
+            self._recent_ids.add(event_id)
+            if len(self._recent) > RECENT_EVENTS:
+                self._recent_ids.discard(self._recent.popleft())
+            subscribers = list(self._subscribers.get(order_id, ()))
+        for subscription in subscribers:
+            subscription.deliver((event_id, data))
+        return len(subscribers)
+
+    def poll(self, fetch):
+        """Also deliver events committed by other processes (e.g. prefork workers).
+
+        Starts one thread per process which, while anyone is subscribed, calls
+        `fetch(since)` every POLL_SECONDS for the (order id, event id, data)
+        of events created after `since` (UTC) and publishes those not seen yet.
+        """
+        with self._lock:
+            if self._poller_pid == os.getpid():
+                return
+            self._poller_pid = os.getpid()
+        threading.Thread(target=self._poll, args=(fetch,), name='order-events-poll', daemon=True).start()
+
+    def _poll(self, fetch):
+        while True:
+            time.sleep(POLL_SECONDS)
+            if not self.subscriber_count():
+                continue
+            try:
+                events = fetch(datetime.utcnow() - timedelta(seconds=POLL_WINDOW_SECONDS))
+            except Exception:
+                continue  # the database is busy or unreachable; the next poll covers the same window
+            for order_id, event_id, data in events:
+                self.publish(order_id, event_id, data)
+
+    def subscriber_count(self, order_id=None):
+        with self._lock:
+            if order_id is not None:
+                return len(self._subscribers.get(order_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+order_events = OrderEventHub()
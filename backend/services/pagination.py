@@ -0,0 +1,128 @@
+"""
+Pagination
+Keyset (cursor) pagination: opaque cursors carry the sort key of the last row
+served, so every page is an index seek rather than an OFFSET scan
+"""
+
+import base64
+import json
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time
+
+from sqlalchemy import Date, DateTime, Time, tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not issued by this keyset"""
+
+
+def page_limit(args):
+    """Clamp the ?limit= request argument to [1, MAX_LIMIT]"""
+    return min(max(args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe token for a sort key tuple"""
+    plain = [value.isoformat() if isinstance(value, (datetime, date, time)) else value for value in values]
+    raw = json.dumps(plain, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token, size, kind=None):
+    """Sort key list from a cursor; `kind` optionally requires every value to be of that type"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Invalid cursor')
+    if kind is not None and not all(isinstance(value, kind) for value in values):
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+class Keyset:
+    """A total order over (sort column, ..., unique id column) used to seek pages.
+
+    The columns must be non-null and covered, in this order, by an index that
+    follows any equality filters of the query, e.g. (user_id, created_at, id).
+    """
+
+    def __init__(self, *columns, descending=False):
+        self.columns = columns
+        self.descending = descending
+        self._parsers = []
+        for column in columns:
+            column_type = column.type
+            if isinstance(column_type, DateTime):
+                self._parsers.append(datetime.fromisoformat)
+            elif isinstance(column_type, Date):
+                self._parsers.append(date.fromisoformat)
+            elif isinstance(column_type, Time):
+                self._parsers.append(time.fromisoformat)
+            else:
+                self._parsers.append(None)
+
+    def decode(self, token):
+        values = decode_cursor(token, len(self.columns))
+        try:
+            return tuple(parse(value) if parse and value is not None else value
+                         for parse, value in zip(self._parsers, values))
+        except (TypeError, ValueError):
+            raise InvalidCursor('Invalid cursor')
+
+    def key(self, row):
+        """Sort key of a result row (ORM object or Core row with the key columns selected)"""
+        return tuple(getattr(row, column.key) for column in self.columns)
+
+    def seek(self, statement, cursor):
+        """Apply the ordering, and the row-value seek past `cursor` when given"""
+        keys = tuple_(*self.columns)
+        if cursor:
+            after = tuple_(*self.decode(cursor))
+            statement = statement.where(keys < after if self.descending else keys > after)
+        order = [column.desc() if self.descending else column.asc() for column in self.columns]
+        return statement.order_by(*order)
+
+
+def paginate(session, statement, keyset, cursor, limit, keep=None, scalars=False):
+    """Execute one page of `statement`; returns (rows, next_cursor).
+
+    `keep` optionally filters rows in Python; further windows are read until
+    the page is full so callers always get `limit` rows while more exist.
+    `scalars` returns ORM objects for a single-entity select.
+    """
+    rows = []
+    while True:
+        result = session.execute(keyset.seek(statement, cursor).limit(limit + 1))
+        batch = (result.scalars() if scalars else result).all()
+        more = len(batch) > limit
+        batch = batch[:limit]
+        if keep is None:
+            return batch, encode_cursor(keyset.key(batch[-1])) if more else None
+        for row in batch:
+            if keep(row):
+                rows.append(row)
+                if len(rows) == limit:
+                    return rows, encode_cursor(keyset.key(row)) if more or row is not batch[-1] else None
+        if not more:
+            return rows, None
+        cursor = encode_cursor(keyset.key(batch[-1]))
+
+
+def paginate_sorted(keys, cursor, limit, descending=False):
+    """Keyset-paginate an ascending sorted list of string key tuples; returns (keys, next_cursor)"""
+    after = tuple(decode_cursor(cursor, len(keys[0]), str)) if cursor and keys else None
+    if descending:
+        stop = bisect_left(keys, after) if after else len(keys)
+        page = keys[max(stop - limit, 0):stop][::-1]
+        more = stop > limit
+    else:
+        start = bisect_right(keys, after) if after else 0
+        page = keys[start:start + limit]
+        more = start + limit < len(keys)
+    return page, encode_cursor(page[-1]) if more and page else None
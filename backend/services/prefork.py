@@ -0,0 +1,301 @@
+"""
+Prefork Server
+Production WSGI serving: a master process preloads the app, freezes the GC
+heap and forks workers that share one listening socket copy-on-write
+"""
+
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+
+class _RequestHandler(WSGIRequestHandler):
+    """Werkzeug's handler without the per-request access log line"""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class _LoggingRequestHandler(WSGIRequestHandler):
+    pass
+
+
+MAX_CONNECTIONS = 10000  # per worker, idle event streams included
+
+
+class _Closing:
+    """A response iterable that calls `done` once the server closes it"""
+
+    def __init__(self, iterable, done):
+        self._iterable = iterable
+        self._done = done
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        done, self._done = self._done, None
+        try:
+            close = getattr(self._iterable, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            if done is not None:
+                done()
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug WSGI server with a thread per connection and at most `threads` requests inside the app.
+
+    Connection threads come from a pool that keeps idle threads for reuse
+    and grows up to `connections`. A Server-Sent Events response gives its
+    slot back as soon as the app returns it, so a worker holds thousands of
+    idle subscribers (a parked thread each) next to `threads` ordinary
+    requests. Draining cuts those streams; clients reconnect with
+    Last-Event-ID.
+    """
+
+    multithread = True  # read by BaseWSGIServer to enable HTTP/1.1
+
+    def __init__(self, host, port, app, threads=1, connections=MAX_CONNECTIONS, fd=None, handler=None):
+        self.slots = threading.BoundedSemaphore(max(threads, 1))
+        self.pool = ThreadPoolExecutor(max(connections, threads, 1), thread_name_prefix='wsgi')
+        self._lock = threading.Lock()
+        self._streams = set()  # sockets of open event streams
+        super().__init__(host, port, self._limited(app), handler=handler, fd=fd)
+
+    def _limited(self, app):
+        def limited(environ, start_response):
+            streaming = False
+
+            def start(status, headers, exc_info=None):
+                nonlocal streaming
+                streaming = any(name.lower() == 'content-type' and value.startswith('text/event-stream')
+                                for name, value in headers)
+                return start_response(status, headers, exc_info)
+
+            self.slots.acquire()
+            try:
+                iterable = app(environ, start)
+            except BaseException:
+                self.slots.release()
+                raise
+            if not streaming:
+                return _Closing(iterable, self.slots.release)
+            self.slots.release()
+            connection = environ.get('werkzeug.socket')
+            with self._lock:
+                self._streams.add(connection)
+            return _Closing(iterable, lambda: self._end_stream(connection))
+
+        return limited
+
+    def _end_stream(self, connection):
+        with self._lock:
+            self._streams.discard(connection)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_in_thread, request, client_address)
+
+    def _process_in_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self):
+        """End the open event streams, then wait for the requests already accepted to finish"""
+        with self._lock:
+            streams = list(self._streams)
+        for connection in streams:
+            try:
+                # The stream's next write (a heartbeat at the latest) fails and ends it
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.pool.shutdown(wait=True)
+
+
+class PreforkServer:
+    """Master/worker process manager.
+
+    SIGTERM / SIGINT stop gracefully (workers finish in-flight requests).
+    SIGHUP reloads gracefully: a new generation of workers is forked from the
+    preloaded master, then the old generation is drained and retired.
+    SIGTTIN / SIGTTOU add or remove one worker. Dead workers are respawned.
+    """
+
+    def __init__(self, app, host='0.0.0.0', port=5000, workers=None, threads=1,
+                 backlog=2048, graceful_timeout=30, access_log=False, log=None):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = max(threads, 1)
+        self.backlog = backlog
+        self.graceful_timeout = graceful_timeout
+        self.handler = _LoggingRequestHandler if access_log else _RequestHandler
+        self.log = log or (lambda message: print(message, file=sys.stderr, flush=True))
+        self.socket = None
+        self._children = {}  # pid -> generation
+        self._retiring = {}  # pid -> SIGKILL deadline
+        self._generation = 0
+        self._signals = []
+
+    # Master ---------------------------------------------------------------
+
+    def _listen(self):
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.create_server((self.host, self.port), family=family, backlog=self.backlog)
+        # Non-blocking so a worker that loses the accept() race returns to its loop
+        sock.setblocking(False)
+        return sock
+
+    def run(self):
+        self.socket = self._listen()
+        # Everything allocated so far (app, mappers, caches) moves to the permanent
+        # generation: the collector never touches those pages again, so forked
+        # workers keep sharing them instead of copying on the first GC pass
+        gc.collect()
+        gc.freeze()
+
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, lambda signum, frame: self._signals.append(signum))
+
+        self.log(f'master {os.getpid()} listening on {self.host}:{self.port} '
+                 f'with {self.workers} workers x {self.threads} request threads (plus one per event stream)')
+        self._spawn_generation()
+        try:
+            self._loop()
+        finally:
+            self.socket.close()
+
+    def _loop(self):
+        stopping = False
+        while True:
+            while self._signals:
+                signum = self._signals.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT) and not stopping:
+                    self.log('graceful stop requested')
+                    stopping = True
+                    self._retire(list(self._children))
+                elif signum == signal.SIGHUP and not stopping:
+                    self.log('graceful reload: starting a new worker generation')
+                    old = list(self._children)
+                    self._spawn_generation()
+                    self._retire(old)
+                elif signum == signal.SIGTTIN:
+                    self.workers += 1
+                elif signum == signal.SIGTTOU and self.workers > 1:
+                    self.workers -= 1
+
+            self._reap()
+            if not stopping:
+                # Top the current generation back up (respawns dead workers, applies TTIN/TTOU)
+                current = [pid for pid, gen in self._children.items() if gen == self._generation
+                           and pid not in self._retiring]
+                for _ in range(self.workers - len(current)):
+                    self._spawn(self._generation)
+                if len(current) > self.workers:
+                    self._retire(current[self.workers:])
+
+            now = time.monotonic()
+            for pid, deadline in list(self._retiring.items()):
+                if now > deadline:
+                    self.log(f'worker {pid} did not stop within {self.graceful_timeout}s, killing')
+                    self._kill(pid, signal.SIGKILL)
+                    self._retiring[pid] = float('inf')
+
+            if stopping and not self._children:
+                self.log('all workers stopped')
+                return
+            time.sleep(0.1)
+
+    def _spawn_generation(self):
+        self._generation += 1
+        for _ in range(self.workers):
+            self._spawn(self._generation)
+
+    def _spawn(self, generation):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self._work()
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+        self._children[pid] = generation
+
+    def _retire(self, pids):
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            if pid in self._children and pid not in self._retiring:
+                self._retiring[pid] = deadline
+                self._kill(pid, signal.SIGTERM)
+
+    def _kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self._children.pop(pid, None)
+            expected = self._retiring.pop(pid, None) is not None
+            if not expected and generation is not None:
+                self.log(f'worker {pid} exited unexpectedly (status {status})')
+
+    # Worker ---------------------------------------------------------------
+
+    def _work(self):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the master, which drains us
+        for signum in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, signal.SIG_DFL)
+
+        server = PooledWSGIServer(self.host, self.port, self.app, threads=self.threads,
+                                  fd=self.socket.fileno(), handler=self.handler)
+        loop = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.5}, daemon=True)
+        loop.start()
+        while not stop.wait(1):
+            if os.getppid() == 1:  # master died
+                break
+        server.shutdown()
+        server.drain()
+        server.server_close()
+
+
+def rss_kib(pid):
+    """(RSS, PSS) of a process in KiB, from /proc; PSS splits shared pages between sharers"""
+    rss = pss = None
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as handle:
+            for line in handle:
+                if line.startswith('Rss:'):
+                    rss = int(line.split()[1])
+                elif line.startswith('Pss:'):
+                    pss = int(line.split()[1])
+    except OSError:
+        pass
+    return rss, pss
@@ -0,0 +1,145 @@
+"""
+Promotion Engine
+Active promotions compiled into in-memory rules keyed by promo code
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+
+def parse_cities(target_cities):
+    """Normalise a target_cities value (JSON text, list or comma list) to a set of casefolded names"""
+    if not target_cities:
+        return frozenset()
+    if isinstance(target_cities, str):
+        try:
+            target_cities = json.loads(target_cities)
+        except ValueError:
+            target_cities = target_cities.split(',')
+    if isinstance(target_cities, str):
+        target_cities = [target_cities]
+    return frozenset(str(city).strip().casefold() for city in target_cities if str(city).strip())
+
+
+class CompiledPromotion:
+    """Everything needed to validate a promo code, with JSON and dates already parsed"""
+
+    __slots__ = (
+        'id', 'title', 'code', 'promo_type', 'discount_percentage', 'discount_amount',
+        'min_order_amount', 'max_discount', 'start_date', 'end_date', 'is_active',
+        'usage_limit', 'usage_count', 'geo_targeted', 'target_cities'
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+        self.usage_count = self.usage_count or 0
+        self.target_cities = parse_cities(self.target_cities)
+
+    @classmethod
+    def from_model(cls, promotion):
+        return cls(
+            id=promotion.id,
+            title=promotion.title,
+            code=promotion.promo_code,
+            promo_type=promotion.promo_type,
+            discount_percentage=promotion.discount_percentage,
+            discount_amount=promotion.discount_amount,
+            min_order_amount=promotion.min_order_amount,
+            max_discount=promotion.max_discount,
+            start_date=promotion.start_date,
+            end_date=promotion.end_date,
+            is_active=promotion.is_active,
+            usage_limit=promotion.usage_limit,
+            usage_count=promotion.usage_count,
+            geo_targeted=promotion.geo_targeted,
+            target_cities=promotion._target_cities  # raw text: parse_cities reads JSON and comma lists alike
+        )
+
+    def available_in(self, city):
+        return not self.geo_targeted or not city or city.strip().casefold() in self.target_cities
+
+    def validate(self, order_amount, user_location=None, now=None):
+        """Return (discount_amount, None) if the promotion applies, else (None, error message)"""
+        now = now or datetime.now()
+        if not self.is_active:
+            return None, 'Promotion is not active'
+        if now < self.start_date or now > self.end_date:
+            return None, 'Promotion has expired'
+        if self.usage_limit and self.usage_count >= self.usage_limit:
+            return None, 'Promotion usage limit reached'
+        if self.min_order_amount and order_amount < self.min_order_amount:
+            return None, f'Minimum order amount of ₹{self.min_order_amount} required'
+        if not self.available_in(user_location):
+            return None, 'Promotion not available in your location'
+
+        discount_amount = 0
+        if self.discount_percentage:
+            discount_amount = (order_amount * self.discount_percentage) / 100
+            if self.max_discount:
+                discount_amount = min(discount_amount, self.max_discount)
+        elif self.discount_amount:
+            discount_amount = self.discount_amount
+        return discount_amount, None
+
+
+class PromotionEngine:
+    """Code -> CompiledPromotion lookup, reloaded wholesale or one promotion at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_code = {}
+        self._code_by_id = {}
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._by_code)
+
+    def load(self, promotions):
+        """Replace all rules; readers keep using the old dict until the swap.
+
+        A promotion that does not compile is logged and left out, so one bad
+        row cannot stop every other code from validating.
+        """
+        by_code = {}
+        code_by_id = {}
+        for promotion in promotions:
+            try:
+                compiled = self._compile(promotion)
+            except Exception:
+                log.exception('skipping promotion %s that does not compile', getattr(promotion, 'id', None))
+                continue
+            if compiled.code:
+                by_code[compiled.code] = compiled
+                code_by_id[compiled.id] = compiled.code
+        with self._lock:
+            self._by_code = by_code
+            self._code_by_id = code_by_id
+            self.loaded = True
+
+    @staticmethod
+    def _compile(promotion):
+        return promotion if isinstance(promotion, CompiledPromotion) else CompiledPromotion.from_model(promotion)
+
+    def upsert(self, promotion):
+        compiled = self._compile(promotion)
+        with self._lock:
+            old_code = self._code_by_id.pop(compiled.id, None)
+            if old_code is not None:
+                self._by_code.pop(old_code, None)
+            if compiled.code and compiled.is_active:
+                self._by_code[compiled.code] = compiled
+                self._code_by_id[compiled.id] = compiled.code
+
+    def record_use(self, promotion_id, usage_count):
+        with self._lock:
+            code = self._code_by_id.get(promotion_id)
+            if code is not None:
+                self._by_code[code].usage_count = usage_count
+
+    def get(self, code):
+        return self._by_code.get(code)
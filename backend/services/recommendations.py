@@ -0,0 +1,210 @@
+"""
+Recommendations
+Item-to-item co-occurrence counted from order history in one streaming pass,
+time-decayed popularity written to Coffee.popularity_score, and a precomputed
+top-k "customers also ordered" list per item served by primary-key range reads
+"""
+
+import heapq
+import math
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import chain, combinations, repeat
+from operator import itemgetter
+
+from ..models.coffee import db, Coffee, CoffeeRecommendation, Order, OrderItem, User, UserFavorite
+
+TOP_K = 20  # neighbours stored per item
+DEFAULT_LIMIT = 10
+HALF_LIFE_DAYS = 30.0  # an order this old counts half towards popularity
+WINDOW_DAYS = 365  # history scanned; an order 12 half-lives old contributes 0.02%
+MIN_CO_ORDERS = 2  # pairs seen together fewer times are noise
+EXCLUDED_STATUSES = ('cancelled',)
+RECENT_ORDERS = 5  # a user's latest orders seed their recommendations
+MAX_SEEDS = 20
+FAVORITE_WEIGHT = 2.0
+ORDERED_WEIGHT = 1.0
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+# One row per order: its distinct items as one comma-separated string and the
+# order's Julian day. SQLite groups while walking ix_order_items_order, so the
+# job handles one row per order rather than one per line, already de-duplicated
+ORDER_BASKETS = (
+    db.select(
+        OrderItem.order_id,
+        db.func.group_concat(db.distinct(OrderItem.coffee_id)),
+        db.func.max(db.func.julianday(Order.created_at)),
+    )
+    .join(Order, Order.id == OrderItem.order_id)
+    .group_by(OrderItem.order_id)
+)
+
+
+def julian_day(moment):
+    return (moment - datetime(1970, 1, 1)).total_seconds() / 86400 + UNIX_EPOCH_JULIAN_DAY
+
+
+class CoOccurrence:
+    """Sparse item x item order counts, accumulated a batch of baskets at a time.
+
+    Counting runs in Counter.update's C loop: each basket's sorted item pairs
+    are fed as tuples, so the matrix holds only pairs that were ordered
+    together (upper triangle, a < b) and memory is bounded by the menu, not
+    by order history.
+    """
+
+    def __init__(self):
+        self.pairs = Counter()  # (a, b), a < b -> orders containing both
+        self.items = Counter()  # item -> orders containing it
+        self.daily = Counter()  # (item, day number) -> orders, for the decayed popularity
+        self.orders = 0
+
+    def add(self, rows):
+        """Count a batch of ORDER_BASKETS rows"""
+        baskets = [sorted(items.split(',')) for _, items, _ in rows]
+        days = [int(day) for _, _, day in rows]
+        self.items.update(chain.from_iterable(baskets))
+        self.pairs.update(chain.from_iterable(map(combinations, baskets, repeat(2))))
+        self.daily.update(chain.from_iterable(map(zip, baskets, map(repeat, days))))
+        self.orders += len(rows)
+
+    def popularity(self, today):
+        """Orders per item, each weighted 0.5 ** (age in days / HALF_LIFE_DAYS)"""
+        scores = Counter()
+        for (item, day), count in self.daily.items():
+            scores[item] += count * 0.5 ** (max(today - day, 0) / HALF_LIFE_DAYS)
+        return scores
+
+    def top_k(self, k=TOP_K, min_co_orders=MIN_CO_ORDERS):
+        """item -> up to k (score, co_orders, neighbour), strongest first.
+
+        The score is the cosine similarity of the two items' order sets,
+        co / sqrt(orders(a) * orders(b)), so a best-seller that lands in every
+        basket does not top every list.
+        """
+        neighbours = {}
+        for (a, b), count in self.pairs.items():
+            if count < min_co_orders:
+                continue
+            score = count / math.sqrt(self.items[a] * self.items[b])
+            neighbours.setdefault(a, []).append((score, count, b))
+            neighbours.setdefault(b, []).append((score, count, a))
+        return {item: heapq.nlargest(k, candidates) for item, candidates in neighbours.items()}
+
+
+def rebuild(session, k=TOP_K, window_days=WINDOW_DAYS, min_co_orders=MIN_CO_ORDERS,
+            batch_size=50000, progress=None):
+    """Recount co-occurrence over the window, rewrite popularity scores and every top-k list.
+
+    One streaming scan of the order lines; the old lists are replaced in the
+    same transaction, so readers see either yesterday's lists or today's.
+    Returns (orders scanned, item pairs, recommendation rows written).
+    """
+    now = datetime.utcnow()
+    statement = ORDER_BASKETS.where(Order.status.notin_(EXCLUDED_STATUSES))
+    if window_days:
+        statement = statement.where(Order.created_at >= now - timedelta(days=window_days))
+
+    matrix = CoOccurrence()
+    result = session.execute(statement.execution_options(yield_per=batch_size))
+    for batch in result.partitions():
+        matrix.add(batch)
+        if progress:
+            progress(matrix.orders)
+
+    # Scores only change popularity_score; updated_at is kept as the item's own edit time
+    scores = matrix.popularity(int(julian_day(now)))
+    coffees = Coffee.__table__
+    update = (
+        db.update(coffees)
+        .where(coffees.c.id == db.bindparam('coffee_id'))
+        .values(popularity_score=db.bindparam('score'), updated_at=coffees.c.updated_at)
+    )
+    session.execute(update, [
+        {'coffee_id': coffee_id, 'score': round(scores.get(coffee_id, 0.0), 4)}
+        for coffee_id in session.execute(db.select(Coffee.id)).scalars()
+    ])
+
+    session.execute(db.delete(CoffeeRecommendation))
+    rows = [
+        {'coffee_id': item, 'rank': rank, 'recommended_id': neighbour, 'score': score,
+         'co_orders': count, 'computed_at': now}
+        for item, neighbours in matrix.top_k(k, min_co_orders).items()
+        for rank, (score, count, neighbour) in enumerate(neighbours, 1)
+    ]
+    for start in range(0, len(rows), batch_size):
+        session.execute(db.insert(CoffeeRecommendation), rows[start:start + batch_size])
+    session.commit()
+    return matrix.orders, len(matrix.pairs), len(rows)
+
+
+def for_item(session, coffee_id, limit=DEFAULT_LIMIT):
+    """Up to `limit` (recommendation, coffee) pairs for an item, strongest first; one index range read"""
+    return session.execute(
+        db.select(CoffeeRecommendation, Coffee)
+        .join(Coffee, Coffee.id == CoffeeRecommendation.recommended_id)
+        .where(CoffeeRecommendation.coffee_id == coffee_id, Coffee.available == True)
+        .order_by(CoffeeRecommendation.rank)
+        .limit(limit)
+    ).all()
+
+
+def seeds(session, user_id):
+    """Items the user has shown interest in -> weight: favourites and their latest orders' items"""
+    interest = {}
+    recent = (
+        db.select(Order.id)
+        .where(Order.customer_id == user_id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(RECENT_ORDERS)
+    )
+    for coffee_id in session.execute(db.select(OrderItem.coffee_id).where(OrderItem.order_id.in_(recent))).scalars():
+        interest[coffee_id] = ORDERED_WEIGHT
+    favorites = session.execute(db.select(UserFavorite.coffee_id).where(UserFavorite.user_id == user_id)).scalars().all()
+    user = session.get(User, user_id)
+    listed = user.favorite_items if user is not None and isinstance(user.favorite_items, list) else []
+    for coffee_id in chain(favorites, (item for item in listed if isinstance(item, str))):
+        interest[coffee_id] = interest.get(coffee_id, 0.0) + FAVORITE_WEIGHT
+    return dict(heapq.nlargest(MAX_SEEDS, interest.items(), key=itemgetter(1)))
+
+
+def for_user(session, user_id, limit=DEFAULT_LIMIT):
+    """Up to `limit` (coffee, score, reason) for a user, strongest first.
+
+    The precomputed lists of at most MAX_SEEDS seed items are merged (one
+    range read over at most MAX_SEEDS x TOP_K rows), items the user already
+    favours or just ordered are left out, and the rest is filled from the
+    most popular items.
+    """
+    interest = seeds(session, user_id)
+    scores = {}
+    if interest:
+        rows = session.execute(
+            db.select(CoffeeRecommendation.coffee_id, CoffeeRecommendation.recommended_id, CoffeeRecommendation.score)
+            .where(CoffeeRecommendation.coffee_id.in_(list(interest)))
+        ).all()
+        for seed, recommended, score in rows:
+            if recommended not in interest:
+                scores[recommended] = scores.get(recommended, 0.0) + score * interest[seed]
+
+    picked = []
+    if scores:
+        ranked = heapq.nlargest(limit + len(interest), scores.items(), key=itemgetter(1))
+        coffees = {
+            coffee.id: coffee
+            for coffee in session.execute(
+                db.select(Coffee).where(Coffee.id.in_([item for item, _ in ranked]), Coffee.available == True)
+            ).scalars()
+        }
+        picked = [(coffees[item], score, 'also_ordered') for item, score in ranked if item in coffees][:limit]
+
+    if len(picked) < limit:
+        exclude = set(interest) | {coffee.id for coffee, _, _ in picked}
+        popular = session.execute(
+            db.select(Coffee)
+            .where(Coffee.available == True, Coffee.id.notin_(exclude))
+            .order_by(Coffee.popularity_score.desc())
+            .limit(limit - len(picked))
+        ).scalars()
+        picked += [(coffee, coffee.popularity_score or 0.0, 'popular') for coffee in popular]
+    return picked
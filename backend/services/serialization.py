@@ -0,0 +1,121 @@
+"""
+Serialization
+Compiled per-model field extractors, Core-row serialization and pre-encoded
+JSON responses
+"""
+
+import json
+
+from flask import Response
+from sqlalchemy import Date, DateTime, Time, inspect
+
+from ..models.coffee import db, Event, EventBooking, LoyaltyTransaction, Promotion, StockUpdate
+from ..models.json_column import JSONColumn, decode
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used when orjson is not installed
+    orjson = None
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps(payload):
+    """Encode a payload to JSON bytes with the fastest encoder available"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return _encoder.encode(payload).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+class ModelSerializer:
+    """Serializes one model to the same dicts as its to_dict(), from ORM objects or Core rows.
+
+    The extractors are generated once as straight-line functions, so each row
+    costs one dict literal: no per-field loops, getattr calls or type checks.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+        mapper = inspect(model)
+
+        columns = []
+        kinds = []
+        for name in self.fields:
+            descriptor = next((klass.__dict__[name] for klass in model.__mro__ if name in klass.__dict__), None)
+            if isinstance(descriptor, JSONColumn):
+                columns.append(getattr(model, descriptor.raw_attr))
+                kinds.append('json')
+                continue
+            column_type = mapper.columns[name].type
+            columns.append(getattr(model, name))
+            kinds.append('iso' if isinstance(column_type, (DateTime, Date, Time)) else 'plain')
+        self.columns = tuple(columns)
+
+        self.from_object = self._compile('obj', [f'obj.{name}' for name in self.fields], kinds, orm=True)
+        self.from_row = self._compile('row', [f'v{i}' for i in range(len(self.fields))], kinds, orm=False)
+
+    def _compile(self, arg, values, kinds, orm):
+        lines = [f'def extract({arg}):']
+        if not orm:
+            lines.append(f"    {', '.join(values)}, = row")
+        items = []
+        for i, (name, value, kind) in enumerate(zip(self.fields, values, kinds)):
+            if kind == 'iso':
+                if orm:
+                    lines.append(f'    t{i} = {value}')
+                    value = f't{i}'
+                value = f'{value} and {value}.isoformat()'
+            elif kind == 'json' and not orm:
+                value = f'_decode({value})'
+            items.append(f'{name!r}: {value}')
+        lines.append('    return {' + ', '.join(items) + '}')
+        namespace = {'_decode': decode}
+        exec('\n'.join(lines), namespace)
+        return namespace['extract']
+
+    def select(self):
+        """A Core select of exactly the serialized columns, in extractor order"""
+        return db.select(*self.columns)
+
+    def rows(self, result):
+        """Serialize Core result rows without hydrating ORM objects"""
+        return list(map(self.from_row, result))
+
+    def objects(self, objects):
+        return list(map(self.from_object, objects))
+
+
+class StaticPayload:
+    """A response body encoded once and served as bytes on every request"""
+
+    def __init__(self, payload, status=200):
+        self.body = dumps(payload)
+        self.status = status
+
+    def response(self):
+        return Response(self.body, status=self.status, mimetype='application/json')
+
+
+event_serializer = ModelSerializer(Event, (
+    'id', 'cafe_id', 'title', 'description', 'event_type', 'start_time', 'end_time',
+    'max_capacity', 'current_bookings', 'price', 'image_url', 'is_active', 'created_at'
+))
+event_booking_serializer = ModelSerializer(EventBooking, (
+    'id', 'event_id', 'user_id', 'tickets', 'total_cost', 'status', 'created_at'
+))
+loyalty_transaction_serializer = ModelSerializer(LoyaltyTransaction, (
+    'id', 'user_id', 'transaction_type', 'points', 'description', 'order_id', 'created_at'
+))
+promotion_serializer = ModelSerializer(Promotion, (
+    'id', 'title', 'description', 'promo_type', 'discount_percentage', 'discount_amount', 'min_order_amount',
+    'max_discount', 'promo_code', 'start_date', 'end_date', 'is_active', 'usage_limit', 'usage_count',
+    'geo_targeted', 'target_cities', 'created_at'
+))
+stock_update_serializer = ModelSerializer(StockUpdate, (
+    'id', 'coffee_id', 'cafe_id', 'quantity_change', 'new_stock_level', 'reason', 'updated_by', 'created_at'
+))
@@ -0,0 +1,148 @@
+"""
+Spatial Index
+Uniform lat/lng grid for radius and k-nearest café searches
+"""
+
+import heapq
+import math
+import threading
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """Return (min_lat, max_lat, min_lng, max_lng) enclosing a circle of radius_km"""
+    dlat = radius_km / KM_PER_DEGREE
+    cos_lat = max(math.cos(math.radians(min(89.9, abs(lat) + dlat))), 1e-6)
+    dlng = min(180.0, radius_km / (KM_PER_DEGREE * cos_lat))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+class GridIndex:
+    """Points bucketed into cells of cell_deg x cell_deg degrees"""
+
+    def __init__(self, cell_deg=0.1):
+        self.cell_deg = cell_deg
+        self._lock = threading.RLock()
+        self._points = {}  # id -> (lat, lng)
+        self._cells = {}   # (row, col) -> {id: (lat, lng)}
+        self._extent = None  # (min_row, max_row, min_col, max_col); only ever grows
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, lat, lng):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    def insert(self, key, lat, lng):
+        with self._lock:
+            self.remove(key)
+            self._points[key] = (lat, lng)
+            row, col = self._cell(lat, lng)
+            self._cells.setdefault((row, col), {})[key] = (lat, lng)
+            if self._extent is None:
+                self._extent = (row, row, col, col)
+            else:
+                min_row, max_row, min_col, max_col = self._extent
+                self._extent = (min(min_row, row), max(max_row, row), min(min_col, col), max(max_col, col))
+
+    def remove(self, key):
+        with self._lock:
+            point = self._points.pop(key, None)
+            if point is not None:
+                cell = self._cell(*point)
+                bucket = self._cells[cell]
+                del bucket[key]
+                if not bucket:
+                    del self._cells[cell]
+
+    def clear(self):
+        with self._lock:
+            self._points.clear()
+            self._cells.clear()
+            self._extent = None
+
+    def within(self, lat, lng, radius_km):
+        """Return [(distance_km, id)] for every point within radius_km, nearest first"""
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        row_lo, col_lo = self._cell(min_lat, min_lng)
+        row_hi, col_hi = self._cell(max_lat, max_lng)
+        results = []
+        with self._lock:
+            span = (row_hi - row_lo + 1) * (col_hi - col_lo + 1)
+            if span <= len(self._cells):
+                cells = (self._cells.get((r, c)) for r in range(row_lo, row_hi + 1) for c in range(col_lo, col_hi + 1))
+            else:
+                # Huge radius: cheaper to walk the populated cells directly
+                cells = (b for (r, c), b in self._cells.items() if row_lo <= r <= row_hi and col_lo <= c <= col_hi)
+            for bucket in cells:
+                if not bucket:
+                    continue
+                for key, (plat, plng) in bucket.items():
+                    if min_lat <= plat <= max_lat and min_lng <= plng <= max_lng:
+                        distance = haversine_km(lat, lng, plat, plng)
+                        if distance <= radius_km:
+                            results.append((distance, key))
+        results.sort()
+        return results
+
+    def nearest(self, lat, lng, k, radius_km=None):
+        """Return up to k [(distance_km, id)] nearest to (lat, lng), optionally capped by radius_km.
+
+        Searches square rings of cells outwards from the query cell and stops as
+        soon as no unvisited cell can hold anything closer than the current k-th hit.
+        """
+        if k <= 0:
+            return []
+        row0, col0 = self._cell(lat, lng)
+        heap = []  # max-heap on distance via negation
+        with self._lock:
+            if not self._cells:
+                return []
+            min_row, max_row, min_col, max_col = self._extent
+            max_ring = max(abs(row0 - min_row), abs(max_row - row0),
+                           abs(col0 - min_col), abs(max_col - col0))
+            for ring in range(max_ring + 1):
+                for r, c in self._ring_cells(row0, col0, ring):
+                    bucket = self._cells.get((r, c))
+                    if not bucket:
+                        continue
+                    for key, (plat, plng) in bucket.items():
+                        distance = haversine_km(lat, lng, plat, plng)
+                        if radius_km is not None and distance > radius_km:
+                            continue
+                        if len(heap) < k:
+                            heapq.heappush(heap, (-distance, key))
+                        elif distance < -heap[0][0]:
+                            heapq.heapreplace(heap, (-distance, key))
+                # Anything in ring + 1 is at least `ring` full cells away
+                cos_lat = max(math.cos(math.radians(min(89.9, abs(lat) + (ring + 2) * self.cell_deg))), 1e-6)
+                lower_bound = 0.99 * ring * self.cell_deg * KM_PER_DEGREE * cos_lat
+                if radius_km is not None and lower_bound > radius_km:
+                    break
+                if len(heap) == k and lower_bound > -heap[0][0]:
+                    break
+        return sorted((-d, key) for d, key in heap)
+
+    @staticmethod
+    def _ring_cells(row0, col0, ring):
+        if ring == 0:
+            yield row0, col0
+            return
+        for c in range(col0 - ring, col0 + ring + 1):
+            yield row0 - ring, c
+            yield row0 + ring, c
+        for r in range(row0 - ring + 1, row0 + ring):
+            yield r, col0 - ring
+            yield r, col0 + ring
@@ -0,0 +1,82 @@
+"""
+SQLite Profiles
+Per-connection PRAGMAs and pool settings selected by a config switch
+('default' keeps SQLite's stock behaviour, 'production' tunes for concurrent workers)
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+PROFILES = {
+    'default': {
+        'pragmas': {},
+        'pool': {},
+    },
+    'production': {
+        # Applied in order on every new DBAPI connection
+        'pragmas': {
+            'journal_mode': 'WAL',          # readers never block the writer
+            'synchronous': 'NORMAL',        # fsync at checkpoints, not every commit (safe with WAL)
+            'busy_timeout': 10000,          # ms to wait on a locked database before failing
+            'cache_size': -65536,           # 64 MiB page cache per connection
+            'mmap_size': 268435456,         # 256 MiB memory-mapped reads
+            'temp_store': 'MEMORY',
+        },
+        'pool': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 30,
+            'pool_recycle': 3600,
+        },
+    },
+}
+
+
+def _profile(name):
+    try:
+        return PROFILES[name or 'default']
+    except KeyError:
+        raise ValueError(f"Unknown database profile '{name}' (expected one of: {', '.join(PROFILES)})")
+
+
+def engine_options(name, database_uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for a profile; pool settings only apply to file databases"""
+    profile = _profile(name)
+    url = make_url(database_uri)
+    if url.get_backend_name() != 'sqlite' or not profile['pool']:
+        return {}
+    options = {'connect_args': {'check_same_thread': False}}
+    if url.database and url.database != ':memory:':
+        options.update(profile['pool'])
+    return options
+
+
+def apply_profile(engine, name):
+    """Run the profile's PRAGMAs on every connection the engine opens"""
+    pragmas = _profile(name)['pragmas']
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f'PRAGMA {pragma}={value}')
+        finally:
+            cursor.close()
+
+
+def configure_database(app, db):
+    """Initialise `db` for `app` using the profile named by app.config['DATABASE_PROFILE']"""
+    name = app.config.get('DATABASE_PROFILE', 'default')
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    tuned = engine_options(name, app.config['SQLALCHEMY_DATABASE_URI'])
+    connect_args = {**tuned.pop('connect_args', {}), **options.get('connect_args', {})}
+    options.update(tuned)
+    if connect_args:
+        options['connect_args'] = connect_args
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    db.init_app(app)
+    with app.app_context():
+        apply_profile(db.engine, name)
@@ -0,0 +1,120 @@
+"""
+Startup Profiling
+Per-module import timing and named init phases, reported by `python main.py --profile-startup`
+(phases are free no-ops unless a profile is active)
+"""
+
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+_active = None
+
+
+class _TimedLoader:
+    """Wraps a module loader so exec_module is timed (self and inclusive time)"""
+
+    def __init__(self, loader, profile):
+        self._loader = loader
+        self._profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = self._profile._stack
+        depth = len(stack)
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            self._profile.imports.append((module.__name__, total - children, total, depth))
+
+
+class _TimingFinder:
+    """Meta path finder that defers to the real finders and times what they load"""
+
+    def __init__(self, profile):
+        self._profile = profile
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, self._profile)
+                return spec
+        return None
+
+
+class StartupProfile:
+    """Collects import times and init phases for one process start"""
+
+    def __init__(self):
+        self.imports = []  # (module, self seconds, inclusive seconds, nesting depth)
+        self.phases = []   # (name, seconds, nesting depth)
+        self._stack = []
+        self._depth = 0
+        self._finder = _TimingFinder(self)
+        self._started = None
+
+    def start(self):
+        global _active
+        _active = self
+        self._started = time.perf_counter()
+        sys.meta_path.insert(0, self._finder)
+        return self
+
+    def stop(self):
+        global _active
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        _active = None
+        return time.perf_counter() - self._started
+
+    @contextmanager
+    def phase(self, name):
+        index = len(self.phases)
+        self.phases.append((name, 0.0, self._depth))
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.phases[index] = (name, time.perf_counter() - start, self._depth)
+
+    def report(self, total, file=None, top=15):
+        file = file or sys.stdout
+        print(f'Startup: {total * 1000:.1f} ms total', file=file)
+
+        print('\nPhases', file=file)
+        for name, seconds, depth in self.phases:
+            print(f'   {seconds * 1000:>8.1f} ms  {"  " * depth}{name}', file=file)
+
+        own = [entry for entry in self.imports if entry[0].split('.')[0] == 'backend']
+        print('\nApplication modules (self / inclusive)', file=file)
+        for name, self_time, inclusive, depth in sorted(own, key=lambda entry: -entry[2]):
+            print(f'   {self_time * 1000:>8.1f} / {inclusive * 1000:>8.1f} ms  {name}', file=file)
+
+        print(f'\nSlowest {top} imports by self time', file=file)
+        for name, self_time, inclusive, depth in sorted(self.imports, key=lambda entry: -entry[1])[:top]:
+            print(f'   {self_time * 1000:>8.1f} / {inclusive * 1000:>8.1f} ms  {name}', file=file)
+        print(f'\n{len(self.imports)} modules imported', file=file)
+
+
+def phase(name):
+    """Context manager timing `name` under the active profile; does nothing otherwise"""
+    if _active is None:
+        return nullcontext()
+    return _active.phase(name)
@@ -0,0 +1,187 @@
+"""
+Sustainability Rollups
+Incrementally maintained impact counters per café and day, applied in the same
+transaction as the order status change, plus a streaming rebuild from history
+"""
+
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+
+from ..models.coffee import db, Coffee, Order, OrderItem, SustainabilityAggregate
+from .counters import increment
+
+ALL_CAFES = '*'
+LIFETIME = 'all'
+COMPLETED = 'completed'
+
+COUNTERS = (
+    'orders', 'organic_orders', 'fair_trade_orders', 'items', 'organic_items',
+    'fair_trade_items', 'eco_items', 'carbon_footprint', 'rating_sum', 'rated_items',
+)
+
+# One row per order line (an order without lines still yields one row of NULLs,
+# so it is counted as an order); the order's lines are adjacent when ordered by id
+LINES = (
+    db.select(
+        Order.id, Order.cafe_id, Order.created_at,
+        OrderItem.quantity, Coffee.organic, Coffee.fair_trade,
+        Coffee.carbon_footprint, Coffee.sustainability_rating,
+    )
+    .select_from(Order)
+    .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+    .outerjoin(Coffee, Coffee.id == OrderItem.coffee_id)
+)
+
+
+def empty_counters():
+    return dict.fromkeys(COUNTERS, 0)
+
+
+def order_counters(lines):
+    """Counters contributed by one order, from its LINES rows"""
+    counters = empty_counters()
+    counters['orders'] = 1
+    for _, _, _, quantity, organic, fair_trade, carbon, rating in lines:
+        if quantity is None:
+            continue
+        counters['items'] += quantity
+        if organic:
+            counters['organic_items'] += quantity
+        if fair_trade:
+            counters['fair_trade_items'] += quantity
+        if organic or fair_trade:
+            counters['eco_items'] += quantity
+        if carbon is not None:
+            counters['carbon_footprint'] += carbon * quantity
+        if rating is not None:
+            counters['rating_sum'] += rating * quantity
+            counters['rated_items'] += quantity
+    counters['organic_orders'] = int(counters['organic_items'] > 0)
+    counters['fair_trade_orders'] = int(counters['fair_trade_items'] > 0)
+    return counters
+
+
+def rollup_keys(cafe_id, created_at):
+    """(cafe_id, period) rows an order counts towards: its café and all cafés, by day and lifetime.
+
+    Orders are bucketed by the day they were placed, so reverting a completion
+    always lands on the rows the completion was added to.
+    """
+    day = (created_at or datetime.utcnow()).date().isoformat()
+    keys = [(ALL_CAFES, day), (ALL_CAFES, LIFETIME)]
+    if cafe_id:
+        keys += [(cafe_id, day), (cafe_id, LIFETIME)]
+    return keys
+
+
+def record_order_completion(session, order, sign=1):
+    """Add (sign=1) or remove (sign=-1) a completed order's contribution.
+
+    Call inside the transaction that changes the order's status so the
+    counters commit or roll back with it. One query reads the order's lines,
+    one executemany upsert bumps its four rollup rows. Returns the order's
+    counters (unsigned) for callers that award per-order extras.
+    """
+    return record_completions(session, [(order, sign)])[order.id]
+
+
+def record_completions(session, changes):
+    """record_order_completion for a batch of (order, sign) pairs.
+
+    One query reads every order's lines and one executemany upsert applies
+    the summed deltas, so a batch costs two statements however many orders
+    it holds. Returns {order id: counters (unsigned)}.
+    """
+    signs = {order.id: sign for order, sign in changes if sign}
+    if not signs:
+        return {}
+    lines = session.execute(LINES.where(Order.id.in_(list(signs))).order_by(Order.id)).all()
+    totals = {}
+    result = {}
+    for order_id, order_lines in groupby(lines, key=itemgetter(0)):
+        order_lines = list(order_lines)
+        counters = result[order_id] = order_counters(order_lines)
+        _, cafe_id, created_at = order_lines[0][:3]
+        for key in rollup_keys(cafe_id, created_at):
+            bucket = totals.setdefault(key, empty_counters())
+            for name, value in counters.items():
+                bucket[name] += value * signs[order_id]
+    now = datetime.utcnow()
+    increment(session, SustainabilityAggregate, ('cafe_id', 'period'), COUNTERS, [
+        {'cafe_id': cafe_id, 'period': period, 'updated_at': now, **counters}
+        for (cafe_id, period), counters in totals.items()
+    ])
+    return result
+
+
+def completion_changed(old_status, new_status):
+    """+1 when an order becomes completed, -1 when it stops being completed, else 0"""
+    return (new_status == COMPLETED) - (old_status == COMPLETED)
+
+
+def impact(session, cafe_id=ALL_CAFES, period=LIFETIME):
+    """One primary-key read; an unseen (café, period) reads as all zeros"""
+    row = session.get(SustainabilityAggregate, (cafe_id, period))
+    return row or SustainabilityAggregate(cafe_id=cafe_id, period=period, **empty_counters())
+
+
+def daily(session, cafe_id, start, end):
+    """Per-day rows for one café (or ALL_CAFES) between two ISO dates, inclusive"""
+    return session.execute(
+        db.select(SustainabilityAggregate)
+        .where(SustainabilityAggregate.cafe_id == cafe_id,
+               SustainabilityAggregate.period.between(start, end),
+               SustainabilityAggregate.period != LIFETIME)
+        .order_by(SustainabilityAggregate.period)
+    ).scalars().all()
+
+
+def rebuild(session, batch_size=10000, progress=None):
+    """Recompute every rollup from the completed orders, streaming `batch_size` lines at a time.
+
+    Memory is bounded by the number of (café, day) rows, not by order history.
+    The old rows are replaced in the same transaction; completions committed
+    while the scan runs are not included, so run it with order writes paused.
+    Returns (orders scanned, rollup rows written).
+    """
+    totals = {}
+    orders = 0
+
+    def add(lines):
+        counters = order_counters(lines)
+        _, cafe_id, created_at = lines[0][:3]
+        for key in rollup_keys(cafe_id, created_at):
+            row = totals.get(key)
+            if row is None:
+                row = totals[key] = empty_counters()
+            for name, value in counters.items():
+                row[name] += value
+
+    result = session.execute(
+        LINES.where(Order.status == COMPLETED).order_by(Order.id).execution_options(yield_per=batch_size)
+    )
+    current = []
+    for batch in result.partitions():
+        for line in batch:
+            if current and line[0] != current[0][0]:
+                add(current)
+                orders += 1
+                current = []
+            current.append(line)
+        if progress:
+            progress(orders)
+    if current:
+        add(current)
+        orders += 1
+
+    now = datetime.utcnow()
+    session.execute(db.delete(SustainabilityAggregate))
+    rows = [
+        {'cafe_id': cafe_id, 'period': period, 'updated_at': now, **counters}
+        for (cafe_id, period), counters in totals.items()
+    ]
+    for start in range(0, len(rows), batch_size):
+        session.execute(db.insert(SustainabilityAggregate), rows[start:start + batch_size])
+    session.commit()
+    return orders, len(rows)
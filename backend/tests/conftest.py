@@ -0,0 +1,30 @@
+"""
+Test Fixtures
+A Flask app with every blueprint on a fresh SQLite database per test, and
+the routes' in-process caches reset so no test sees another's data
+"""
+
+import pytest
+
+from backend.migrations.check_query_plans import create_app
+from backend.models.coffee import db
+from backend.routes import promotions
+from backend.services.cache_sync import Resync
+from backend.services.promotion_engine import PromotionEngine
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = create_app(str(tmp_path / 'test.db'))
+    monkeypatch.setattr(promotions, 'promotion_engine', PromotionEngine())
+    monkeypatch.setattr(promotions, '_promotion_sync', Resync(max_age=promotions.RESYNC_SECONDS))
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
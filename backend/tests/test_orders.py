@@ -0,0 +1,64 @@
+"""
+Order Tests
+Orders are created, read, listed and moved between statuses through the
+database, with stock decremented only when every item can be served
+"""
+
+import pytest
+
+from backend.models.coffee import db, Cafe, Coffee, User
+
+
+@pytest.fixture
+def menu(app):
+    cafe = Cafe(name='CCD Test', address='1 Main St', city='Mumbai', state='MH', pincode='400001',
+                latitude=19.07, longitude=72.87)
+    db.session.add(cafe)
+    db.session.add(User(id='u1', username='u1', email='u1@example.com', full_name='User'))
+    db.session.add_all([
+        Coffee(id='c1', name='Espresso', price=3.5, category='coffee', stock_quantity=5, preparation_time=2),
+        Coffee(id='c2', name='Cappuccino', price=4.5, category='coffee', stock_quantity=1, preparation_time=3),
+    ])
+    db.session.commit()
+    return cafe.id
+
+
+def place(client, cafe_id, items):
+    return client.post('/api/orders/', json={'customer_id': 'u1', 'cafe_id': cafe_id, 'items': items})
+
+
+def test_order_round_trip(client, menu):
+    response = place(client, menu, [{'coffee_id': 'c1', 'quantity': 2}, {'coffee_id': 'c2', 'quantity': 1}])
+    assert response.status_code == 201
+    order = response.get_json()['data']
+    assert order['total'] == 11.5
+
+    fetched = client.get(f'/api/orders/{order["id"]}').get_json()['data']
+    assert sorted(item['coffee_id'] for item in fetched['items']) == ['c1', 'c2']
+
+    listed = client.get('/api/orders/?customer_id=u1').get_json()
+    assert [row['id'] for row in listed['data']] == [order['id']]
+    assert listed['total'] == 1
+
+    updated = client.put(f'/api/orders/{order["id"]}/status', json={'status': 'confirmed'})
+    assert updated.status_code == 200
+    assert updated.get_json()['data']['status'] == 'confirmed'
+    assert client.get(f'/api/orders/{order["id"]}').get_json()['data']['status'] == 'confirmed'
+    assert client.get('/api/orders/?status=pending').get_json()['total'] == 0
+
+
+def test_unknown_orders_are_not_found(client, menu):
+    assert client.get('/api/orders/1').status_code == 404
+    assert client.put('/api/orders/1/status', json={'status': 'ready'}).status_code == 404
+
+
+def test_invalid_status_rejected(client, menu):
+    order = place(client, menu, [{'coffee_id': 'c1'}]).get_json()['data']
+    assert client.put(f'/api/orders/{order["id"]}/status', json={'status': 'lost'}).status_code == 400
+
+
+def test_insufficient_stock_changes_nothing(client, menu):
+    response = place(client, menu, [{'coffee_id': 'c1', 'quantity': 1}, {'coffee_id': 'c2', 'quantity': 2}])
+    assert response.status_code == 409
+    assert db.session.get(Coffee, 'c1').stock_quantity == 5
+    assert client.get('/api/orders/').get_json()['total'] == 0
@@ -0,0 +1,64 @@
+"""
+Pagination Tests
+Following next_cursor walks every row exactly once in key order, including
+rows that share a timestamp, and foreign cursors are rejected
+"""
+
+from datetime import datetime
+
+from backend.models.coffee import db, StockUpdate
+from backend.services.pagination import paginate_sorted
+
+
+def seed_updates(count):
+    # Half the rows share one timestamp, so the id has to break ties
+    db.session.add_all(
+        StockUpdate(id=f's{n:02d}', coffee_id='c1', quantity_change=1, new_stock_level=n,
+                    created_at=datetime(2024, 1, 1, 9, 0, n if n % 2 else 0))
+        for n in range(count)
+    )
+    db.session.commit()
+
+
+def walk(client, path):
+    ids, cursor = [], None
+    while True:
+        response = client.get(path + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200
+        payload = response.get_json()
+        assert payload['count'] <= 3
+        ids += [row['id'] for row in payload['data']]
+        cursor = payload['next_cursor']
+        if not cursor:
+            return ids
+
+
+def test_cursor_walk_matches_full_ordering(client):
+    seed_updates(11)
+    expected = [row.id for row in db.session.execute(
+        db.select(StockUpdate.id).order_by(StockUpdate.created_at.desc(), StockUpdate.id.desc())
+    )]
+    assert walk(client, '/api/tracking/stock/updates?limit=3') == expected
+    assert len(expected) == 11
+
+
+def test_invalid_cursor_rejected(client):
+    seed_updates(2)
+    assert client.get('/api/tracking/stock/updates?cursor=not-a-cursor').status_code == 400
+    assert client.get('/api/tracking/stock/updates?cursor=WzFd').status_code == 400  # [1]: wrong key size
+
+
+def test_paginate_sorted_both_directions():
+    keys = [(f'{n:02d}', 'x') for n in range(7)]
+    pages, cursor = [], None
+    while True:
+        page, cursor = paginate_sorted(keys, cursor, 3, descending=True)
+        pages.append(page)
+        if not cursor:
+            break
+    assert [key for page in pages for key in page] == keys[::-1]
+    assert [len(page) for page in pages] == [3, 3, 1]
+
+    page, cursor = paginate_sorted(keys, None, 4)
+    assert page == keys[:4]
+    assert paginate_sorted(keys, cursor, 4) == (keys[4:], None)
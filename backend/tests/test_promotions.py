@@ -0,0 +1,65 @@
+"""
+Promotion Tests
+Promotions created through the API, including target cities sent as free
+text, stay readable and validate against the compiled rules; rows that do
+not compile are rejected or skipped instead of breaking every code
+"""
+
+from types import SimpleNamespace
+
+from backend.services.promotion_engine import CompiledPromotion, PromotionEngine
+
+PROMOTION = {
+    'title': 'Monsoon Offer', 'promo_type': 'percentage', 'discount_percentage': 10,
+    'start_date': '2020-01-01T00:00:00', 'end_date': '2099-01-01T00:00:00', 'geo_targeted': True,
+}
+
+
+def create(client, code, target_cities):
+    return client.post('/api/promotions/', json={**PROMOTION, 'promo_code': code, 'target_cities': target_cities})
+
+
+def validate(client, code, city):
+    return client.post('/api/promotions/validate', json={'promo_code': code, 'order_amount': 200, 'user_location': city})
+
+
+def test_comma_list_target_cities(client):
+    response = create(client, 'RAIN10', 'Mumbai, Delhi')
+    assert response.status_code == 201
+    assert response.get_json()['data']['target_cities'] == 'Mumbai, Delhi'
+
+    listed = client.get('/api/promotions/?city=delhi')
+    assert listed.status_code == 200
+    assert [promotion['target_cities'] for promotion in listed.get_json()['data']] == ['Mumbai, Delhi']
+
+    assert validate(client, 'RAIN10', 'Delhi').get_json()['data']['discount_amount'] == 20
+    assert validate(client, 'RAIN10', 'Pune').status_code == 400
+
+
+def test_json_target_cities(client):
+    assert create(client, 'JSON10', ['Pune']).status_code == 201
+    assert client.get('/api/promotions/').get_json()['data'][0]['target_cities'] == ['Pune']
+    assert validate(client, 'JSON10', 'pune').status_code == 200
+
+
+def test_created_promotion_joins_loaded_engine(client):
+    assert client.get('/api/promotions/').status_code == 200
+    assert validate(client, 'NEW10', 'Delhi').status_code == 404  # compiles the (empty) engine
+
+    assert create(client, 'NEW10', 'Mumbai, Delhi').status_code == 201
+    assert validate(client, 'NEW10', 'Delhi').status_code == 200
+
+
+def test_malformed_target_cities_rejected_before_commit(client):
+    response = create(client, 'BAD10', {'city': 'Mumbai'})
+    assert response.status_code == 400
+    assert client.get('/api/promotions/').get_json()['count'] == 0
+
+
+def test_engine_skips_promotions_that_do_not_compile():
+    engine = PromotionEngine()
+    good = CompiledPromotion(id='p1', code='GOOD', is_active=True)
+    engine.load([SimpleNamespace(id='p2', promo_code='BROKEN'), good])
+    assert engine.get('GOOD') is good
+    assert engine.get('BROKEN') is None
+    assert len(engine) == 1
@@ -0,0 +1,16 @@
+"""
+Query Plan Tests
+Every statement the API routes execute against the seeded load-test dataset
+must be answered from an index, never a full table scan
+"""
+
+from backend.migrations.check_query_plans import check
+
+
+def test_route_queries_use_an_index(tmp_path):
+    results, failed = check(str(tmp_path / 'plans.db'))
+
+    assert not failed, f'requests failed, their queries were not checked: {failed}'
+    assert results
+    scans = [(name, ' '.join(statement.split()), plan) for name, statement, plan, full in results if full]
+    assert not scans, 'full table scans:\n' + '\n'.join(f'{name}: {statement}\n    {plan}' for name, statement, plan in scans)
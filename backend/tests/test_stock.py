@@ -0,0 +1,72 @@
+"""
+Stock Tests
+Stock changes apply atomically, clamp at zero, record the level each entry
+left the item at, and never overwrite a level another writer changed
+"""
+
+import pytest
+
+from backend.models.coffee import db, Coffee
+from backend.routes import tracking
+
+
+@pytest.fixture
+def coffees(app):
+    db.session.add_all([
+        Coffee(id='c1', name='Espresso', price=3.5, category='coffee', stock_quantity=10, min_stock_level=5),
+        Coffee(id='c2', name='Latte', price=4.0, category='coffee', stock_quantity=3, min_stock_level=0),
+    ])
+    db.session.commit()
+
+
+def level(coffee_id):
+    db.session.expire_all()
+    return db.session.get(Coffee, coffee_id).stock_quantity
+
+
+def update(client, coffee_id, change):
+    return client.post('/api/tracking/stock/update', json={'coffee_id': coffee_id, 'quantity_change': change})
+
+
+def test_update_returns_previous_level(client, coffees):
+    data = update(client, 'c1', -6).get_json()['data']
+    assert (data['old_quantity'], data['new_quantity'], data['available']) == (10, 4, False)
+    assert level('c1') == 4
+
+
+def test_update_clamps_at_zero(client, coffees):
+    data = update(client, 'c2', -5).get_json()['data']
+    assert (data['old_quantity'], data['new_quantity']) == (3, 0)
+    assert data['stock_update']['new_stock_level'] == 0
+
+
+def test_update_never_overwrites_a_concurrent_change(client, coffees, monkeypatch):
+    # Every read is stale, as if another writer always got in between read and write
+    monkeypatch.setattr(tracking, '_stock_levels', lambda coffee_ids: {coffee_id: 99 for coffee_id in coffee_ids})
+    assert update(client, 'c2', -5).status_code == 409
+    assert level('c2') == 3
+
+
+def test_unknown_item(client, coffees):
+    assert update(client, 'missing', -1).status_code == 404
+
+
+def test_batch_records_each_entry_level(client, coffees):
+    response = client.post('/api/tracking/stock/update/batch', json={'updates': [
+        {'coffee_id': 'c2', 'quantity_change': -5},
+        {'coffee_id': 'c2', 'quantity_change': 2},
+        {'coffee_id': 'c1', 'quantity_change': 1},
+    ]})
+    assert response.status_code == 200
+    assert (level('c1'), level('c2')) == (11, 2)
+
+    history = client.get('/api/tracking/stock/updates?coffee_id=c2').get_json()['data']
+    assert sorted((row['quantity_change'], row['new_stock_level']) for row in history) == [(-5, 0), (2, 2)]
+
+
+def test_batch_rejects_malformed_entries(client, coffees):
+    response = client.post('/api/tracking/stock/update/batch', json={'updates': [
+        {'coffee_id': 'c1', 'quantity_change': -1}, {'coffee_id': 'c2', 'quantity_change': '2'},
+    ]})
+    assert response.status_code == 400
+    assert level('c1') == 10
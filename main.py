@@ -3,22 +3,79 @@ CCD 2.0 - Application Runner
 Coffee Shop Management System
 
 This file is the entry point to run the backend server.
+
+    python main.py                                   # development server (debugger + reloader)
+    python main.py --production --workers 4 --threads 8
+    CCD_SERVER=production CCD_WORKERS=4 python main.py
+
+Production mode preloads the app in a master process and forks workers that
+share it copy-on-write. Each connection gets its own thread; --threads caps
+the requests a worker runs at once, and live order streams (SSE) do not count
+against it. Signals to the master: TERM/INT stop gracefully, HUP reloads
+workers gracefully, TTIN/TTOU add/remove a worker.
+
+    python main.py --profile-startup                 # time imports and init steps, then exit
 """
 
-from backend.app import app, init_db
+import argparse
+import os
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run the CCD 2.0 backend')
+    parser.add_argument('--production', action='store_true',
+                        default=os.environ.get('CCD_SERVER', '').lower() == 'production',
+                        help='prefork production server (env: CCD_SERVER=production)')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('CCD_WORKERS', 0)) or None,
+                        help='worker processes (env: CCD_WORKERS; default: one per CPU)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('CCD_THREADS', 1)),
+                        help='requests each worker runs at once, event streams excluded (env: CCD_THREADS; default: 1)')
+    parser.add_argument('--host', default=os.environ.get('CCD_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('CCD_PORT', 5000)))
+    parser.add_argument('--access-log', action='store_true', help='log every request in production mode')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='report per-module import time and init phases, then exit')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.production:
+        # Must be chosen before backend.app configures the engine on import
+        os.environ.setdefault('CCD_DB_PROFILE', 'production')
+
+    profile = None
+    if args.profile_startup:
+        from backend.services.startup_profile import StartupProfile
+        profile = StartupProfile().start()
+
+    from backend.services.startup_profile import phase
+
+    with phase('import backend.app'):
+        from backend.app import app, init_db, warm_caches
+        from backend.models.coffee import db
 
-if __name__ == '__main__':
     with app.app_context():
-        init_db(app)
-    # This will run the full-featured app from backend/app.py
-    app.run(debug=True, host='0.0.0.0', port=5000)
-
-    # Ensure we're in the right directory
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    
-    # Run the Flask application
-    print("Starting CCD 2.0 Coffee Shop Management System...")
-    print("Backend API: http://localhost:5000")
-    print("API Documentation: http://localhost:5000/api/health")
-    
-    app.run(debug=True, host='0.0.0.0', port=5000)
+        with phase('init_db'):
+            init_db(app)
+        if args.production or profile:
+            with phase('warm_caches'):
+                warm_caches()
+            db.engine.dispose()  # workers open their own connections after fork
+
+    if profile:
+        profile.report(profile.stop())
+        return
+
+    if not args.production:
+        app.run(debug=True, host=args.host, port=args.port)
+        return
+
+    from backend.services.prefork import PreforkServer
+
+    PreforkServer(app, host=args.host, port=args.port, workers=args.workers,
+                  threads=args.threads, access_log=args.access_log).run()
+
+
+if __name__ == '__main__':
+    main()